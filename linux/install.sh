@@ -61,6 +61,7 @@ chmod -R g+rx /app/*
 
 # set up targets, timers and services
 cp $SCRIPT_DIR/etc/systemd/system/aggregator-gunicorn.service /etc/systemd/system/aggregator-gunicorn.service
+cp $SCRIPT_DIR/etc/systemd/system/aggregator-job-worker.service /etc/systemd/system/aggregator-job-worker.service
 cp $SCRIPT_DIR/etc/systemd/system/aggregator.target /etc/systemd/system/aggregator.target
 cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-vms.service /etc/systemd/system/aggregator-collector-vms.service
 cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-vms.timer /etc/systemd/system/aggregator-collector-vms.timer
@@ -72,6 +73,8 @@ cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-backups.service /etc/syst
 cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-backups.timer /etc/systemd/system/aggregator-collector-backups.timer
 cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-elma-vm-access-doc.service /etc/systemd/system/aggregator-collector-elma-vm-access-doc.service
 cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-elma-vm-access-doc.timer /etc/systemd/system/aggregator-collector-elma-vm-access-doc.timer
+cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-user-vm-permissions.service /etc/systemd/system/aggregator-collector-user-vm-permissions.service
+cp $SCRIPT_DIR/etc/systemd/system/aggregator-collector-user-vm-permissions.timer /etc/systemd/system/aggregator-collector-user-vm-permissions.timer
 
 # reload systemd
 systemctl daemon-reload
@@ -79,6 +82,8 @@ systemctl daemon-reload
 # start and enable main timer target and service
 systemctl start aggregator-gunicorn.service
 systemctl enable aggregator-gunicorn.service
+systemctl start aggregator-job-worker.service
+systemctl enable aggregator-job-worker.service
 systemctl start aggregator.target
 systemctl enable aggregator.target
 
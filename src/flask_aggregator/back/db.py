@@ -1,13 +1,20 @@
 """Test module for database interactions architecture."""
 
+import base64
+import binascii
+import json
+import uuid
 from abc import ABC, abstractmethod
 from collections import OrderedDict
-from datetime import datetime, timedelta
+from collections.abc import Iterator
+from datetime import datetime, timedelta, timezone
 
-from sqlalchemy import create_engine, func, asc, desc, text
+from sqlalchemy import (
+    create_engine, func, asc, desc, text, or_, and_, cast, String
+)
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import scoped_session, sessionmaker
-from sqlalchemy.exc import OperationalError
+from sqlalchemy.exc import OperationalError, ProgrammingError
 
 from flask_aggregator.back.models import (
     get_base,
@@ -19,7 +26,8 @@ from flask_aggregator.back.models import (
     DataCenter,
     ElmaVM,
     ElmaVmAccessDoc,
-    OvirtEngine
+    OvirtEngine,
+    TableVersion
 )
 from flask_aggregator.back.logger import Logger
 
@@ -45,6 +53,72 @@ class DBConnection:
         self.__ss.close_all()
         self.__ss.remove()
 
+class DBTableVersions:
+    """Per-table "last collected" timestamps.
+
+    Every write through database managers marks affected tables as changed.
+    Frontend reads these timestamps for conditional GET requests, so polling
+    clients get `304 Not Modified` without touching data tables at all.
+    """
+    # Version of table, which was never marked: it is either empty or filled
+    # outside of managers (e.g. `ovirt_engines`). First marked write changes
+    # it anyway.
+    NEVER_CHANGED = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    @staticmethod
+    def touch(session, table_names: list[str]) -> None:
+        """Mark tables as changed right now. Caller commits the session.
+
+        Args:
+            session (Session): Session in which data was changed.
+            table_names (list[str]): Names of changed tables.
+        """
+        if not table_names:
+            return
+        now = datetime.now(timezone.utc)
+        stmt = insert(TableVersion).values(
+            [{"table_name": name, "updated_at": now} for name in table_names]
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["table_name"],
+            set_={"updated_at": stmt.excluded.updated_at}
+        )
+        session.execute(stmt)
+
+    @staticmethod
+    def get_versions(session, table_names: list[str]) -> dict:
+        """Get last change time of each table.
+
+        Args:
+            session (Session): Any session to aggregator database.
+            table_names (list[str]): Names of tables.
+
+        Returns:
+            dict: Table name -> datetime, `NEVER_CHANGED` for tables, which
+                were never marked. `None` if versions table is absent.
+        """
+        names = set(table_names)
+        try:
+            rows = (
+                session.query(TableVersion.table_name, TableVersion.updated_at)
+                .filter(TableVersion.table_name.in_(names))
+                .all()
+            )
+        # Table is created by managers, so it could be absent until first
+        # collection. Nothing to validate against in that case.
+        except (OperationalError, ProgrammingError) as e:
+            Logger().log_error(e)
+            session.rollback()
+            return None
+        versions = dict.fromkeys(names, DBTableVersions.NEVER_CHANGED)
+        for row in rows:
+            updated_at = row.updated_at
+            # Some drivers (SQLite) drop timezone.
+            if updated_at.tzinfo is None:
+                updated_at = updated_at.replace(tzinfo=timezone.utc)
+            versions[row.table_name] = updated_at
+        return versions
+
 class DBROManager:
     """Read-only manager for external databases."""
     def __init__(self, conn: DBConnection, logger: Logger=Logger()):
@@ -73,7 +147,7 @@ class DBManager(ABC):
         # module.
         get_base().metadata.create_all(
             bind=conn.get_engine(),
-            tables=[model.__table__]
+            tables=[model.__table__, TableVersion.__table__]
         )
 
     def upsert_data(
@@ -122,18 +196,21 @@ class DBManager(ABC):
             set_=dict_set
         )
         self.__s.execute(stmt)
+        DBTableVersions.touch(self.__s, [self.__m.__tablename__])
         self.__s.commit()
         self.__s.close()
 
     def add_data(self, data: list):
         """Add rows to table."""
         self.__s.add_all(data)
+        DBTableVersions.touch(self.__s, [self.__m.__tablename__])
         self.__s.commit()
         self.__s.close()
 
     def truncate_table(self):
         """Drop all rows from current model."""
         self.__s.query(self.__m).delete()
+        DBTableVersions.touch(self.__s, [self.__m.__tablename__])
         self.__s.commit()
         self.__s.close()
 
@@ -160,6 +237,10 @@ class DBRepository(ABC):
 
     Driver may vary.
     """
+    # Unique non-null column, used as tie-breaker in cursor pagination. Rows
+    # with NULL key would never get after cursor, so repositories with outer
+    # joins set their own key.
+    CURSOR_KEY = "id"
 
     def __init__(self, conn: DBConnection):
         self._conn = conn
@@ -192,11 +273,28 @@ class DBRepository(ABC):
         """Get column order for repository."""
         return self._col_order
 
+    @property
+    def col_types(self) -> dict:
+        """SQLAlchemy types of columns from column order."""
+        self.set_base_query()
+        sq = self._query.subquery()
+        return {col: sq.c[col].type for col in self._col_order if col in sq.c}
+
     @property
     def filter_fields(self):
         """Get column names by which repo can be filtered."""
         return self._filter_fields
 
+    @property
+    def filter_names(self) -> list[str]:
+        """Names of filter fields, whether they are set as dicts or as
+        plain names."""
+        return [
+            fltr["name"] if isinstance(fltr, dict) else fltr
+            for fltr in self._filter_fields or []
+            if fltr
+        ]
+
     def add_filter(
         self,
         filters: dict = None,
@@ -236,9 +334,163 @@ class DBRepository(ABC):
         self.set_order()
         self.set_pagination()
         data = self._query.all()
-        self._s.close_all()
+        self._s.close()
         return data, n
 
+    def stream(self, batch_size: int = 1000) -> Iterator:
+        """Iterate over filtered rows using server-side cursor.
+
+        Unlike `build`, rows are fetched in batches of `batch_size` and never
+        loaded all at once, so memory usage doesn't depend on result size.
+        Pagination is applied only if page and per_page are set in filter.
+
+        Args:
+            batch_size (int): Rows fetched from cursor at a time.
+
+        Yields:
+            Row or model instance, same as in `build`.
+        """
+        self.set_base_query()
+        self.set_filter()
+        self.set_order()
+        self.set_pagination()
+        try:
+            yield from self._query.yield_per(batch_size)
+        finally:
+            self._s.close()
+
+    def fetch_page(
+        self,
+        fields: list[str] = None,
+        cursor: str = None,
+        limit: int = 100
+    ) -> tuple[list, str]:
+        """Get one page of filtered rows with keyset (cursor) pagination.
+
+        Filtered query is wrapped into subquery and only `fields` columns
+        (plus ones needed for cursor) are selected from it. Rows are ordered
+        by filter `sort_by` column and by `CURSOR_KEY` column as tie-breaker,
+        so next page starts right after last row of current one, no matter
+        how deep it is.
+
+        Args:
+            fields (list[str]): Columns to get. Must be in column order. All
+                columns from column order if empty.
+            cursor (str): Token from previous page. First page if empty.
+            limit (int): Max rows in page.
+
+        Raises:
+            ValueError: If fields, cursor or limit are invalid.
+
+        Returns:
+            tuple[list, str]: Rows and cursor of next page (`None` if this
+                page is the last one).
+        """
+        fields = list(fields) if fields else list(self._col_order)
+        unknown = [f for f in fields if f not in self._col_order]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}.")
+        if limit < 1:
+            raise ValueError("'limit' must be positive.")
+        self.set_base_query()
+        self.set_filter()
+        sq = self._query.subquery()
+        if self.CURSOR_KEY not in sq.c:
+            raise ValueError("Repository doesn't support cursor pagination.")
+        key = sq.c[self.CURSOR_KEY]
+        sort_by = self._filter.sort_by
+        sort_col = sq.c[sort_by] if sort_by and sort_by in sq.c else key
+        is_asc = self._filter.sort_order != "desc"
+        order = asc if is_asc else desc
+        selected = list(dict.fromkeys(fields + [sort_col.key, key.key]))
+        query = self._s.query(*(sq.c[c] for c in selected))
+        if cursor:
+            sort_value, key_value = self.__decode_cursor(
+                cursor, sort_col, key, is_asc
+            )
+            query = query.filter(self.__after_cursor(
+                sort_col, key, sort_value, key_value, is_asc
+            ))
+        if sort_col is key:
+            query = query.order_by(order(key))
+        else:
+            query = query.order_by(order(sort_col).nulls_last(), order(key))
+        try:
+            rows = query.limit(limit + 1).all()
+        finally:
+            self._s.close()
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = self.__encode_cursor(
+            sort_col.key, is_asc,
+            getattr(last, sort_col.key), getattr(last, key.key)
+        )
+        return rows, next_cursor
+
+    @staticmethod
+    def __after_cursor(sort_col, key, sort_value, key_value, is_asc: bool):
+        """Condition for rows, going after cursor position.
+
+        NULLs of sort column are always last.
+        """
+        def after(col, value):
+            return col > value if is_asc else col < value
+
+        if sort_col is key:
+            return after(key, key_value)
+        if sort_value is None:
+            return and_(sort_col.is_(None), after(key, key_value))
+        return or_(
+            after(sort_col, sort_value),
+            sort_col.is_(None),
+            and_(sort_col == sort_value, after(key, key_value))
+        )
+
+    @staticmethod
+    def __encode_cursor(sort_by: str, is_asc: bool, sort_value, key_value):
+        """Make opaque cursor token."""
+        raw = json.dumps(
+            [sort_by, is_asc, sort_value, key_value], default=str
+        )
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def __decode_cursor(cursor: str, sort_col, key, is_asc: bool) -> tuple:
+        """Get sort column and key values from cursor token.
+
+        Raises:
+            ValueError: If token is malformed or made for another order.
+        """
+        try:
+            sort_by, cur_asc, sort_value, key_value = json.loads(
+                base64.urlsafe_b64decode(cursor.encode())
+            )
+        except (binascii.Error, UnicodeError, ValueError, TypeError) as e:
+            raise ValueError("Invalid cursor.") from e
+        if sort_by != sort_col.key or cur_asc != is_asc:
+            raise ValueError("Cursor doesn't match sort order.")
+
+        def restore(col, value):
+            # JSON has no datetime and UUID, so they are restored by column
+            # type.
+            if value is None:
+                return None
+            try:
+                python_type = col.type.python_type
+            except NotImplementedError:
+                return value
+            try:
+                if python_type is datetime:
+                    return datetime.fromisoformat(value)
+                if python_type is uuid.UUID:
+                    return uuid.UUID(value)
+            except (ValueError, TypeError) as e:
+                raise ValueError("Invalid cursor.") from e
+            return value
+        return restore(sort_col, sort_value), restore(key, key_value)
+
     @abstractmethod
     def set_base_query(self):
         """Base query for current database interaction (repository)."""
@@ -371,7 +623,6 @@ class LatestBackupOvirtRepository(DBRepository):
     def __init__(self, conn):
         super().__init__(conn)
         self._col_order = ["uuid", "name", "engine"]
-        self._filter_fields = ["name", "engine"]
 
     def set_base_query(self):
         subquery = (
@@ -441,7 +692,12 @@ class ToBeBackedUpVmsRepository(DBRepository):
     """A join of VMs which have to be backed up by cyberbackup.
     
     Tables involved: 'backups', 'elma_vm_access_doc', 'vms'.
+
+    VMs, absent in oVirt, have no `id`, so rows are paginated by document id
+    and VM id (zero if VM is absent).
     """
+    CURSOR_KEY = "cursor_key"
+
     def set_base_query(self):
         backups_subq = (
             self._s.query(Backups.name)
@@ -465,7 +721,11 @@ class ToBeBackedUpVmsRepository(DBRepository):
                 Vm.id,
                 Vm.uuid,
                 ElmaVmAccessDoc.name,
-                Vm.engine
+                Vm.engine,
+                (
+                    cast(ElmaVmAccessDoc.id, String) + ":"
+                    + cast(func.coalesce(Vm.id, 0), String)
+                ).label(self.CURSOR_KEY)
             )
             .outerjoin(
                 elma_q,
@@ -669,9 +929,58 @@ class DBBasicRepository(DBRepository):
 class DBRepositoryFactory:
     """Factory for creating various database interactions endpoints."""
 
+    # Tables, which data is shown by each repository. Engine lists in
+    # filters are data too, so `ovirt_engines` is included where used.
+    REPO_TABLES = {
+        "LatestBackup": ["backups"],
+        "LatestBackupOvirt": [
+            "vms", "elma_vm_access_doc", "backups", "ovirt_engines"
+        ],
+        "VmOvirt": ["vms", "ovirt_engines"],
+        "HostOvirt": ["hosts", "ovirt_engines"],
+        "ClusterOvirt": ["clusters", "ovirt_engines"],
+        "DataCenterOvirt": ["data_centers", "ovirt_engines"],
+        "StorageOvirt": ["storages", "ovirt_engines"],
+        "Backups": ["backups"],
+        "ElmaVm": ["elma_vms"],
+        "ElmaVmAccessDoc": ["elma_vm_access_doc"],
+        "ToBeBackedUpVms": [
+            "vms", "elma_vm_access_doc", "backups", "ovirt_engines"
+        ],
+        "OvirtEngines": ["ovirt_engines"],
+        "TapedOnlyVms": ["backups"],
+    }
+    # Filters, which results depend on current time, not only on data.
+    # Responses with them set are not cached.
+    REPO_TIME_FILTERS = {
+        "LatestBackup": ["show_backups"],
+    }
+
     def __init__(self):
         self.__db_conn = None
 
+    @staticmethod
+    def get_repo_tables(repo_name: str) -> list[str]:
+        """Get names of tables repository depends on.
+
+        Args:
+            repo_name (str): Repository name.
+
+        Raises:
+            ValueError: If repository is unknown.
+
+        Returns:
+            list[str]: Table names.
+        """
+        if repo_name not in DBRepositoryFactory.REPO_TABLES:
+            raise ValueError("'repo_name' is invalid.")
+        return DBRepositoryFactory.REPO_TABLES[repo_name]
+
+    @staticmethod
+    def get_repo_time_filters(repo_name: str) -> list[str]:
+        """Get names of repository filters, relative to current time."""
+        return DBRepositoryFactory.REPO_TIME_FILTERS.get(repo_name, [])
+
     def set_connection(self, conn: DBConnection):
         """Set DB connection for factory."""
         self.__db_conn = conn
@@ -719,12 +1028,12 @@ class DBRepositoryFactory:
             engines_repo.set_model(OvirtEngine)
             engines_repo.set_base_query()
             engines, _ = engines_repo.build()
+            engines = {engine.name: engine.name for engine in engines}
             engines = OrderedDict([("", "all")] + list(engines.items()))
             repo.set_filter_fields([
                 {"name": "name", "type": "text", "default_value": ''},
                 {"name": "engine", "type": "option", "options": engines}
             ])
-            repo.set_filter_fields(["name", "engine"])
             return repo
         if repo_name == "VmOvirt":
             repo = DBBasicRepository(self.__db_conn)
@@ -21,6 +21,12 @@ from flask_aggregator.back.models import (
     VmsToBeBackedUpView
 )
 from flask_aggregator.back.logger import Logger
+from flask_aggregator.back.db import DBTableVersions
+from flask_aggregator.back.records import to_params
+
+# Rows per upsert statement: parameters are built for one batch at a time,
+# not for the whole collected data.
+UPSERT_BATCH_SIZE = 1000
 
 
 class DBManager():
@@ -101,7 +107,7 @@ class DBManager():
         Args:
             model (any): ORM db of sqlalchemy (class name).
             data (list): Data, either list of dicts (with all fields of model)
-                or list of model elements (i.e. derived from Base ORM class).
+                or list of records (see `records.py`).
             index_elements (list): List or strings, representing fields
                 (columns), which have to be excluded from ON CONFLICT clause
                 (to the right side of the clausee).
@@ -123,25 +129,117 @@ class DBManager():
                 ```
         """
         session = self.__session()
-        # Postgres specific "upsert".
+        for i in range(0, len(data), UPSERT_BATCH_SIZE):
+            session.execute(self.__upsert_stmt(
+                model,
+                list(to_params(data[i:i + UPSERT_BATCH_SIZE])),
+                index_elements,
+                included_elements
+            ))
+        DBTableVersions.touch(session, [model.__tablename__])
+        session.commit()
+        session.close()
+
+    def sync_data(
+        self,
+        model: any,
+        data: list[dict],
+        index_element: str,
+        scope: dict,
+        compared: list[str]
+    ) -> dict:
+        """Make rows of `scope` match `data`, writing only differences.
+
+        Rows, which are new or differ in `compared` fields, are upserted,
+        rows of scope, absent in `data`, are deleted. Unchanged rows are not
+        touched.
+
+        Args:
+            model (any): ORM model class.
+            data (list[dict]): Actual rows (all fields, except `id`).
+            index_element (str): Unique key field.
+            scope (dict): Filter of rows, which `data` represents, e.g.
+                `{"engine": "e15"}`.
+            compared (list[str]): Fields to compare existing rows by.
+
+        Returns:
+            dict: `upserted`, `deleted` and `unchanged` rows count.
+        """
+        # Same key twice in one upsert is an error in Postgres.
+        data = list({str(el[index_element]): el for el in data}.values())
+        session = self.__session()
+        try:
+            existing = {
+                str(getattr(row, index_element)): row
+                for row in session.query(model).filter_by(**scope)
+            }
+            changed = [
+                el for el in data
+                if str(el[index_element]) not in existing
+                or any(
+                    str(getattr(existing[str(el[index_element])], f))
+                    != str(el[f])
+                    for f in compared
+                )
+            ]
+            actual = {str(el[index_element]) for el in data}
+            stale = [
+                getattr(row, index_element)
+                for key, row in existing.items() if key not in actual
+            ]
+            if stale:
+                (
+                    session.query(model)
+                    .filter(getattr(model, index_element).in_(stale))
+                    .delete(synchronize_session=False)
+                )
+            if changed:
+                session.execute(self.__upsert_stmt(
+                    model, changed, [index_element], ["id", index_element]
+                ))
+            if changed or stale:
+                DBTableVersions.touch(session, [model.__tablename__])
+            session.commit()
+        finally:
+            session.close()
+        return {
+            "upserted": len(changed),
+            "deleted": len(stale),
+            "unchanged": len(data) - len(changed)
+        }
+
+    @staticmethod
+    def __upsert_stmt(
+        model: any, data: list, index_elements: list, included_elements: list
+    ):
+        """Postgres specific "upsert" statement."""
         stmt = insert(model).values(data)
         dict_set = {
             column.name: getattr(stmt.excluded, column.name)
             for column in model.__table__.columns
             if column.name not in included_elements
         }
-        stmt = stmt.on_conflict_do_update(
+        return stmt.on_conflict_do_update(
             index_elements=index_elements,
             set_=dict_set
         )
-        session.execute(stmt)
-        session.commit()
-        session.close()
+
+    def touch_tables(self, table_names: list[str]) -> None:
+        """Mark tables, written outside of manager, as changed."""
+        session = self.__session()
+        try:
+            DBTableVersions.touch(session, table_names)
+            session.commit()
+        finally:
+            session.close()
 
     def add_data(self, data: list) -> None:
         """Add data to tables based on their type."""
         session = self.__session()
         session.add_all(data)
+        DBTableVersions.touch(
+            session, list({el.__tablename__ for el in data})
+        )
         session.commit()
         session.close()
 
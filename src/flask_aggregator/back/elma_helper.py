@@ -131,6 +131,8 @@ class ElmaHelper():
                     if_exists="replace",
                     index_label="id"
                 )
+                # Pandas writes past manager, so version is set here.
+                self.__dbmanager.touch_tables([table.__tablename__])
             else:
                 self.__logger.log_error(
                     f"[{self.__class__.__name__}] File either empty or has "
@@ -0,0 +1,299 @@
+"""Streaming exporters for repository data."""
+
+import csv
+import io
+import json
+import zlib
+from abc import ABC, abstractmethod
+from collections.abc import Iterable, Iterator
+from datetime import date, datetime
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def dumps_json(obj) -> bytes:
+    """Serialize object to UTF-8 JSON.
+
+    `orjson` is used if installed, standard `json` otherwise. UUID and
+    datetime values are dumped as strings by both.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=str)
+    return json.dumps(obj, ensure_ascii=False, default=str).encode()
+
+
+class Exporter(ABC):
+    """Abstract class for all exporters.
+
+    Exporter turns iterable of row dicts into iterator of chunks, which can
+    be passed straight to streaming response. Rows are consumed lazily, so
+    memory usage doesn't depend on row count.
+    """
+    def __init__(
+        self, cols: list[str], chunk_rows: int = 1000, col_types: dict = None
+    ):
+        self._cols = cols
+        self._chunk_rows = chunk_rows
+        # Column name -> SQLAlchemy type, for formats with typed columns.
+        self._col_types = col_types or {}
+
+    @property
+    @abstractmethod
+    def mimetype(self) -> str:
+        """Response mimetype."""
+
+    @property
+    @abstractmethod
+    def extension(self) -> str:
+        """File extension for download name."""
+
+    @abstractmethod
+    def iter_chunks(self, rows: Iterable[dict]) -> Iterator:
+        """Make chunks from rows.
+
+        Args:
+            rows (Iterable[dict]): Rows with keys from `cols`.
+
+        Yields:
+            str or bytes: Chunk of file content.
+        """
+
+
+class CSVExporter(Exporter):
+    """CSV with UTF-8 BOM, so Excel opens cyrillic properly."""
+    @property
+    def mimetype(self):
+        return "text/csv"
+
+    @property
+    def extension(self):
+        return "csv"
+
+    def iter_chunks(self, rows):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(
+            buffer, fieldnames=self._cols, lineterminator="\n"
+        )
+        buffer.write("\ufeff")
+        writer.writeheader()
+        for i, row in enumerate(rows, start=1):
+            writer.writerow(row)
+            if i % self._chunk_rows == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+
+class GzipCSVExporter(CSVExporter):
+    """Same CSV, compressed on the fly."""
+    @property
+    def mimetype(self):
+        return "application/gzip"
+
+    @property
+    def extension(self):
+        return "csv.gz"
+
+    def iter_chunks(self, rows):
+        # wbits=31 makes gzip container instead of raw zlib stream.
+        compressor = zlib.compressobj(wbits=31)
+        for chunk in super().iter_chunks(rows):
+            data = compressor.compress(chunk.encode())
+            if data:
+                yield data
+        yield compressor.flush()
+
+
+class NDJSONExporter(Exporter):
+    """Newline-delimited JSON, one row per line."""
+    @property
+    def mimetype(self):
+        return "application/x-ndjson"
+
+    @property
+    def extension(self):
+        return "ndjson"
+
+    def iter_chunks(self, rows):
+        lines = []
+        for row in rows:
+            # UUID, datetime and others are dumped as strings.
+            lines.append(json.dumps(row, ensure_ascii=False, default=str))
+            if len(lines) == self._chunk_rows:
+                yield "\n".join(lines) + "\n"
+                lines = []
+        if lines:
+            yield "\n".join(lines) + "\n"
+
+
+class _ChunkSink:
+    """Write-only file object, which gives away written bytes on demand.
+
+    Parquet writer needs real stream position for file footer, so `tell`
+    counts all bytes ever written, not only those still in buffer.
+    """
+    def __init__(self):
+        self.__chunks = []
+        self.__pos = 0
+        self.closed = False
+
+    def write(self, data):
+        """Store bytes."""
+        self.__chunks.append(bytes(data))
+        self.__pos += len(data)
+        return len(data)
+
+    def tell(self):
+        """Total bytes written."""
+        return self.__pos
+
+    def writable(self):
+        """Required by pyarrow."""
+        return True
+
+    def flush(self):
+        """Nothing to flush, data is kept until `pop`."""
+
+    def close(self):
+        """Mark sink as closed."""
+        self.closed = True
+
+    def pop(self) -> bytes:
+        """Get bytes written since last call."""
+        data = b"".join(self.__chunks)
+        self.__chunks = []
+        return data
+
+
+class ParquetExporter(Exporter):
+    """Columnar Parquet file, one row group per chunk.
+
+    Schema is made from SQLAlchemy types of columns before first row is
+    read, so every row group has the same column types. Columns of other or
+    unknown types (UUID, Decimal, JSON, etc.) are stored as strings.
+
+    Requires `pyarrow`, which is an optional dependency.
+    """
+    def __init__(
+        self, cols: list[str], chunk_rows: int = 10000, col_types: dict = None
+    ):
+        super().__init__(cols, chunk_rows, col_types)
+        # Checking dependency before streaming starts, since after that
+        # there is no way to tell client about error.
+        try:
+            # pylint: disable=import-outside-toplevel
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError as e:
+            raise ValueError(
+                "Parquet export requires 'pyarrow' package."
+            ) from e
+        self.__pa = pyarrow
+        self.__pq = pyarrow.parquet
+        self.__schema = pyarrow.schema([
+            pyarrow.field(col, self.__arrow_type(self._col_types.get(col)))
+            for col in cols
+        ])
+        # Values of string columns are converted, others are kept as is.
+        self.__str_cols = [
+            col for col in cols
+            if self.__schema.field(col).type == pyarrow.string()
+        ]
+
+    def __arrow_type(self, sql_type):
+        """Arrow type for SQLAlchemy type, string if it is unknown."""
+        pa = self.__pa
+        try:
+            python_type = sql_type.python_type
+        except (AttributeError, NotImplementedError):
+            return pa.string()
+        if python_type is bool:
+            return pa.bool_()
+        if python_type is int:
+            return pa.int64()
+        if python_type is float:
+            return pa.float64()
+        if python_type is datetime:
+            return pa.timestamp(
+                "us", tz="UTC" if getattr(sql_type, "timezone", False) else None
+            )
+        if python_type is date:
+            return pa.date32()
+        return pa.string()
+
+    @property
+    def mimetype(self):
+        return "application/vnd.apache.parquet"
+
+    @property
+    def extension(self):
+        return "parquet"
+
+    def iter_chunks(self, rows):
+        sink = _ChunkSink()
+        writer = self.__pq.ParquetWriter(sink, self.__schema)
+        batch = []
+        for row in rows:
+            batch.append(self.__to_plain(row))
+            if len(batch) == self._chunk_rows:
+                self.__write(writer, batch)
+                batch = []
+                yield sink.pop()
+        if batch:
+            self.__write(writer, batch)
+        writer.close()
+        yield sink.pop()
+
+    def __to_plain(self, row: dict) -> dict:
+        """Convert values of string columns to strings."""
+        row = dict(row)
+        for col in self.__str_cols:
+            value = row.get(col)
+            if value is not None and not isinstance(value, str):
+                row[col] = str(value)
+        return row
+
+    def __write(self, writer, batch: list[dict]):
+        """Write row group with file schema."""
+        writer.write_table(
+            self.__pa.Table.from_pylist(batch, schema=self.__schema)
+        )
+
+
+class ExporterFactory:
+    """Simple factory to get exporters by format name."""
+    FORMATS = {
+        "csv": CSVExporter,
+        "csv.gz": GzipCSVExporter,
+        "ndjson": NDJSONExporter,
+        "parquet": ParquetExporter,
+    }
+
+    @staticmethod
+    def create_exporter(
+        fmt: str, cols: list[str], col_types: dict = None
+    ) -> Exporter:
+        """Return concrete exporter.
+
+        Args:
+            fmt (str): One of `FORMATS` keys.
+            cols (list[str]): Column order.
+            col_types (dict): SQLAlchemy types of columns, if format has
+                typed columns.
+
+        Raises:
+            ValueError: For unknown formats.
+
+        Returns:
+            Exporter: exporter instance.
+        """
+        if fmt not in ExporterFactory.FORMATS:
+            raise ValueError(
+                f"Unknown format {fmt}. Allowed: "
+                f"{', '.join(ExporterFactory.FORMATS)}."
+            )
+        return ExporterFactory.FORMATS[fmt](cols, col_types=col_types)
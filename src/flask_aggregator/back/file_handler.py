@@ -2,6 +2,8 @@
 
 import json
 
+from flask_aggregator.back.records import to_params
+
 class FileHandler():
     """Handle files."""
     def __init__(self):
@@ -47,8 +49,8 @@ class FileHandler():
         
         Args:
             data (list): Returned from VirtProtocol classes getter functions,
-                such as ovirt_helper.get_vms(). Always should be a list of
-                dicts.
+                such as ovirt_helper.get_vms(). List of dicts or records
+                (see `records.py`).
             file_name (str): What name will be used for file, which stores
                 `data` values.
 
@@ -68,7 +70,9 @@ class FileHandler():
                 'w',
                 encoding="utf-8"
             ) as file:
-                json.dump(data, file, ensure_ascii=False, indent=4)
+                json.dump(
+                    list(to_params(data)), file, ensure_ascii=False, indent=4
+                )
 
     def make_unique_vlan_configs(self) -> None:
         """In order to create VLANs it is better to get a set of unique
@@ -0,0 +1,253 @@
+"""Background jobs for long-running operations.
+
+Frontend only puts jobs into `jobs` table and answers with job id, so web
+workers are never blocked by VM or VLAN creation. Jobs are run by separate
+job worker process (`fa_job_worker`).
+"""
+
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable
+
+from flask_aggregator.back.db import DBConnection
+from flask_aggregator.back.file_handler import FileHandler
+from flask_aggregator.back.logger import Logger
+from flask_aggregator.back.models import get_base, Job
+from flask_aggregator.back.ovirt_helper import OvirtHelper
+from flask_aggregator.back.task_manager.command import State
+from flask_aggregator.config import Config
+from flask_aggregator.back.virt_aggregator import VirtAggregator
+
+
+def create_vms(payload: dict) -> dict:
+    """Create VMs from input JSON (same as for `/ovirt/create_vm`)."""
+    file_handler = FileHandler()
+    file_handler.input_json = payload
+    # Formatting to get separate list for each unique DPC.
+    file_handler.reformat_input_json()
+    virt_aggregator = VirtAggregator(logger=Logger())
+    virt_aggregator.create_virt_helpers(file_handler)
+    reports = virt_aggregator.create_vms(file_handler)
+    vms = [vm for report in reports for vm in report["vms"]]
+    created = sum("error" not in vm for vm in vms)
+    return {
+        "success": f"Created {created} of {len(vms)} VMs.",
+        "reports": reports
+    }
+
+def create_vlans(payload: dict) -> dict:
+    """Create VLANs from input JSON (same as for `/ovirt/create_vlan`)."""
+    file_handler = FileHandler()
+    file_handler.input_json = payload
+    # Formatting to get separate list for each unique DPC.
+    file_handler.reformat_input_json()
+    # Creating list of unique VLANs per DPC.
+    file_handler.make_unique_vlan_configs()
+    virt_aggregator = VirtAggregator(logger=Logger())
+    virt_aggregator.create_virt_helpers(file_handler)
+    reports = virt_aggregator.create_vlans(file_handler)
+    return {"success": "Created VLANs.", "reports": reports}
+
+def migrate_vm_descriptions(payload: dict) -> dict:
+    """Normalize VM descriptions in all engines.
+
+    Payload keys (all optional): `mode` (`normalize` or `clean`), `dry_run`,
+    `checkpoint` (file path) and `dpc_list`.
+    """
+    payload = payload or {}
+    ovirt_helper = OvirtHelper(
+        dpc_list=payload.get("dpc_list") or Config.DPC_LIST,
+        logger=Logger()
+    )
+    ovirt_helper.connect_to_virtualization()
+    try:
+        return ovirt_helper.migrate_vm_descriptions(
+            mode=payload.get("mode", "normalize"),
+            dry_run=bool(payload.get("dry_run", False)),
+            checkpoint=payload.get("checkpoint")
+        )
+    finally:
+        ovirt_helper.disconnect_from_virtualization()
+
+# Job type -> function, which gets job payload and returns JSON-friendly
+# result.
+JOB_HANDLERS: dict[str, Callable[[Any], Any]] = {
+    "create_vm": create_vms,
+    "create_vlan": create_vlans,
+    "migrate_vm_descriptions": migrate_vm_descriptions,
+}
+
+
+class JobQueue:
+    """Jobs storage in aggregator database."""
+    def __init__(self, conn: DBConnection):
+        self.__conn = conn
+        get_base().metadata.create_all(
+            bind=conn.get_engine(), tables=[Job.__table__]
+        )
+
+    def submit(self, job_type: str, payload: Any) -> str:
+        """Put new job into queue.
+
+        Args:
+            job_type (str): One of `JOB_HANDLERS` keys.
+            payload (Any): JSON-friendly job input.
+
+        Raises:
+            ValueError: For unknown job type.
+
+        Returns:
+            str: Job UUID.
+        """
+        if job_type not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job type '{job_type}'.")
+        job_uuid = uuid.uuid4()
+        s = self.__conn.get_scoped_session()
+        try:
+            s.add(Job(
+                uuid=job_uuid,
+                type=job_type,
+                payload=payload,
+                state=State.NEW,
+                created_at=datetime.now(timezone.utc)
+            ))
+            s.commit()
+        finally:
+            s.close()
+        return str(job_uuid)
+
+    def get(self, job_uuid: str) -> dict:
+        """Get job info. `None` if there is no such job."""
+        try:
+            job_uuid = uuid.UUID(job_uuid)
+        except ValueError:
+            return None
+        s = self.__conn.get_scoped_session()
+        try:
+            job = s.query(Job).filter(Job.uuid == job_uuid).first()
+            if job is None:
+                return None
+            result = job.as_dict
+            result.pop("id")
+            result.pop("payload")
+            return result
+        finally:
+            s.close()
+
+    def claim(self) -> tuple[str, str, Any]:
+        """Take oldest new job and mark it as running.
+
+        Rows locked by other workers are skipped, so several workers never
+        get the same job.
+
+        Returns:
+            tuple[str, str, Any]: Job UUID, type and payload. `None` if
+                there are no new jobs.
+        """
+        s = self.__conn.get_scoped_session()
+        try:
+            job = (
+                s.query(Job)
+                .filter(Job.state == State.NEW)
+                .order_by(Job.id)
+                .with_for_update(skip_locked=True)
+                .first()
+            )
+            if job is None:
+                s.rollback()
+                return None
+            job.state = State.RUNNING
+            job.started_at = datetime.now(timezone.utc)
+            claimed = (str(job.uuid), job.type, job.payload)
+            s.commit()
+            return claimed
+        finally:
+            s.close()
+
+    def finish(self, job_uuid: str, result: Any = None, error: str = None):
+        """Save job result (or error) and mark job as finished."""
+        s = self.__conn.get_scoped_session()
+        try:
+            job = s.query(Job).filter(Job.uuid == uuid.UUID(job_uuid)).one()
+            job.state = State.FAILED if error else State.SUCCESS
+            job.result = result
+            job.error = error
+            job.finished_at = datetime.now(timezone.utc)
+            s.commit()
+        finally:
+            s.close()
+
+    def fail_running(self, error: str) -> int:
+        """Mark all running jobs as failed. Returns count of such jobs.
+
+        Meant for job worker start: if worker is the only one, running jobs
+        were interrupted by its previous stop.
+        """
+        s = self.__conn.get_scoped_session()
+        try:
+            count = (
+                s.query(Job)
+                .filter(Job.state == State.RUNNING)
+                .update({
+                    Job.state: State.FAILED,
+                    Job.error: error,
+                    Job.finished_at: datetime.now(timezone.utc)
+                })
+            )
+            s.commit()
+            return count
+        finally:
+            s.close()
+
+
+class JobWorker:
+    """Runs jobs from queue, up to `max_workers` at a time."""
+    def __init__(
+        self,
+        queue: JobQueue,
+        max_workers: int = 10,
+        polling_interval: int = 2,
+        logger: Logger = Logger()
+    ):
+        self.__queue = queue
+        self.__max_workers = max_workers
+        self.__polling_interval = polling_interval
+        self.__logger = logger
+        self.__running = True
+        self.__futures: list[Future] = []
+
+    def __run_job(self, job_uuid: str, job_type: str, payload: Any):
+        self.__logger.log_info(f"Job {job_uuid} ({job_type}) started.")
+        try:
+            result = JOB_HANDLERS[job_type](payload)
+        # Job must be finished whatever happens inside, otherwise it will be
+        # shown as running forever.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.__logger.log_error(f"Job {job_uuid} ({job_type}) failed: {e}")
+            self.__queue.finish(job_uuid, error=str(e) or repr(e))
+            return
+        self.__queue.finish(job_uuid, result=result)
+        self.__logger.log_info(f"Job {job_uuid} ({job_type}) finished.")
+
+    def run(self):
+        """Poll queue and run jobs until stopped."""
+        with ThreadPoolExecutor(
+            max_workers=self.__max_workers, thread_name_prefix="job"
+        ) as executor:
+            while self.__running:
+                self.__futures = [f for f in self.__futures if not f.done()]
+                job = None
+                if len(self.__futures) < self.__max_workers:
+                    job = self.__queue.claim()
+                if job is None:
+                    time.sleep(self.__polling_interval)
+                    continue
+                self.__futures.append(executor.submit(self.__run_job, *job))
+        # Leaving executor context waits for running jobs.
+        self.__logger.log_info("Job worker stopped.")
+
+    def stop(self):
+        """Stop taking new jobs. Running jobs will be finished."""
+        self.__running = False
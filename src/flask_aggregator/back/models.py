@@ -392,9 +392,102 @@ class CyberbackupAlert(Base):
     deleted_by_user = Column(Boolean)
 
 class RPVM(Base):
+    """Rosplatforma VM model class."""
     __tablename__ = "rv_vms"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
+    uuid = Column(UUID, unique=True, nullable=False)
     name = Column(String, nullable=False)
     host = Column(String, nullable=False)
     cluster = Column(String, nullable=False)
+    ip = Column(String)
+    cpu = Column(Integer)
+    memory = Column(Float)
+    total_space = Column(Float)
+    state = Column(String)
+
+    @property
+    def as_dict(self):
+        """Return dict from model structure."""
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+
+    @staticmethod
+    def get_columns_order():
+        """Get full order of columns."""
+        return [
+            "uuid", "name", "host", "cluster", "ip", "cpu", "memory",
+            "total_space", "state"
+        ]
+
+    @staticmethod
+    def get_filters():
+        """Full set of filters."""
+        return ["name", "host", "cluster", "ip"]
+
+class UserVmPermission(Base):
+    """oVirt user permission for VM (who can operate which VM).
+
+    `uuid` is oVirt permission ID.
+    """
+    __tablename__ = "user_vm_permissions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    uuid = Column(UUID, unique=True, nullable=False)
+    user_name = Column(String)
+    user_uuid = Column(UUID)
+    vm_uuid = Column(UUID)
+    vm_name = Column(String)
+    role = Column(String)
+    engine = Column(String)
+    updated_at = Column(DateTime(timezone=True))
+
+    @property
+    def as_dict(self):
+        """Return dict from model structure."""
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
+
+    @staticmethod
+    def get_columns_order():
+        """Get full order of columns."""
+        return ["user_name", "vm_name", "role", "engine", "updated_at"]
+
+    @staticmethod
+    def get_filters():
+        """Full set of filters."""
+        return ["user_name", "vm_name", "role", "engine"]
+
+class TableVersion(Base):
+    """Time of last data change for every table.
+
+    Updated by database managers on each write. Frontend uses it to build
+    `ETag`/`Last-Modified` headers without querying data itself.
+    """
+    __tablename__ = "table_versions"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_name = Column(String, unique=True, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+
+class Job(Base):
+    """Background job (VM or VLAN creation etc.).
+
+    Frontend only puts job here and returns its `uuid`, job worker picks it
+    up and stores result.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    uuid = Column(UUID, unique=True, nullable=False)
+    type = Column(String, nullable=False)
+    payload = Column(JSONB)
+    state = Column(String, nullable=False)
+    result = Column(JSONB)
+    error = Column(String)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    started_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+
+    @property
+    def as_dict(self):
+        """Return dict from model structure."""
+        return {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -6,13 +6,279 @@ __author__ = "xussein"
 import time
 import threading
 import json
+import os
 import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
 import ovirtsdk4 as sdk
 
 from flask_aggregator.config import Config
 from flask_aggregator.back.virt_protocol import VirtProtocol
 from flask_aggregator.back.logger import Logger
+from flask_aggregator.back.pipeline import Pipeline, Stage
+from flask_aggregator.back.records import HostRecord, StorageRecord, VmRecord
+from flask_aggregator.back.wait import (
+    Poller, RateLimiter, WaitTimeoutError)
+
+# Deadlines (seconds) for waits during VM creation.
+VM_CLONE_TIMEOUT = 3600
+DISK_TIMEOUT = 1800
+VM_STATUS_TIMEOUT = 900
+# VM is reset after first boot, when guest agent reports devices, but not
+# earlier than `GUEST_BOOT_MIN_TIME` after VM is up (so CloudInit is not
+# interrupted) and not later than `GUEST_BOOT_TIMEOUT`.
+GUEST_BOOT_MIN_TIME = 60
+GUEST_BOOT_TIMEOUT = 180
+# Batch VM provisioning limits: workers of each stage, parallel clones per
+# storage domain and parallel disk setups per engine.
+PROVISION_WORKERS = 20
+CLONE_CONCURRENCY = 4
+DISK_CONCURRENCY = 8
+# Lifetime (seconds) of cached engine metadata: clusters, networks, etc.
+METADATA_TTL = 300
+# Max hosts, getting VLANs attached at a time.
+HOST_SETUP_CONCURRENCY = 8
+# VM names/IDs per engine search query and max parallel VM updates when
+# enabling HA.
+HA_SEARCH_CHUNK = 50
+HA_UPDATE_CONCURRENCY = 10
+# Description migration: parallel VM updates and max updates per second in
+# one engine.
+DESC_UPDATE_CONCURRENCY = 10
+DESC_UPDATES_PER_SECOND = 5
+# Users, whose permissions are fetched at a time.
+USER_PERMISSIONS_CONCURRENCY = 10
+
+# Fields of old plain text VM description: "Time created: ..., owner: ...".
+_OLD_DESC_PATTERNS = {
+    el: re.compile(rf"{el}: \s*([^,]+)")
+    for el in ("Time created", "owner", "ELMA task numer")
+}
+# Description template of VMs without any data.
+_EMPTY_DESC = (
+    '{"Misc": "", "Time created": "", "ELMA task number": "", '
+    '"elma_os": "", "owner": "", "Environment": "", "Migrated": ""}'
+)
+
+
+def _quote_search(value) -> str:
+    """Value of engine search query in double quotes, so spaces and
+    keywords (`or`, `and`) in it are not parsed as query syntax."""
+    value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+    return f'"{value}"'
+
+
+class _EngineJobs:
+    """Engine jobs of actions, shared by all job waits of one engine.
+
+    Actions are marked with correlation ID, and their completion is looked
+    up in engine jobs. Only jobs with awaited correlation ID are searched,
+    at most once per `max_age` seconds for each ID.
+    """
+    def __init__(self, jobs_service, max_age: float = 1):
+        self.__jobs_service = jobs_service
+        self.__max_age = max_age
+        # Correlation ID -> (fetch time, job statuses).
+        self.__statuses: dict[str, tuple[float, list]] = {}
+        self.__lock = threading.Lock()
+
+    def statuses(self, correlation_id: str) -> list:
+        """Statuses of jobs with correlation ID. Empty if none are seen."""
+        with self.__lock:
+            entry = self.__statuses.get(correlation_id)
+        now = time.monotonic()
+        if entry is not None and now - entry[0] < self.__max_age:
+            return entry[1]
+        statuses = [
+            job.status
+            for job in self.__jobs_service.list(
+                search=f"correlation_id={correlation_id}"
+            )
+            # Search is not exact match, so IDs are checked anyway.
+            if job.correlation_id == correlation_id
+        ]
+        with self.__lock:
+            self.__statuses[correlation_id] = (now, statuses)
+        return statuses
+
+    def forget(self, correlation_id: str):
+        """Drop statuses of action, which is not awaited anymore."""
+        with self.__lock:
+            self.__statuses.pop(correlation_id, None)
+
+    def is_finished(self, correlation_id: str):
+        """`True` if all jobs are finished, `None` if there are no jobs.
+
+        Raises:
+            sdk.Error: If any job failed or was aborted.
+        """
+        statuses = self.statuses(correlation_id)
+        if not statuses:
+            return None
+        failed = [
+            s for s in statuses
+            if s in (sdk.types.JobStatus.FAILED, sdk.types.JobStatus.ABORTED)
+        ]
+        if failed:
+            raise sdk.Error(
+                f"Engine job {correlation_id} ended with status {failed[0]}."
+            )
+        return all(s == sdk.types.JobStatus.FINISHED for s in statuses)
+
+
+class _EngineMetadata:
+    """Cached lists of engine entities, used during VM and VLAN creation.
+
+    Each list is fetched on first use and then reused until `ttl` expires or
+    it is invalidated, so batch of VMs/VLANs lists them once per engine.
+    Each key has its own lock: concurrent lookups of same list wait for one
+    fetch instead of doing their own. List, fetched while its kind was
+    invalidated, is returned to its caller, but not cached: it may miss the
+    change, which caused invalidation.
+    """
+    def __init__(self, connection, ttl: float = METADATA_TTL):
+        self.__connection = connection
+        self.__ttl = ttl
+        self.__entries: dict = {}
+        self.__locks: dict = {}
+        self.__lock = threading.Lock()
+        # Bumped by `invalidate`: all kinds and each kind separately.
+        self.__generation = 0
+        self.__kind_generations: dict = {}
+
+    @staticmethod
+    def __kind(key) -> str:
+        return key[0] if isinstance(key, tuple) else key
+
+    def __generation_of(self, kind: str) -> tuple:
+        return self.__generation, self.__kind_generations.get(kind, 0)
+
+    def __get(self, key, loader):
+        kind = self.__kind(key)
+        with self.__lock:
+            key_lock = self.__locks.setdefault(key, threading.Lock())
+        with key_lock:
+            now = time.monotonic()
+            with self.__lock:
+                entry = self.__entries.get(key)
+                generation = self.__generation_of(kind)
+            if entry is not None and now - entry[1] < self.__ttl:
+                return entry[0]
+            value = loader()
+            with self.__lock:
+                if self.__generation_of(kind) == generation:
+                    self.__entries[key] = (value, now)
+            return value
+
+    def invalidate(self, *kinds: str):
+        """Drop cached lists of given kinds (e.g. `networks`), all if none
+        are given. Kind of keyed lists (e.g. `host_nics`) drops all keys."""
+        with self.__lock:
+            if kinds:
+                for kind in kinds:
+                    self.__kind_generations[kind] = (
+                        self.__kind_generations.get(kind, 0) + 1
+                    )
+            else:
+                self.__generation += 1
+            for key in list(self.__entries):
+                if not kinds or self.__kind(key) in kinds:
+                    del self.__entries[key]
+
+    def clusters(self) -> dict:
+        """Clusters by name."""
+        return self.__get("clusters", lambda: {
+            c.name: c
+            for c in self.__system_service().clusters_service().list()
+        })
+
+    def data_centers(self) -> dict:
+        """Data centers by ID."""
+        return self.__get("data_centers", lambda: {
+            dc.id: dc
+            for dc in self.__system_service().data_centers_service().list()
+        })
+
+    def templates(self) -> set:
+        """Template names."""
+        return self.__get("templates", lambda: {
+            t.name
+            for t in self.__system_service().templates_service().list()
+        })
+
+    def networks(self) -> dict:
+        """Networks of all data centers by ID."""
+        return self.__get("networks", lambda: {
+            n.id: n
+            for n in self.__system_service().networks_service().list()
+        })
+
+    def vnic_profiles(self) -> list:
+        """All vNIC profiles."""
+        return self.__get(
+            "vnic_profiles",
+            lambda: self.__system_service().vnic_profiles_service().list()
+        )
+
+    def cluster_networks(self, cluster_id: str) -> list:
+        """Networks attached to cluster."""
+        return self.__get(
+            ("cluster_networks", cluster_id),
+            lambda: self.__system_service().clusters_service()
+            .cluster_service(cluster_id).networks_service().list()
+        )
+
+    def hosts(self) -> list:
+        """All hosts."""
+        return self.__get(
+            "hosts", lambda: self.__system_service().hosts_service().list()
+        )
+
+    def cluster_hosts(self, cluster_name: str) -> list:
+        """Hosts of cluster, found by engine search."""
+        return self.__get(
+            ("cluster_hosts", cluster_name),
+            lambda: self.__system_service().hosts_service().list(
+                search=f"cluster={_quote_search(cluster_name)}"
+            )
+        )
+
+    def host_nics(self, host_id: str) -> list:
+        """Host NICs."""
+        return self.__get(
+            ("host_nics", host_id),
+            lambda: self.__system_service().hosts_service()
+            .host_service(host_id).nics_service().list()
+        )
+
+    def __system_service(self):
+        return self.__connection.system_service()
+
+
+class _VmBuild:
+    """VM being created, passed between VM creation stages."""
+    __slots__ = ("config", "dpc", "system_service", "vm", "vm_service")
+
+    def __init__(self, config, system_service):
+        self.config = config
+        self.dpc = config["ovirt"]["engine"]
+        self.system_service = system_service
+        self.vm = None
+        self.vm_service = None
+
+    def __str__(self):
+        return f"VM {self.config['vm']['name']} ({self.dpc})"
+
+    @property
+    def as_dict(self) -> dict:
+        """VM id, name and engine. `id` is `None` until VM is cloned."""
+        return {
+            "id": self.vm.id if self.vm else None,
+            "name": self.config["vm"]["name"],
+            "engine": self.dpc
+        }
+
 
 class OvirtHelper(VirtProtocol):
     """Class required to perform different actions with oVirt hosted 
@@ -29,6 +295,10 @@ class OvirtHelper(VirtProtocol):
         self.__username = username
         self.__password = password
         self.__connections = {}
+        # One poller and jobs list per engine for all waits in it.
+        self.__pollers = {}
+        self.__engine_jobs = {}
+        self.__metadata = {}
         self.__logger = logger
 
     @property
@@ -57,6 +327,11 @@ class OvirtHelper(VirtProtocol):
                     f"Connected to {dpc} data processing center.",
                 )
                 self.__connections[dpc] = connection
+                self.__pollers[dpc] = Poller(name=f"poller_{dpc}")
+                self.__engine_jobs[dpc] = _EngineJobs(
+                    connection.system_service().jobs_service()
+                )
+                self.__metadata[dpc] = _EngineMetadata(connection)
             except sdk.ConnectionError as e:
                 self.__logger.log_error(
                     (
@@ -79,11 +354,15 @@ class OvirtHelper(VirtProtocol):
         Closing connections with engines and cleaning up all logger handlers.
         """
         for dpc in self.__dpc_list:
+            self.__pollers[dpc].stop()
             self.__connections[dpc].close()
             self.__logger.log_info(
                 f"Closed connection with {dpc} data processing center.",
             )
         self.__connections = {}
+        self.__pollers = {}
+        self.__engine_jobs = {}
+        self.__metadata = {}
 
     # TODO: check if necessary. Might be redundant. Could get creation
     # time from vm_service.
@@ -144,7 +423,7 @@ class OvirtHelper(VirtProtocol):
         """Get storage domain information from all engines.
 
         Returns:
-            storage domain list (dict): List of following parameters:
+            storage domain list (StorageRecord): List of following parameters:
             'uuid', 'name', 'engine', 'data_center', 'available', 'used', 
             'committed', 'total', 'percent_left', 'overprovisioning',
             'href', 'virtualization'.
@@ -167,27 +446,27 @@ class OvirtHelper(VirtProtocol):
                                 .get()
                             )
                             data_centers.add(data_center.name)
-                        result.append({
-                            "uuid": domain.id,
-                            "name": domain.name,
-                            "engine": dpc,
-                            "data_center": ' '.join(data_centers),
-                            "available": domain.available,
-                            "used": domain.used,
-                            "committed": domain.committed,
-                            "total": domain.available + domain.used,
-                            "percent_left": 100 - int(((100 * domain.used) 
-                                            / (domain.available + domain.used))),
-                            "overprovisioning": int((domain.committed * 100)
-                                                    / (domain.available
-                                                    + domain.used)),
-                            "href": (
+                        result.append(StorageRecord(
+                            uuid=domain.id,
+                            name=domain.name,
+                            engine=dpc,
+                            data_center=' '.join(data_centers),
+                            available=domain.available,
+                            used=domain.used,
+                            committed=domain.committed,
+                            total=domain.available + domain.used,
+                            percent_left=100 - int(((100 * domain.used)
+                                         / (domain.available + domain.used))),
+                            overprovisioning=int((domain.committed * 100)
+                                                 / (domain.available
+                                                 + domain.used)),
+                            href=(
                                 f"{Config.DPC_URLS[dpc][:-3]}"
                                 "webadmin/?locale=en_US#"
                                 f"storage-general;name={domain.name}"
                             ),
-                            "virtualization": self.pretty_name
-                        })
+                            virtualization=self.pretty_name
+                        ))
                     except TypeError as e:
                         self.__logger.log_error(e)
                         data_centers.add('-')
@@ -242,7 +521,7 @@ class OvirtHelper(VirtProtocol):
         """Get host ID, name, cluster and IP list.
         
         Returns:
-            host list (dict): List of following parameters:
+            host list (HostRecord): List of following parameters:
             'uuid', 'name', 'cluster', 'IP', 'engine', 'href'.
         """
         self.__rename_thread()
@@ -270,21 +549,21 @@ class OvirtHelper(VirtProtocol):
                         if nic.ip and nic.ip.address:
                             ip = nic.ip.address
                 result.append(
-                    {
-                        "uuid": host.id,
-                        "name": host.name, 
-                        "cluster": cluster.name,
-                        "status": f"{host.status}",
-                        "data_center": data_center.name,
-                        "ip": ip,
-                        "engine": dpc,
-                        "href": (
+                    HostRecord(
+                        uuid=host.id,
+                        name=host.name,
+                        cluster=cluster.name,
+                        status=f"{host.status}",
+                        data_center=data_center.name,
+                        ip=ip,
+                        engine=dpc,
+                        href=(
                             f"{Config.DPC_URLS[dpc][:-3]}"
                             "webadmin/?locale=en_US#"
                             f"hosts-general;name={host.name}"
                         ),
-                        "virtualization": self.pretty_name
-                    }
+                        virtualization=self.pretty_name
+                    )
                 )
             self.__logger.log_info(f"Finished collecting hosts from {dpc}.")
         return result
@@ -293,7 +572,7 @@ class OvirtHelper(VirtProtocol):
         """Get VM list as dictionary.
         
         Returns:
-            VM list (dict): List of following parameters:
+            VM list (VmRecord): List of following parameters:
             'uuid', 'name', 'hostname', 'state', 'IP', 'engine', 'host',
             'cluster', 'data_center', 'was_migrated', 'total_space',
             'storage_domains', 'href', 'virtualization'.
@@ -432,10 +711,72 @@ class OvirtHelper(VirtProtocol):
 
                 vm_data["virtualization"] = self.pretty_name
 
-                result.append(vm_data)
+                # Only one VM is kept as dict at a time.
+                result.append(VmRecord(**vm_data))
             self.__logger.log_info(f"Finished collecting VMs from {dpc}.")
         return result
 
+    def __wait(self, dpc: str, check, timeout: float, description: str):
+        """Wait for `check` in engine poller thread."""
+        self.__logger.log_debug(f"Waiting for {description}...")
+        return self.__pollers[dpc].wait(check, timeout, description)
+
+    def __wait_vm_status(
+        self, dpc: str, vm_service, status, timeout: float = VM_STATUS_TIMEOUT
+    ):
+        """Wait for VM to get `status`."""
+        self.__wait(
+            dpc,
+            lambda: vm_service.get().status == status,
+            timeout,
+            f"VM status {status}"
+        )
+
+    def __wait_disk_unlocked(
+        self,
+        dpc: str,
+        disk_service,
+        correlation_id: str = None,
+        description: str = "disk LOCKED status release"
+    ):
+        """Wait for disk to leave LOCKED status.
+
+        If disk action was marked with `correlation_id`, its engine jobs are
+        awaited instead.
+        """
+        def is_unlocked():
+            return disk_service.get().status != sdk.types.DiskStatus.LOCKED
+
+        if correlation_id is None:
+            self.__wait(dpc, is_unlocked, DISK_TIMEOUT, description)
+        else:
+            self.__wait_job(
+                dpc, correlation_id, is_unlocked, DISK_TIMEOUT, description
+            )
+
+    def __wait_job(
+        self,
+        dpc: str,
+        correlation_id: str,
+        fallback,
+        timeout: float,
+        description: str
+    ):
+        """Wait for engine jobs of action with `correlation_id` to finish.
+
+        While engine has no jobs with this ID, `fallback` check of entity
+        itself is used.
+        """
+        jobs = self.__engine_jobs[dpc]
+
+        def check():
+            finished = jobs.is_finished(correlation_id)
+            return fallback() if finished is None else finished
+        try:
+            self.__wait(dpc, check, timeout, description)
+        finally:
+            jobs.forget(correlation_id)
+
     def create_vm(self, config):
         """Create VM in target oVirt engine.
         
@@ -487,19 +828,87 @@ class OvirtHelper(VirtProtocol):
                 }
             ]
             ```
-        Returns VM data as dict from oVirt if success, -1 otherwise.
+        Returns VM data as dict from oVirt if success, `None` otherwise.
         """
         self.__rename_thread()
+        dpc = config["ovirt"]["engine"]
+        build = _VmBuild(config, self.__connections[dpc].system_service())
+        try:
+            self.__clone_vm(build)
+            self.__setup_vm_disks(build)
+            self.__setup_vm_network(build)
+            self.__boot_vm(build)
+        except (sdk.Error, WaitTimeoutError) as e:
+            self.__logger.log_error(
+                f"Could not create VM {config['vm']['name']}. Reason: {e}."
+            )
+            return None
+        return build.as_dict
+
+    def provision_vms(self, configs: list) -> dict:
+        """Create many VMs with overlapping creation stages.
+
+        Every VM goes through stages clone -> disks -> network -> boot, but
+        while one VM boots, others are already cloned or get their disks.
+        Clones run in parallel up to `CLONE_CONCURRENCY` per storage domain,
+        disk operations - up to `DISK_CONCURRENCY` per engine.
 
-        # Try find VM with current VM name. If VM exists create corresponding
-        # log entry and close function.
-        system_service = self.__connections[
-            config["ovirt"]["engine"]
-        ].system_service()
-        vms_service = system_service.vms_service()
+        Args:
+            configs (list): VM configs, same as for `create_vm`.
 
-        # Creating VM
-        vm = sdk.types.Vm(
+        Returns:
+            dict: `vms` - result for each VM (with `error` and `failed_stage`
+                if its creation failed), `stages` - progress and throughput
+                of each stage.
+        """
+        self.__rename_thread()
+        builds = [
+            _VmBuild(
+                config,
+                self.__connections[config["ovirt"]["engine"]].system_service()
+            )
+            for config in configs
+        ]
+        pipeline = Pipeline(
+            [
+                Stage(
+                    "clone",
+                    self.__clone_vm,
+                    workers=PROVISION_WORKERS,
+                    limit_key=lambda b: (
+                        b.dpc, b.config["ovirt"]["storage_domain"]
+                    ),
+                    limit=CLONE_CONCURRENCY
+                ),
+                Stage(
+                    "disks",
+                    self.__setup_vm_disks,
+                    workers=PROVISION_WORKERS,
+                    limit_key=lambda b: b.dpc,
+                    limit=DISK_CONCURRENCY
+                ),
+                Stage(
+                    "network",
+                    self.__setup_vm_network,
+                    workers=PROVISION_WORKERS
+                ),
+                Stage("boot", self.__boot_vm, workers=PROVISION_WORKERS),
+            ],
+            name=f"provision_{'^'.join(self.__dpc_list)}",
+            logger=self.__logger
+        )
+        vms = []
+        for result in pipeline.run(builds):
+            vm = result.item.as_dict
+            if not result.ok:
+                vm["error"] = str(result.error) or repr(result.error)
+                vm["failed_stage"] = result.failed_stage
+            vms.append(vm)
+        return {"vms": vms, "stages": pipeline.stats}
+
+    def __make_vm_type(self, config):
+        """Build new VM definition from VM config."""
+        return sdk.types.Vm(
             name=config["vm"]["name"],
             cluster=sdk.types.Cluster(
                 name=config["ovirt"]["cluster"]
@@ -560,74 +969,99 @@ class OvirtHelper(VirtProtocol):
                 )
             )
         )
-        try:
-            vm = vms_service.add(vm, clone=True)
-            self.__logger.log_info(f"Creating VM {vm.name}.")
-
-            # After creating VM we have to shut it down to apply new hardware
-            # and software options.
-            vm_service = vms_service.vm_service(vm.id)
-            while vm_service.get().status != sdk.types.VmStatus.DOWN:
-                self.__logger.log_debug(
-                    "Waiting for VM status set to DOWN "
-                    "(ready for next setup)..."
-                )
-                time.sleep(10)
-            self.__logger.log_info(f"Created VM {vm.name}.")
 
-            # Disks operations.
-            self.__extend_vm_root_disk(system_service, vm, vm_service, config)
-            self.__create_vm_extra_disks(
-                system_service, vm, vm_service, config
-            )
-
-            # Network operations.
-            self.__set_vm_network(system_service, vm_service, config)
-
-            # After applying changes VM will be locked, so wait until lockdown
-            # is released.
-            while vm_service.get().status != sdk.types.VmStatus.DOWN:
-                self.__logger.log_debug(
-                    "Waiting system service to release VM's LOCKED status..."
+    def __clone_vm(self, build):
+        """Clone VM from template and wait until it is ready for setup."""
+        # Failing early on missing template instead of engine error after
+        # clone request. Cache is refreshed once in case template is new.
+        template = build.config["vm"]["template"]
+        metadata = self.__metadata[build.dpc]
+        if template not in metadata.templates():
+            metadata.invalidate("templates")
+            if template not in metadata.templates():
+                raise sdk.Error(
+                    f"Template {template} not found in {build.dpc}."
                 )
-                time.sleep(10)
+        vms_service = build.system_service.vms_service()
+        correlation_id = str(uuid.uuid4())
+        vm = vms_service.add(
+            self.__make_vm_type(build.config),
+            clone=True,
+            query={"correlation_id": correlation_id}
+        )
+        build.vm = vm
+        self.__logger.log_info(f"Creating VM {vm.name}.")
+
+        # After creating VM we have to shut it down to apply new hardware
+        # and software options.
+        vm_service = vms_service.vm_service(vm.id)
+        build.vm_service = vm_service
+        self.__wait_job(
+            build.dpc,
+            correlation_id,
+            lambda: vm_service.get().status == sdk.types.VmStatus.DOWN,
+            VM_CLONE_TIMEOUT,
+            f"VM {vm.name} clone (ready for next setup)"
+        )
+        self.__wait_vm_status(build.dpc, vm_service, sdk.types.VmStatus.DOWN)
+        self.__logger.log_info(f"Created VM {vm.name}.")
 
-            # Starting VM via CloudInit.
-            vm_service.start()
+    def __setup_vm_disks(self, build):
+        """Resize root disk and add extra disks."""
+        self.__extend_vm_root_disk(
+            build.system_service, build.vm, build.vm_service, build.config
+        )
+        self.__create_vm_extra_disks(
+            build.system_service, build.vm, build.vm_service, build.config
+        )
 
-            # Restrating VM to fix fstab.
-            while vm_service.get().status != sdk.types.VmStatus.UP:
-                self.__logger.log_debug("Waiting VM to start...")
-                time.sleep(10)
-            # Waiting 60 second for VM to properly start.
-            time.sleep(60)
-            self.__logger.log_info(
-                "Issued VM reset to fix possible fstab malfunction."
-            )
-            vm_service.reset()
+    def __setup_vm_network(self, build):
+        """Connect VM to VLAN from config."""
+        self.__set_vm_network(
+            build.system_service, build.vm_service, build.config
+        )
 
-            # Finalizing VM.
-            while vm_service.get().status != sdk.types.VmStatus.UP:
-                self.__logger.log_debug("Waiting VM to start...")
-                time.sleep(10)
-            self.__logger.log_info(
-                f"VM {vm.name} in dpc {config['ovirt']['engine']} created "
-                "and operational."
+    def __boot_vm(self, build):
+        """Start VM with CloudInit and reset it after first boot."""
+        dpc = build.dpc
+        vm_service = build.vm_service
+        # After applying changes VM will be locked, so wait until lockdown
+        # is released.
+        self.__wait_vm_status(dpc, vm_service, sdk.types.VmStatus.DOWN)
+
+        # Starting VM via CloudInit.
+        vm_service.start()
+
+        # Restrating VM to fix fstab.
+        self.__wait_vm_status(dpc, vm_service, sdk.types.VmStatus.UP)
+        up_at = time.monotonic()
+        # Giving VM time to properly start: until guest agent reports
+        # devices, but no longer than `GUEST_BOOT_TIMEOUT`.
+        try:
+            self.__wait(
+                dpc,
+                lambda: vm_service.reported_devices_service().list(),
+                GUEST_BOOT_TIMEOUT,
+                "guest agent"
             )
+        except WaitTimeoutError:
+            pass
+        # Guest agent may start before CloudInit is done.
+        time.sleep(max(GUEST_BOOT_MIN_TIME - (time.monotonic() - up_at), 0))
+        self.__logger.log_info(
+            "Issued VM reset to fix possible fstab malfunction."
+        )
+        vm_service.reset()
 
-            return {
-                "id": vm.id, 
-                "name": vm.name, 
-                "engine": config["ovirt"]["engine"]
-            } if vm else -1
-
-        except sdk.Error as e:
-            self.__logger.log_error(
-                f"Could not create VM {config['vm']['name']}. Reason: {e}."
-            )
+        # Finalizing VM.
+        self.__wait_vm_status(dpc, vm_service, sdk.types.VmStatus.UP)
+        self.__logger.log_info(
+            f"VM {build.vm.name} in dpc {dpc} created and operational."
+        )
 
     def __extend_vm_root_disk(self, system_service, vm, vm_service, config):
         """Extend VM root disk size to one set in config dict."""
+        dpc = config["ovirt"]["engine"]
         # Extending root disk to a number set in disk list on vm_config.
         disk_attachments_service = vm_service.disk_attachments_service()
         disk_attachments = disk_attachments_service.list()
@@ -641,11 +1075,7 @@ class OvirtHelper(VirtProtocol):
             )
 
             # Waiting for disk to be created
-            while disk_service.get().status == sdk.types.DiskStatus.LOCKED:
-                self.__logger.log_debug(
-                    "Waiting system service to release disks LOCKED status..."
-                )
-                time.sleep(10)
+            self.__wait_disk_unlocked(dpc, disk_service)
             for disk_config in config["vm"]["disks"]:
                 if int(disk_config["type"]) == 1 and disk_config['size'] > 30:
                     self.__logger.log_debug(
@@ -655,49 +1085,58 @@ class OvirtHelper(VirtProtocol):
                             "than 30 gb."
                         )
                     )
+                    correlation_id = str(uuid.uuid4())
                     disk_service.update(
                         disk=sdk.types.Disk(
                             # Disk with root partition should always be
                             # first in the list.
                             provisioned_size=disk_config["size"] * 2**30,
                             bootable=True
-                        )
+                        ),
+                        query={"correlation_id": correlation_id}
                     )
 
                     # Waiting to apply disk changes.
-                    while (
-                        disk_service.get().status == sdk.types.DiskStatus.LOCKED
-                    ):
-                        self.__logger.log_debug(
-                            "Waiting system service to release disks LOCKED status..."
-                        )
-                        time.sleep(10)
+                    self.__wait_disk_unlocked(
+                        dpc,
+                        disk_service,
+                        correlation_id,
+                        f"root disk resize of VM {vm.name}"
+                    )
 
                     # Setting disk name and label.
+                    correlation_id = str(uuid.uuid4())
                     disk_service.update(
                         disk=sdk.types.Disk(
                             name=f"{vm.name}-root-disk-1",
                             logical_name="sda"
-                        )
+                        ),
+                        query={"correlation_id": correlation_id}
                     )
 
                     # Waiting to apply disk changes.
-                    while disk_service.get().status == sdk.types.DiskStatus.LOCKED:
-                        self.__logger.log_debug(
-                            ("Waiting system service to release disks LOCKED"
-                             " status...")
-                        )
-                        time.sleep(10)
+                    self.__wait_disk_unlocked(
+                        dpc,
+                        disk_service,
+                        correlation_id,
+                        f"root disk rename of VM {vm.name}"
+                    )
                     self.__logger.log_info(
                         f"Disk with root partition extended for VM {vm.name},"
                         f" with ID {vm.id}."
                     )
 
     def __create_vm_extra_disks(self, system_service, vm, vm_service, config):
-        """Create additional disks for VM, as stated in VM config dict."""
+        """Create additional disks for VM, as stated in VM config dict.
+
+        All disks are requested at once and awaited together afterwards, so
+        engine creates them in parallel.
+        """
+        dpc = config["ovirt"]["engine"]
         disk_attachments_service = vm_service.disk_attachments_service()
         # Adding disks, if corresponding disk list on vm_config has more than
         # one element.
+        pending = []
         if len(config["vm"]["disks"]) > 1:
             disk_index = 1
             for disk in config["vm"]["disks"]:
@@ -715,6 +1154,7 @@ class OvirtHelper(VirtProtocol):
                     disk_index += 1
 
                     # Attaching disk to VM.
+                    correlation_id = str(uuid.uuid4())
                     disk_attachment = disk_attachments_service.add(
                         sdk.types.DiskAttachment(
                             disk=sdk.types.Disk(
@@ -739,7 +1179,8 @@ class OvirtHelper(VirtProtocol):
                             bootable=False,
                             active=True,
                             interface=sdk.types.DiskInterface.VIRTIO_SCSI,
-                        )
+                        ),
+                        query={"correlation_id": correlation_id}
                     )
                     self.__logger.log_debug(
                         "Created disk_attachment variable "
@@ -751,25 +1192,32 @@ class OvirtHelper(VirtProtocol):
                     self.__logger.log_debug(
                         f"Found disk_attachment service (disk #{disk_index})"
                     )
+                    pending.append(
+                        (disk_index, disk_attachment, disk_service,
+                         correlation_id)
+                    )
 
-                    # Waiting to apply disk changes
-                    while disk_service.get().status == sdk.types.DiskStatus.LOCKED:
-                        self.__logger.log_debug(
-                            "Waiting system service to release disks LOCKED"
-                            " status..."
-                        )
-                        time.sleep(10)
+        # Waiting to apply disk changes.
+        for disk_index, disk_attachment, disk_service, correlation_id in (
+            pending
+        ):
+            self.__wait_disk_unlocked(
+                dpc,
+                disk_service,
+                correlation_id,
+                f"disk #{disk_index} creation for VM {vm.name}"
+            )
 
-                    if disk_attachment:
-                        self.__logger.log_info(
-                            f"Created additional disk for VM {vm.name}, with "
-                            "ID {vm.id}."
-                        )
-                    else:
-                        self.__logger.log_error(
-                            "Failed to create disk with root partition for VM"
-                            f" {vm.name}, with ID {vm.id}."
-                        )
+            if disk_attachment:
+                self.__logger.log_info(
+                    f"Created additional disk for VM {vm.name}, with "
+                    "ID {vm.id}."
+                )
+            else:
+                self.__logger.log_error(
+                    "Failed to create disk with root partition for VM"
+                    f" {vm.name}, with ID {vm.id}."
+                )
 
     def __set_vm_network(self, system_service, vm_service, config):
         """Change VM vNIC (VLAN)."""
@@ -800,47 +1248,47 @@ class OvirtHelper(VirtProtocol):
             )
 
     def __get_vnic_profile(self, system_service, config):
-        """Return vNIC profile ID if exists, -1 otherwise.
+        """Return vNIC profile ID if exists, `None` otherwise.
         
         In order to determine if VLAN exists in current data center it is
         necessary to find corresponding network by vNIC profile.
         If VLAN exists - return its ID.
-        If VLAN doesn't exist - return -1.
+        If VLAN doesn't exist - return `None`.
+
+        Profiles and networks are taken from engine metadata cache. If
+        profile is not found there, cache is refreshed once: VLAN might have
+        been created after cache was filled.
         """
-        vnic_profiles_service = system_service.vnic_profiles_service()
-        networks_service = system_service.networks_service()
-        vnic_profile_id = None
-        for profile in vnic_profiles_service.list():
-            if profile and profile.network.id:
-                network = networks_service.network_service(
-                    profile.network.id
-                ).get()
-                data_center_id = self.__get_data_center(system_service, config)
+        metadata = self.__metadata[config["ovirt"]["engine"]]
+        data_center_id = self.__get_data_center(system_service, config)
+        if not data_center_id:
+            return None
+        for refresh in (False, True):
+            if refresh:
+                metadata.invalidate("vnic_profiles", "networks")
+            networks = metadata.networks()
+            for profile in metadata.vnic_profiles():
+                if not (profile and profile.network and profile.network.id):
+                    continue
+                network = networks.get(profile.network.id)
                 if (network
+                    and network.vlan
                     and network.vlan.id == config["vlan"]["id"]
-                    and data_center_id
                     and network.data_center.id == data_center_id):
-                    vnic_profile_id = profile.id
-                    break
-        return vnic_profile_id
+                    return profile.id
+        return None
 
     def __get_data_center(self, system_service, config):
         """Return data center ID if cluster set in config exists.
 
         `None` otherwise.
         """
-        data_center_id = None
-        clusters_service = system_service.clusters_service()
-        for cluster in clusters_service.list():
-            if cluster.name == config["ovirt"]["cluster"]:
-                data_centers_service = system_service.data_centers_service()
-                data_center = (
-                    data_centers_service
-                    .data_center_service(cluster.data_center.id)
-                    .get()
-                )
-                data_center_id = data_center.id
-        return data_center_id
+        # pylint: disable=unused-argument
+        metadata = self.__metadata[config["ovirt"]["engine"]]
+        cluster = metadata.clusters().get(config["ovirt"]["cluster"])
+        if cluster is None or cluster.data_center is None:
+            return None
+        return cluster.data_center.id
 
     def create_vlan(self, config):
         # TODO: change checking if VLAN exists logic
@@ -871,37 +1319,81 @@ class OvirtHelper(VirtProtocol):
                 ]
             ```
         """
-        self.__rename_thread()
+        self.create_vlans([config])
+
+    def create_vlans(self, configs: list) -> dict:
+        """Create VLANs and attach them to hosts of their clusters.
 
-        system_service = self.__connections[
-            config['ovirt']['engine']
-        ].system_service()
+        Networks are created in data centers and clusters one by one, then
+        all networks for the same host are attached by single
+        `setup_networks` call. Hosts are set up in parallel, no more than
+        `HOST_SETUP_CONCURRENCY` at a time.
 
+        Args:
+            configs (list): VLAN configs, same as for `create_vlan`.
+
+        Returns:
+            dict: DPC -> host name -> attached networks count or error
+                message.
+        """
+        self.__rename_thread()
         self.remove_unmanaged_vlan()
 
-        # Getting data center service. Also getting cluster service and full
-        # list of clusters.
+        # (DPC, host ID) -> host name and network ID -> host NIC ID.
+        host_attachments = {}
+        for config in configs:
+            dpc = config["ovirt"]["engine"]
+            prepared = self.__prepare_vlan(config)
+            if prepared is None:
+                continue
+            vlan, target_cluster = prepared
+            # Only hosts of target cluster, found by engine search.
+            for host in self.__metadata[dpc].cluster_hosts(
+                target_cluster.name
+            ):
+                for nic in self.__metadata[dpc].host_nics(host.id):
+                    if nic.name == config["ovirt"]["host_nic"]:
+                        host_attachments.setdefault(
+                            (dpc, host.id), (host.name, {})
+                        )[1][vlan.id] = nic.id
+        return self.__attach_networks(host_attachments)
+
+    def __prepare_vlan(self, config):
+        """Create VLAN network in data center and cluster, if it is absent.
+
+        Returns:
+            tuple: VLAN network and target cluster. `None` if target cluster
+                was not found.
+        """
+        dpc = config['ovirt']['engine']
+        system_service = self.__connections[dpc].system_service()
+        metadata = self.__metadata[dpc]
+
+        # Getting data center service and cluster service. Clusters, data
+        # centers, networks and hosts are listed once per engine through
+        # metadata cache and invalidated after changes.
         dcs_service = system_service.data_centers_service()
         clusters_service = system_service.clusters_service()
-        clusters = clusters_service.list()
 
         # Defining where to put VLAN, based on cluster in prepared/raw VLAN
         # JSON config.
-        target_dc = None
-        target_cluster = None
         self.__logger.log_info(
             "Checking if there is target cluster and data center."
         )
-        for cluster in clusters:
-            if cluster.name == config["ovirt"]["cluster"]:
-                target_cluster = cluster
-                target_dc = dcs_service.data_center_service(
-                    cluster.data_center.id
-                ).get()
-                break
+        target_cluster = metadata.clusters().get(config["ovirt"]["cluster"])
+        target_dc = (
+            metadata.data_centers().get(target_cluster.data_center.id)
+            if target_cluster is not None else None
+        )
+        if target_dc is None:
+            self.__logger.log_error(
+                f"No cluster {config['ovirt']['cluster']} with data center "
+                f"found in {dpc}!"
+            )
+            return None
 
-        # Getting target data center's network service. Getting list of all
-        # networks in DC to check if vlans already exist.
+        # Getting target data center's network service. Checking networks of
+        # DC if vlans already exist.
         self.__logger.log_info(
             f"Checking if VLAN {config['vlan']['name']} with ID "
             f"{config['vlan']['id']} exists in current data center."
@@ -909,7 +1401,10 @@ class OvirtHelper(VirtProtocol):
         dc_network_service = dcs_service.service(
             target_dc.id
         ).networks_service()
-        dc_networks = dc_network_service.list()
+        dc_networks = [
+            n for n in metadata.networks().values()
+            if n.data_center and n.data_center.id == target_dc.id
+        ]
         current_vlan_exists = False
         for dc_network in dc_networks:
             if dc_network.vlan and dc_network.vlan.id == config["vlan"]["id"]:
@@ -940,12 +1435,14 @@ class OvirtHelper(VirtProtocol):
                     required=False
                 )
             )
+            # New VM network also gets default vNIC profile.
+            metadata.invalidate("networks", "vnic_profiles")
 
         # Adding VLAN via cluster, to populate it across all hosts
         cluster_networks_service = clusters_service.cluster_service(
             target_cluster.id
         ).networks_service()
-        cluster_networks = cluster_networks_service.list()
+        cluster_networks = metadata.cluster_networks(target_cluster.id)
         current_vlan_exists = False
         for cluster_network in cluster_networks:
             if cluster_network.vlan and cluster_network.vlan.id and \
@@ -963,44 +1460,57 @@ class OvirtHelper(VirtProtocol):
                     required=False
                 )
             )
+            metadata.invalidate("cluster_networks")
 
-        # Getting list of all hosts to perform check to define if vlan is
-        # already attached to host.
-        hosts_service = system_service.hosts_service()
-        hosts = hosts_service.list()
-        for host in hosts:
-
-            # Checking host <-> cluster.
-            host_cluster = self.__connections[
-                config['ovirt']['engine']
-            ].follow_link(host.cluster)
-            if host_cluster.name == config["ovirt"]["cluster"]:
-                self.__logger.log_info(
-                    f"Attaching VLAN to host {host.name}."
-                )
-                host_service = hosts_service.host_service(host.id)
-
-                # Specific host nics service.
-                nics_service = host_service.nics_service()
-                nics = nics_service.list()
-                current_vlan_exists = False
-                for nic in nics:
-                    if nic.name == config["ovirt"]["host_nic"]:
-                        if not current_vlan_exists:
-                            host_service.setup_networks(
-                                modified_bonds=[],
-                                modified_network_attachments=[
-                                    sdk.types.NetworkAttachment(
-                                        network=sdk.types.Network(id=vlan.id),
-                                        host_nic=sdk.types.HostNic(id=nic.id)
-                                    )
-                                ]
-                            )
+        return vlan, target_cluster
 
+    def __attach_networks(self, host_attachments: dict) -> dict:
+        """Attach networks to hosts, one `setup_networks` per host."""
+        def attach(dpc, host_id, host_name, networks):
+            self.__logger.log_info(
+                f"Attaching {len(networks)} VLAN(s) to host {host_name}."
+            )
+            hosts_service = (
+                self.__connections[dpc].system_service().hosts_service()
+            )
+            hosts_service.host_service(host_id).setup_networks(
+                modified_bonds=[],
+                modified_network_attachments=[
+                    sdk.types.NetworkAttachment(
+                        network=sdk.types.Network(id=network_id),
+                        host_nic=sdk.types.HostNic(id=nic_id)
+                    )
+                    for network_id, nic_id in networks.items()
+                ]
+            )
+            self.__metadata[dpc].invalidate("host_nics")
+
+        results = {}
+        with ThreadPoolExecutor(
+            max_workers=HOST_SETUP_CONCURRENCY,
+            thread_name_prefix="setup_networks"
+        ) as executor:
+            futures = {
+                executor.submit(attach, dpc, host_id, host_name, networks):
+                    (dpc, host_name, len(networks))
+                for (dpc, host_id), (host_name, networks)
+                in host_attachments.items()
+            }
+            # Hosts of different engines may have same names.
+            for future, (dpc, host_name, count) in futures.items():
+                try:
+                    future.result()
+                    results.setdefault(dpc, {})[host_name] = count
+                except sdk.Error as e:
+                    self.__logger.log_error(
+                        f"Failed to attach VLANs to host {host_name} "
+                        f"({dpc}): {e}."
+                    )
+                    results.setdefault(dpc, {})[host_name] = str(e)
         self.__logger.log_info(
-            f"Network {config['vlan']['name']} created and attached to all "
-            "hosts."
+            f"VLANs attached to {len(futures)} host(s)."
         )
+        return results
 
     def remove_unmanaged_vlan(self, vlan_list: list=None) -> dict:
         """Usually after removing VLAN from oVirt, it remains attached to
@@ -1014,7 +1524,7 @@ class OvirtHelper(VirtProtocol):
                 )
             for dpc, connection in self.__connections.items():
                 hosts_service = connection.system_service().hosts_service()
-                for host in hosts_service.list():
+                for host in self.__metadata[dpc].hosts():
                     unmng_netwks_service = hosts_service.host_service(
                         host.id
                     ).unmanaged_networks_service()
@@ -1038,7 +1548,7 @@ class OvirtHelper(VirtProtocol):
 
         return {"response": 200, "vlan_list": vlan_list}
 
-    def set_vm_ha(self, vm_filter: dict=None) -> dict:
+    def set_vm_ha(self, vm_filter: dict=None) -> list:
         """Enable VM high availability parameter.
         
         Args:
@@ -1053,173 +1563,314 @@ class OvirtHelper(VirtProtocol):
                 ```
 
         Returns:
-            dict: Function reply with success/fail description.
+            list: Result of each VM: `success` or `error` key with VM name,
+                `engine`, `id` and `time` (seconds spent on VM update).
 
         If at least one of `vm_names`/`vm_ids` arguments (list) are set, only
         particular VMs will be set to HA. If no VMs found error will be
-        returned in dict.
+        logged.
         
         If `vm_env` is set, only a certain group of VMs will be set to HA.
         Viable `vm_env` parameters are 'test' and 'prod' (so far).
 
         If no parameters are set, exception will be thrown and nothing will be
         done.
+
+        VMs are found by engine search (`name="a" or name="b"`, in chunks of
+        `HA_SEARCH_CHUNK`) together with their disks, and updated in
+        parallel, no more than `HA_UPDATE_CONCURRENCY` at a time.
         """
-        result = []
+        # Engine search treats `*` as wildcard, so found VMs are checked to
+        # have exactly requested name or ID.
+        field, wanted = None, None
         if "vm_names" in vm_filter and vm_filter["vm_names"] is not None:
-            for dpc, connection in self.__connections.items():
-                system_service = connection.system_service()
-                vms = system_service.vms_service().list()
-                vms = (vm for vm in vms if vm.name in vm_filter["vm_names"])
-                if vms is None:
-                    self.__logger.log_error(
-                        f"No VMs with names {vm_filter['vm_name']} have been "
-                        f"found in {dpc} engine."
-                    )
-                    raise ValueError(
-                        f"No VMs with names {vm_filter['vm_name']} have been "
-                        f"found in {dpc} engine."
-                    )
-                else:
-                    for vm in vms:
-                        result.append(
-                            self.__set_vm_ha_parameter(system_service, vm)
-                        )
+            description = f"names {vm_filter['vm_names']}"
+            field, wanted = "name", vm_filter["vm_names"]
         elif "vm_ids" in vm_filter and vm_filter["vm_ids"] is not None:
-            for dpc, connection in self.__connections.items():
-                system_service = connection.system_service()
-                vms = system_service.vms_service().list()
-                vms = (vm for vm in vms if vm.id in vm_filter["vm_ids"])
-                if vms is None:
-                    self.__logger.log_error(
-                        f"No VMs with ids {vm_filter['vm_ids']} have been "
-                        f"found in {dpc} engine."
-                    )
-                    raise ValueError(
-                        f"No VMs with ids {vm_filter['vm_ids']} have been "
-                        f"found in {dpc} engine."
-                    )
-                else:
-                    for vm in vms:
-                        result.append(
-                            self.__set_vm_ha_parameter(system_service, vm)
-                        )
+            description = f"ids {vm_filter['vm_ids']}"
+            field, wanted = "id", vm_filter["vm_ids"]
         elif "vm_env" in vm_filter and vm_filter["vm_env"] is not None:
-            for dpc, connection in self.__connections.items():
-                system_service = connection.system_service()
-                vms = system_service.vms_service().list()
-                vms = (vm for vm in vms if vm_filter["vm_env"] in vm.comment)
-                if vms is None:
-                    self.__logger.log_error(
-                        f"No VMs with environment {vm_filter['vm_env']} have "
-                        f"been found in {dpc} engine."
-                    )
-                    raise ValueError(
-                        f"No VMs with environment {vm_filter['vm_env']} have "
-                        f"been found in {dpc} engine."
-                    )
-                else:
-                    for vm in vms:
-                        result.append(
-                            self.__set_vm_ha_parameter(system_service, vm)
-                        )
+            description = f"environment {vm_filter['vm_env']}"
+            queries = [f"comment=*{vm_filter['vm_env']}*"]
         else:
             raise KeyError(
                 "Bad filter. No valid parameters specified. Valid parameters:"
                 " 'vm_name', 'vm_id', 'vm_env'"
             )
+        if field is not None:
+            queries = self.__search_queries(field, wanted)
+            wanted = {str(value) for value in wanted}
+
+        result = []
+        with ThreadPoolExecutor(
+            max_workers=HA_UPDATE_CONCURRENCY, thread_name_prefix="vm_ha"
+        ) as executor:
+            futures = []
+            for dpc, connection in self.__connections.items():
+                system_service = connection.system_service()
+                vms_service = system_service.vms_service()
+                found = 0
+                for query in queries:
+                    # Disks are fetched with VMs, so there are no requests
+                    # per VM to find lease storage domain.
+                    for vm in vms_service.list(
+                        search=query, follow="disk_attachments.disk"
+                    ):
+                        if field is not None and getattr(
+                            vm, field
+                        ) not in wanted:
+                            continue
+                        found += 1
+                        futures.append(executor.submit(
+                            self.__set_vm_ha_parameter,
+                            system_service, vm, dpc
+                        ))
+                if not found:
+                    self.__logger.log_error(
+                        f"No VMs with {description} have been found in {dpc} "
+                        "engine."
+                    )
+            for future in futures:
+                result.append(future.result())
         return result
 
+    @staticmethod
+    def __search_queries(field: str, values: list) -> list[str]:
+        """Engine search queries `field="a" or field="b"`, chunk of values
+        each.
+        """
+        return [
+            " or ".join(
+                f"{field}={_quote_search(value)}"
+                for value in values[i:i + HA_SEARCH_CHUNK]
+            )
+            for i in range(0, len(values), HA_SEARCH_CHUNK)
+        ]
+
     def __set_vm_ha_parameter(
-        self, ss: sdk.services.SystemService, vm: sdk.types.Vm
+        self, ss: sdk.services.SystemService, vm: sdk.types.Vm, dpc: str
     ) -> dict:
         """Set HA parameter for concrete VM.
         
         Args:
             ss (ovirtsdk4.services.SystemService): Connection's service.
-            vm (ovirtsdk4.types.Vm): VM entity.
+            vm (ovirtsdk4.types.Vm): VM entity, with followed disk
+                attachments and disks.
+            dpc (str): VM engine.
 
         Returns:
             dict: Resulting message. Could be error or success key.
         """
-        result = {}
-        vm_service = ss.vms_service().vm_service(vm.id)
-        disk_att_service = vm_service.disk_attachments_service()
-        disk_attachments = disk_att_service.list()
-        # Disk storage domain.
+        start = time.monotonic()
+        result = {"engine": dpc, "id": vm.id}
+        # Bootable disk storage domain.
         disk_sd = None
-        if disk_attachments:
-            for disk_attachment in disk_attachments:
-                disk = ss.disks_service().disk_service(
-                    disk_attachment.disk.id
-                ).get()
-                if disk_attachment.bootable:
-                    disk_sd = disk.storage_domains[0]
+        for disk_attachment in vm.disk_attachments or []:
+            disk = disk_attachment.disk
+            if (disk_attachment.bootable
+                and disk is not None
+                and disk.storage_domains):
+                disk_sd = disk.storage_domains[0]
         if disk_sd is not None:
             self.__logger.log_info(
                 f"Enabling HA for {vm.name}."
             )
-            vm_service.update(
-                vm=sdk.types.Vm(
-                    high_availability=sdk.types.HighAvailability(
-                        enabled=True
-                    ),
-                    lease=(
-                        sdk.types.StorageDomainLease(
-                            storage_domain=disk_sd
+            try:
+                ss.vms_service().vm_service(vm.id).update(
+                    vm=sdk.types.Vm(
+                        high_availability=sdk.types.HighAvailability(
+                            enabled=True
+                        ),
+                        lease=(
+                            sdk.types.StorageDomainLease(
+                                storage_domain=sdk.types.StorageDomain(
+                                    id=disk_sd.id
+                                )
+                            )
                         )
                     )
                 )
-            )
-            result["success"] = vm.name
+                result["success"] = vm.name
+            except sdk.Error as e:
+                self.__logger.log_error(
+                    f"Failed to enable HA for {vm.name}: {e}."
+                )
+                result["error"] = vm.name
+                result["reason"] = str(e)
         else:
             self.__logger.log_error(
                 f"Failed to enable HA for {vm.name}. No storage"
                 " domain found."
             )
             result["error"] = vm.name
+        result["time"] = round(time.monotonic() - start, 3)
         return result
 
     def set_vm_description(self) -> dict:
         """Change VM description to be JSON with correct fields for Elma."""
-        # Get VM list.
+        return self.migrate_vm_descriptions("normalize")
+
+    def migrate_vm_descriptions(
+        self, mode: str = "normalize", dry_run: bool = False,
+        checkpoint: str = None
+    ) -> dict:
+        """Bring descriptions of all VMs in all engines to one format.
+
+        First new descriptions are computed for all VMs (dry run), then only
+        changed ones are updated, in parallel and no faster than
+        `DESC_UPDATES_PER_SECOND` per engine.
+
+        Args:
+            mode (str): `normalize` - JSON with Elma fields (see
+                `set_vm_description`), `clean` - empty description instead of
+                JSON without data (see `clean_desc`).
+            dry_run (bool): Only compute changes, don't apply them.
+            checkpoint (str): File with updated VMs. Updated VMs are appended
+                to it with mode and new description, and VMs from it are
+                skipped if both match, so interrupted migration can be
+                restarted, in any mode, with the same file.
+
+        Returns:
+            dict: `planned` count of changes. Without `dry_run` also
+                `applied`, `skipped` (found in checkpoint) and `failed` VMs;
+                with `dry_run` - `changes` themselves.
+        """
+        changes = self.plan_vm_descriptions(mode)
+        if dry_run:
+            return {"planned": len(changes), "changes": changes}
+        return {
+            "planned": len(changes),
+            **self.apply_vm_descriptions(changes, checkpoint)
+        }
+
+    def plan_vm_descriptions(self, mode: str = "normalize") -> list[dict]:
+        """Compute description changes without applying them.
+
+        Returns:
+            list[dict]: `engine`, `id`, `name`, `mode`, `old` and `new`
+                description of each VM, whose description has to change.
+        """
+        if mode == "normalize":
+            transform = self.__normalize_description
+        elif mode == "clean":
+            transform = self.__clean_description
+        else:
+            raise ValueError(f"Unknown description migration mode '{mode}'.")
+        changes = []
         for dpc, connection in self.__connections.items():
-            system_service = connection.system_service()
-            vms_service = system_service.vms_service()
+            vms_service = connection.system_service().vms_service()
             for vm in vms_service.list():
-                vm_service = vms_service.vm_service(vm.id)
-                # Get VM current description.
-                # Check if current VM description is JSON.
-                if self.__is_dict_vm_description(vm.description):
-                    self.__logger.log_debug(
-                        f"[{self.__class__.__name__}] {vm.name} "
-                        f"in {dpc} has a valid json in description."
-                    )
-                    data = self.__check_update_desc_json(
-                        json.loads(vm.description)
-                    )
-                # If false - parse current description as JSON.
-                # If true, skip this step.
-                else:
-                    self.__logger.log_error(
-                        f"[{self.__class__.__name__}] {vm.name} "
-                        f"in {dpc} has an invalid json in description."
-                    )
-                    data = self.__fix_bad_description(vm.description)
-                    data = self.__check_update_desc_json(data)
-                vm_service.update(
-                    sdk.types.Vm(
-                        description=json.dumps(data, ensure_ascii=False)
-                    )
+                old = vm.description or ""
+                new = transform(old)
+                if new != old:
+                    changes.append({
+                        "engine": dpc,
+                        "id": vm.id,
+                        "name": vm.name,
+                        "mode": mode,
+                        "old": old,
+                        "new": new
+                    })
+        self.__logger.log_info(
+            f"{len(changes)} VM descriptions to change ({mode})."
+        )
+        return changes
+
+    def apply_vm_descriptions(
+        self, changes: list[dict], checkpoint: str = None
+    ) -> dict:
+        """Apply changes from `plan_vm_descriptions`.
+
+        Change is skipped only if checkpoint has the same VM with the same
+        mode and new description, so VM, changed since it was updated, or
+        checkpoint of other mode don't make changes lost.
+
+        Returns:
+            dict: `applied` and `skipped` counts, `failed` VMs with errors.
+        """
+        def checkpoint_key(entry: dict) -> tuple:
+            return (
+                entry["engine"], entry["id"], entry.get("mode"),
+                entry.get("new")
+            )
+
+        done = set()
+        if checkpoint is not None and os.path.exists(checkpoint):
+            with open(checkpoint, encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        done.add(checkpoint_key(json.loads(line)))
+        pending = [c for c in changes if checkpoint_key(c) not in done]
+        limiters = {
+            dpc: RateLimiter(DESC_UPDATES_PER_SECOND)
+            for dpc in {c["engine"] for c in pending}
+        }
+        lock = threading.Lock()
+        failed = []
+
+        def apply(change):
+            limiters[change["engine"]].acquire()
+            vms_service = self.__connections[
+                change["engine"]
+            ].system_service().vms_service()
+            try:
+                vms_service.vm_service(change["id"]).update(
+                    sdk.types.Vm(description=change["new"])
                 )
+            except sdk.Error as e:
+                self.__logger.log_error(
+                    f"Failed to update description of VM {change['name']} "
+                    f"in {change['engine']}: {e}."
+                )
+                with lock:
+                    failed.append({
+                        "engine": change["engine"],
+                        "name": change["name"],
+                        "error": str(e)
+                    })
+                return
+            if checkpoint is not None:
+                with lock, open(checkpoint, "a", encoding="utf-8") as file:
+                    file.write(json.dumps({
+                        "engine": change["engine"],
+                        "id": change["id"],
+                        "mode": change.get("mode"),
+                        "new": change["new"]
+                    }, ensure_ascii=False) + "\n")
+
+        with ThreadPoolExecutor(
+            max_workers=DESC_UPDATE_CONCURRENCY,
+            thread_name_prefix="vm_desc"
+        ) as executor:
+            list(executor.map(apply, pending))
+        result = {
+            "applied": len(pending) - len(failed),
+            "skipped": len(changes) - len(pending),
+            "failed": failed
+        }
+        self.__logger.log_info(f"VM descriptions migration: {result}.")
+        return result
+
+    def __normalize_description(self, description: str) -> str:
+        """JSON description with all Elma fields."""
+        if self.__is_dict_vm_description(description):
+            data = self.__check_update_desc_json(json.loads(description))
+        else:
+            data = self.__fix_bad_description(description)
+            data = self.__check_update_desc_json(data)
+        return json.dumps(data, ensure_ascii=False)
+
+    @staticmethod
+    def __clean_description(description: str) -> str:
+        """Empty description instead of JSON without data."""
+        return "" if description == _EMPTY_DESC else description
 
     def __is_dict_vm_description(self, desc: str) -> bool:
         """Checking if current description can be parsed as dict/json."""
         try:
-            json.loads(desc)
+            return isinstance(json.loads(desc), dict)
         except json.decoder.JSONDecodeError:
             return False
-        return True
 
     def __fix_bad_description(self, data: str) -> dict:
         """Try to create valid JSON based on current description string."""
@@ -1231,10 +1882,11 @@ class OvirtHelper(VirtProtocol):
             }
             return result
         # If VM was created in RV and has old description.
-        for el in ("Time created", "owner", "ELMA task numer"):
+        for el, pattern in _OLD_DESC_PATTERNS.items():
             if el in data:
-                match = re.search(rf"{el}: \s*([^,]+)", data)
-                result[el] = match.group(1)
+                match = pattern.search(data)
+                if match:
+                    result[el] = match.group(1)
         if result:
             return result
         # If nothing else was found put all data under 'Misc' field.
@@ -1264,37 +1916,75 @@ class OvirtHelper(VirtProtocol):
         else:
             return {key: '' for key in correct_fields}
 
-    def clean_desc(self):
-        for dpc, connection in self.__connections.items():
-            system_service = connection.system_service()
-            vms_service = system_service.vms_service()
-            for vm in vms_service.list():
-                vm_service = vms_service.vm_service(vm.id)
-                if vm.description == '{"Misc": "", "Time created": "", "ELMA task number": "", "elma_os": "", "owner": "", "Environment": "", "Migrated": ""}':
-                    vm_service.update(
-                        sdk.types.Vm(
-                            description=''
-                        )
-                    )
+    def clean_desc(self) -> dict:
+        """Remove descriptions, which are JSON without any data."""
+        return self.migrate_vm_descriptions("clean")
 
-    def get_user_vm_list(self) -> list:
-        """Get a list of VMs that user owns (has permission to operate
-        with).
+    def get_user_vm_list(self) -> dict:
+        """Get VMs that users own (have permission to operate with) in each
+        engine.
+
+        VM and role names are taken from one list per engine, permissions of
+        users are fetched in parallel, `USER_PERMISSIONS_CONCURRENCY` users
+        at a time.
+
+        Engine, which failed to answer, is skipped, so it is absent in
+        result. Engine without permissions has empty list.
+
+        Returns:
+            dict: DPC -> dicts with permission `uuid`, `user_name`,
+                `user_uuid`, `vm_uuid`, `vm_name`, `role` and `engine`.
         """
-        result = []
+        result = {}
         for dpc, connection in self.__connections.items():
-            # Accessing user, permissions and VMs services.
-            users_service = connection.system_service().users_service()
-            vms_service = connection.system_service().vms_service()
-            # Main loop.
-            for user in users_service.list():
-                user_perms = connection.follow_link(user.permissions)
-                for perm in user_perms:
-                    if perm.vm:
-                        vm = vms_service.vm_service(perm.vm.id).get()
+            try:
+                result[dpc] = self.__get_engine_user_vms(dpc, connection)
+            except sdk.Error as e:
+                self.__logger.log_error(
+                    f"Failed to get user VM permissions from {dpc}: {e}."
+                )
+        return result
+
+    def __get_engine_user_vms(self, dpc: str, connection) -> list:
+        """User VM permissions of one engine."""
+        result = []
+        # Accessing user, permissions and VMs services.
+        system_service = connection.system_service()
+        users_service = system_service.users_service()
+        vm_names = {
+            vm.id: vm.name for vm in system_service.vms_service().list()
+        }
+        roles = {
+            role.id: role.name
+            for role in system_service.roles_service().list()
+        }
+
+        def get_permissions(user):
+            return user, (
+                users_service.user_service(user.id)
+                .permissions_service().list()
+            )
+
+        with ThreadPoolExecutor(
+            max_workers=USER_PERMISSIONS_CONCURRENCY,
+            thread_name_prefix="permissions"
+        ) as executor:
+            for user, perms in executor.map(
+                get_permissions, users_service.list()
+            ):
+                for perm in perms:
+                    # VM might be removed after VM list was taken.
+                    if perm.vm and perm.vm.id in vm_names:
                         result.append({
+                            "uuid": perm.id,
                             "user_name": str.split(user.user_name, '@')[0],
-                            "vm_name": vm.name,
+                            "user_uuid": user.id,
+                            "vm_uuid": perm.vm.id,
+                            "vm_name": vm_names[perm.vm.id],
+                            "role": (
+                                roles.get(perm.role.id)
+                                if perm.role else None
+                            ),
                             "engine": dpc
                         })
         return result
@@ -0,0 +1,215 @@
+"""Staged processing of many items with overlapping stages.
+
+Every stage has its own workers, so while one item is in later stage, next
+items are already processed by earlier ones. Stage may limit concurrency per
+key (e.g. per storage domain) on top of its workers count.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from flask_aggregator.back.logger import Logger
+
+
+class Stage:
+    """Pipeline stage.
+
+    Args:
+        name (str): Stage name for reports.
+        func (Callable[[Any], None]): Processes item. Item fails if it
+            raises.
+        workers (int): Max items processed by stage at a time.
+        limit_key (Callable[[Any], Any]): Key of item for per-key limit.
+        limit (int): Max items with same key processed at a time.
+    """
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[Any], None],
+        workers: int = 10,
+        limit_key: Callable[[Any], Any] = None,
+        limit: int = None
+    ):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.limit_key = limit_key
+        self.limit = limit
+
+
+class StageStats:
+    """Progress and throughput of one stage."""
+    def __init__(self, name: str):
+        self.name = name
+        self.succeeded = 0
+        self.failed = 0
+        self.busy_time = 0.0
+        self.first_start = None
+        self.last_stop = None
+
+    def to_dict(self) -> dict[str, Any]:
+        """JSON-friendly view of stats."""
+        done = self.succeeded + self.failed
+        wall_time = (
+            self.last_stop - self.first_start
+            if self.first_start is not None and self.last_stop is not None
+            else 0
+        )
+        return {
+            "stage": self.name,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "avg_time": round(self.busy_time / done, 2) if done else None,
+            "wall_time": round(wall_time, 2),
+            "per_minute": (
+                round(self.succeeded / wall_time * 60, 2)
+                if wall_time else None
+            )
+        }
+
+
+class PipelineResult:
+    """Outcome of single item."""
+    __slots__ = ("item", "error", "failed_stage")
+
+    def __init__(self, item: Any, error: Exception = None, stage: str = None):
+        self.item = item
+        self.error = error
+        self.failed_stage = stage
+
+    @property
+    def ok(self) -> bool:
+        """`True` if item passed all stages."""
+        return self.error is None
+
+
+class Pipeline:
+    """Runs items through stages in order, stages overlap across items."""
+    def __init__(
+        self, stages: list[Stage], name: str = "pipeline", logger=Logger()
+    ):
+        if not stages:
+            raise ValueError("Pipeline needs at least one stage.")
+        self.__stages = stages
+        self.__name = name
+        self.__logger = logger
+        self.__stats = [StageStats(s.name) for s in stages]
+        self.__limits: list[dict[Any, threading.Semaphore]] = [
+            {} for _ in stages
+        ]
+        self.__lock = threading.Lock()
+        self.__finished = threading.Condition(self.__lock)
+        self.__results: list[PipelineResult] = []
+        self.__total = 0
+        self.__executors: list[ThreadPoolExecutor] = []
+
+    @property
+    def stats(self) -> list[dict[str, Any]]:
+        """Per-stage progress and throughput."""
+        with self.__lock:
+            return [s.to_dict() for s in self.__stats]
+
+    def run(self, items: list) -> list[PipelineResult]:
+        """Process all items, blocking until every one is done or failed.
+
+        Returns:
+            list[PipelineResult]: Results in order of completion.
+        """
+        self.__total = len(items)
+        self.__results = []
+        self.__executors = [
+            ThreadPoolExecutor(
+                max_workers=s.workers,
+                thread_name_prefix=f"{self.__name}-{s.name}"
+            ) for s in self.__stages
+        ]
+        try:
+            for item in items:
+                self.__executors[0].submit(self.__run_stage, 0, item)
+            with self.__finished:
+                self.__finished.wait_for(
+                    lambda: len(self.__results) == self.__total
+                )
+        finally:
+            for executor in self.__executors:
+                executor.shutdown(wait=True)
+        for stats in self.stats:
+            self.__logger.log_info(f"{self.__name} stage stats: {stats}")
+        return self.__results
+
+    def __get_limit(self, index: int, item) -> threading.Semaphore:
+        stage = self.__stages[index]
+        if stage.limit_key is None or stage.limit is None:
+            return None
+        key = stage.limit_key(item)
+        with self.__lock:
+            limits = self.__limits[index]
+            if key not in limits:
+                limits[key] = threading.Semaphore(stage.limit)
+            return limits[key]
+
+    def __run_stage(self, index: int, item):
+        try:
+            self.__process(index, item)
+        # Item must get its result whatever fails, or `run` waits for it
+        # forever.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self.__fail(index, item, e)
+
+    def __process(self, index: int, item):
+        stage = self.__stages[index]
+        stats = self.__stats[index]
+        limit = None
+        error = None
+        start = time.monotonic()
+        try:
+            limit = self.__get_limit(index, item)
+            if limit is not None:
+                limit.acquire()
+                start = time.monotonic()
+            with self.__lock:
+                if stats.first_start is None:
+                    stats.first_start = start
+            stage.func(item)
+        # Any error fails only this item, others go on.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            error = e
+        finally:
+            if limit is not None:
+                limit.release()
+        stop = time.monotonic()
+        with self.__lock:
+            stats.busy_time += stop - start
+            stats.last_stop = stop
+            if error is None:
+                stats.succeeded += 1
+            else:
+                stats.failed += 1
+            progress = (
+                f"{self.__name} - {stage.name}: "
+                f"{stats.succeeded + stats.failed}/{self.__total} done"
+            )
+        if error is not None:
+            self.__fail(index, item, error)
+            return
+        self.__logger.log_info(progress)
+        if index + 1 < len(self.__stages):
+            self.__executors[index + 1].submit(
+                self.__run_stage, index + 1, item
+            )
+        else:
+            self.__finish(PipelineResult(item))
+
+    def __fail(self, index: int, item, error: Exception):
+        stage = self.__stages[index]
+        self.__logger.log_error(
+            f"{self.__name} - {stage.name} failed for {item}: {error}"
+        )
+        self.__finish(PipelineResult(item, error, stage.name))
+
+    def __finish(self, result: PipelineResult):
+        with self.__finished:
+            self.__results.append(result)
+            self.__finished.notify_all()
@@ -0,0 +1,86 @@
+"""Compact rows of collected entities.
+
+Collectors keep tens of thousands of entities in memory during one run.
+Records are named tuples: no per-row dict with its own copy of keys, values
+only. Fields match columns of the target model (without `id` and defaults),
+so `to_params` turns them into upsert parameters as is.
+"""
+
+import ipaddress
+from typing import Iterable, Iterator, NamedTuple
+
+
+class VmRecord(NamedTuple):
+    """oVirt VM row (`Vm` model)."""
+    uuid: str
+    name: str
+    engine: str
+    href: str
+    virtualization: str
+    hostname: str
+    state: str
+    ip: str
+    host: str
+    cluster: str
+    data_center: str
+    was_migrated: bool
+    total_space: float
+    storage_domains: str
+
+
+class RPVmRecord(NamedTuple):
+    """Rosplatforma VM row (`RPVM` model)."""
+    uuid: str
+    name: str
+    host: str
+    cluster: str
+    ip: str
+    cpu: int
+    memory: float
+    total_space: float
+    state: str
+
+
+class HostRecord(NamedTuple):
+    """Hypervisor row (`Host` model)."""
+    uuid: str
+    name: str
+    engine: str
+    virtualization: str
+    ip: str
+    cluster: str
+    href: str = None
+    data_center: str = None
+    status: str = None
+
+
+class StorageRecord(NamedTuple):
+    """Storage domain row (`Storage` model)."""
+    uuid: str
+    name: str
+    engine: str
+    href: str
+    virtualization: str
+    data_center: str
+    available: float
+    used: float
+    committed: float
+    total: float
+    percent_left: float
+    overprovisioning: float
+
+
+def pack_ips(ips: Iterable[str]) -> tuple[int, ...]:
+    """IP addresses as ints: 28 bytes each instead of `ipaddress` object."""
+    return tuple(int(ipaddress.ip_address(ip)) for ip in ips)
+
+
+def join_ips(packed: Iterable[int]) -> str:
+    """Space separated IP addresses, as stored in `ip` columns."""
+    return " ".join(str(ipaddress.ip_address(ip)) for ip in packed)
+
+
+def to_params(rows: Iterable) -> Iterator[dict]:
+    """Upsert parameters from records (dict rows are passed as is)."""
+    for row in rows:
+        yield row._asdict() if isinstance(row, tuple) else row
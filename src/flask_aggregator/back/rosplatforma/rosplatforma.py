@@ -1,19 +1,116 @@
 """Rosplatforma (RP) paramiko-based API."""
 
-import ast
+import codecs
 import ipaddress
 import json
 import os
+import socket
+import threading
+import time
 import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, Iterator
 
 import paramiko
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from flask_aggregator.back.logger import Logger
+from flask_aggregator.back.records import RPVmRecord, join_ips, pack_ips
+
+# SSH session settings. Sessions are kept open between commands, keepalive
+# stops firewalls from dropping idle ones. Commands to one host run in
+# parallel channels of one session, sshd allows 10 by default (MaxSessions).
+SSH_CONNECT_TIMEOUT = 30
+SSH_KEEPALIVE_INTERVAL = 30
+SSH_MAX_CHANNELS = 8
+# Cluster collection: hosts queried at a time and max seconds to get whole
+# output of one host (output, which keeps coming slowly, doesn't extend it).
+CLUSTER_MAX_WORKERS = 16
+HOST_TIMEOUT = 300
+
 
 def get_structure_from_string(string: str) -> any:
-    """Make dict/list from string."""
-    result = string.replace("false", "False").replace("true", "True")
-    result = ast.literal_eval(result)
-    return result
+    """Make dict/list from JSON string.
+
+    `orjson` is used if installed, standard `json` otherwise.
+    """
+    if orjson is not None:
+        return orjson.loads(string)
+    return json.loads(string)
+
+
+def iter_json_array(chunks: Iterable[str]) -> Iterator[any]:
+    """Parse JSON array from text chunks, yielding elements one by one.
+
+    Only current element is kept in memory, not whole text or array, so
+    output of any size can be parsed as it comes.
+
+    Raises:
+        ValueError: If text is not JSON array.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buffer = buffer[pos:] + chunk
+        pos = 0
+        while True:
+            # Skipping separators between elements.
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("JSON array expected.")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Element is not complete yet, waiting for next chunk.
+                break
+            yield element
+            pos = end
+    if buffer[pos:].strip():
+        raise ValueError("Unexpected end of JSON array.")
+    if started:
+        raise ValueError("Unexpected end of JSON array.")
+
+
+def trim_vm_config(config: dict[str, any]) -> dict[str, any]:
+    """Keep only fields of `prlctl` VM config, which `VM` needs."""
+    hardware = {}
+    for k, v in config["Hardware"].items():
+        if k == "cpu":
+            hardware[k] = {"cpus": v["cpus"]}
+        elif k == "memory":
+            hardware[k] = {"size": v["size"]}
+        elif "net" in k:
+            hardware[k] = {"ips": v.get("ips", "")}
+        elif "hdd" in k:
+            hardware[k] = {"size": v["size"]}
+    return {
+        "ID": config.get("ID"),
+        "Name": config["Name"],
+        "State": config["State"],
+        "Hardware": hardware
+    }
+
+
+def iter_vm_configs(chunks: Iterable[str]) -> Iterator[dict[str, any]]:
+    """Trimmed VM configs from `prlctl list --info --json --full` output,
+    parsed VM by VM."""
+    for config in iter_json_array(chunks):
+        yield trim_vm_config(config)
 
 
 class Command:
@@ -27,7 +124,15 @@ class Command:
 
 
 class Connection:
-    """SSH-based connection."""
+    """SSH-based connection.
+
+    Connection is opened on first command and kept open: every next command
+    runs in a new channel of the same SSH session, without new handshake and
+    authentication. Several threads may run commands at once, up to
+    `SSH_MAX_CHANNELS`. Broken session is reopened and command is retried
+    once. Command, which timed out, is not retried, and session is kept for
+    other commands.
+    """
 
     def __init__(
         self,
@@ -44,40 +149,171 @@ class Connection:
         self.__password = (
             os.getenv("RP_PASS") if password is None else password
         )
+        self.__connected = False
+        self.__lock = threading.Lock()
+        self.__channels = threading.BoundedSemaphore(SSH_MAX_CHANNELS)
+
+    def __connect(self) -> paramiko.SSHClient:
+        """Start SSH connection, if there is no alive one."""
+        with self.__lock:
+            if self.__connected:
+                transport = self.__client.get_transport()
+                if transport is not None and transport.is_active():
+                    return self.__client
+                self.__client.close()
+                self.__connected = False
+            self.__client.connect(
+                self.__ip,
+                self.__port,
+                self.__username,
+                self.__password,
+                timeout=SSH_CONNECT_TIMEOUT
+            )
+            transport = self.__client.get_transport()
+            if transport is not None:
+                transport.set_keepalive(SSH_KEEPALIVE_INTERVAL)
+            self.__connected = True
+            return self.__client
 
-    def __connect(self):
-        """Start SSH connection."""
-        self.__client.connect(
-            self.__ip, self.__port, self.__username, self.__password
-        )
-
-    def exec(self, command: Command) -> str:
+    def exec(self, command: Command, timeout: float = None) -> str:
         """Execute command on remote host.
 
         Args:
             command (Command): Bash string command.
+            timeout (float): Max seconds to wait for command output.
 
         Raises:
             RuntimeError: If remote command execution goes wrong.
+            socket.timeout: If there is no output for `timeout` seconds.
 
         Returns:
             str: String, containing result. Could be empty string, if remote
               command has no output in stdout.
         """
-        self.__connect()
-        _, stdout, stderr = self.__client.exec_command(command)
-        data = stdout.read().decode()
-        err = stderr.read().decode()
-        self.__disconnect()
+        with self.__channels:
+            for retry in (False, True):
+                client = self.__connect()
+                stdout = None
+                try:
+                    _, stdout, stderr = client.exec_command(
+                        command, timeout=timeout
+                    )
+                    data = stdout.read().decode()
+                    err = stderr.read().decode()
+                    break
+                except socket.timeout:
+                    # Slow command, not broken session: only its channel is
+                    # closed, other commands go on.
+                    if stdout is not None:
+                        stdout.channel.close()
+                    raise
+                except (paramiko.SSHException, EOFError, OSError):
+                    # Session was dropped by host or network.
+                    self.close()
+                    if retry:
+                        raise
         if err:
             raise RuntimeError(
                 f"Error while executing command {command}: ", stderr
             )
         return data
 
-    def __disconnect(self):
+    def exec_stream(
+        self, command: Command, timeout: float = None,
+        chunk_size: int = 65536
+    ) -> Iterator[str]:
+        """Execute command on remote host, yielding output as it comes.
+
+        Args:
+            command (Command): Bash string command.
+            timeout (float): Max seconds from command start to the end of
+                its output, however often output comes.
+            chunk_size (int): Max bytes to read at a time.
+
+        Raises:
+            socket.timeout: If output doesn't end in `timeout`.
+            RuntimeError: If there is anything in stderr after command
+                output ends.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.__channels:
+            client = self.__connect()
+            _, stdout, stderr = client.exec_command(command, timeout=timeout)
+            channel = stdout.channel
+            # Channel is closed even if reading fails or stops early, so it
+            # doesn't hold its place in session until garbage collection.
+            try:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+                while True:
+                    self.__limit_read_time(channel, deadline)
+                    data = channel.recv(chunk_size)
+                    if not data:
+                        break
+                    yield decoder.decode(data)
+                tail = decoder.decode(b"", final=True)
+                if tail:
+                    yield tail
+                self.__limit_read_time(channel, deadline)
+                err = stderr.read().decode()
+            finally:
+                channel.close()
+        if err:
+            raise RuntimeError(
+                f"Error while executing command {command}: ", err
+            )
+
+    @staticmethod
+    def __limit_read_time(channel: paramiko.Channel, deadline: float):
+        """Let next read of channel wait only for time left to `deadline`.
+        """
+        if deadline is None:
+            return
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise socket.timeout("Command output didn't end in time.")
+        channel.settimeout(left)
+
+    def close(self):
         """Close SSH connection."""
-        self.__client.close()
+        with self.__lock:
+            self.__client.close()
+            self.__connected = False
+
+
+class SessionPool:
+    """Open SSH connections by host, shared by all users of the host."""
+
+    def __init__(self):
+        self.__connections: dict[tuple, Connection] = {}
+        self.__lock = threading.Lock()
+
+    def get(
+        self,
+        ip: str,
+        port: int = None,
+        username: str = None,
+        password: str = None,
+    ) -> Connection:
+        """Connection to host, created on first request."""
+        key = (ip, port, username)
+        with self.__lock:
+            if key not in self.__connections:
+                self.__connections[key] = Connection(
+                    ip, port, username, password
+                )
+            return self.__connections[key]
+
+    def close_all(self):
+        """Close and forget all connections."""
+        with self.__lock:
+            connections = list(self.__connections.values())
+            self.__connections.clear()
+        for conn in connections:
+            conn.close()
+
+
+# Default pool for RP hosts.
+SESSIONS = SessionPool()
 
 
 class ClusterManagementContainer:
@@ -87,10 +323,9 @@ class ClusterManagementContainer:
         self.__conn = conn
         self.__hosts = []
 
-    def get_cluster_name(
-        self,
-    ) -> str:  # TODO: get cluster name from va-mn hostname.
+    def get_cluster_name(self) -> str:
         """Get cluster name from va-mn hostname."""
+        return self.__conn.exec(Command.HOSTNAME).strip()
 
     def get_hosts_name_and_ip(self) -> list[dict[str, any]]:
         """Access va-mn database and get info about names and ips of hosts."""
@@ -101,6 +336,7 @@ class ClusterManagementContainer:
         rows = xml_root.iter("row")
         if rows is None:
             raise ValueError("Could not find 'row' index in result XML.")
+        self.__hosts = []
         for row in rows:
             host = {}
             host["name"] = row.find("./field[@name='name']").text
@@ -110,11 +346,19 @@ class ClusterManagementContainer:
 
 
 class VM:
-    """VM entity."""
+    """VM entity.
 
-    def __init__(self, config: dict[str, any]):
+    Hosts may have thousands of VMs, so only parsed values are kept, IPs
+    are packed to ints.
+    """
+    __slots__ = (
+        "__uuid", "__name", "__ips", "__cpu_count", "__memory",
+        "__total_disk_size", "__state", "__host"
+    )
+
+    def __init__(self, config: dict[str, any], host: str = None):
         self.__parse_config(config)
-        # self.__config = config
+        self.__host = host
 
     def __str__(self):
         return f"{self.__get_dict()}"
@@ -126,8 +370,9 @@ class VM:
 
     def __parse_config(self, config: dict[str, any]):
         """Get class attributes from dictionary."""
+        self.__uuid = config.get("ID")
         self.__name = config["Name"]
-        self.__ips = self.__get_ips(config["Hardware"])
+        self.__ips = pack_ips(self.__get_ips(config["Hardware"]))
         self.__cpu_count = config["Hardware"]["cpu"]["cpus"]
         self.__memory = self.__get_memory(config["Hardware"])
         self.__total_disk_size = self.__get_total_disk_size(config["Hardware"])
@@ -137,9 +382,7 @@ class VM:
         """Get memory in gigabytes."""
         return int(hardware["memory"]["size"][:-2]) / 1024
 
-    def __get_ips(
-        self, hardware: dict[str, any]
-    ) -> list[ipaddress.IPv4Address]:
+    def __get_ips(self, hardware: dict[str, any]) -> list[str]:
         """Make list of ips from string like
         '10.166.11.143/255.255.255.192 10.0.0.100/255.255.255.0'. There is
         a possibility that no ips are set for VM, so empty list is returned.
@@ -149,8 +392,7 @@ class VM:
             if "net" in k:
                 ips = v["ips"].split()
                 for ip_with_mask in ips:
-                    ip = ip_with_mask.split("/")[0]
-                    result.append(ipaddress.ip_address(ip))
+                    result.append(ip_with_mask.split("/")[0])
         return result
 
     def __get_total_disk_size(self, hardware: dict[str, any]):
@@ -168,19 +410,43 @@ class VM:
         return result
 
     def __get_dict(self):
-        return {"name": self.__name, "ip": self.__ips}
+        return {"name": self.__name, "ip": join_ips(self.__ips)}
+
+    @property
+    def uuid(self) -> str:
+        """VM ID in RP."""
+        return self.__uuid
+
+    @property
+    def host(self) -> str:
+        """Name of host, VM was found on."""
+        return self.__host
 
     def get(self) -> dict[str, str]:
         """Return VM dict of strings."""
         return {
             "name": self.__name,
-            "ips": self.__ips,
+            "ips": [ipaddress.ip_address(ip) for ip in self.__ips],
             "cpu": self.__cpu_count,
             "memory": self.__memory,
             "size": self.__total_disk_size,
             "state": self.__state,
         }
 
+    def record(self, cluster: str) -> RPVmRecord:
+        """Row of `RPVM` model, without intermediate dict."""
+        return RPVmRecord(
+            uuid=self.__uuid,
+            name=self.__name,
+            host=self.__host,
+            cluster=cluster,
+            ip=join_ips(self.__ips),
+            cpu=self.__cpu_count,
+            memory=self.__memory,
+            total_space=self.__total_disk_size,
+            state=self.__state
+        )
+
 
 class Host:
     """Host entity. Base of RP."""
@@ -190,24 +456,55 @@ class Host:
         self.__ip = ip
         # In current infrastructure it is implied that port, username and
         # password are the same for va-mn and hosts.
-        self.__conn = Connection(ip)
+        self.__conn = SESSIONS.get(ip)
         self.__vms = []
 
     def __str__(self):
         result = {"name": self.__name, "ip": self.__ip}
         return f"{result}"
 
-    def get_vms(self) -> list[VM]:
-        """VM list, present on current host."""
-        json_as_string = self.__conn.exec(Command.VMS)
+    @property
+    def name(self) -> str:
+        """Host name."""
+        return self.__name
+
+    @property
+    def ip(self) -> str:
+        """Host IP address."""
+        return self.__ip
+
+    def get_vms(self, timeout: float = None) -> list[VM]:
+        """VM list, present on current host.
+
+        Args:
+            timeout (float): Max seconds to wait for host output.
+        """
+        json_as_string = self.__conn.exec(Command.VMS, timeout=timeout)
         # If json_as_string is empty it means there are no VMs on a host.
         if json_as_string == "":
             return []
-        vms = get_structure_from_string(json_as_string)
-        for vm in vms:
-            self.__vms.append(VM(vm))
+        self.__vms = [
+            VM(vm, host=self.__name)
+            for vm in get_structure_from_string(json_as_string)
+        ]
         return self.__vms
 
+    def iter_vms(self, timeout: float = None) -> Iterator[VM]:
+        """VMs of current host, parsed one by one while output is read.
+
+        For hosts with many VMs: neither whole `prlctl` output nor full VM
+        configs are kept in memory.
+
+        Args:
+            timeout (float): Max seconds to get whole host output.
+        """
+        yield from (
+            VM(config, host=self.__name)
+            for config in iter_vm_configs(
+                self.__conn.exec_stream(Command.VMS, timeout=timeout)
+            )
+        )
+
     def get_vlan_list(self):  # TODO: to be done
         pass
 
@@ -219,20 +516,77 @@ class Cluster:
     which is running on one of the hosts.
     """
 
-    def __init__(self, cmc: ClusterManagementContainer):
+    def __init__(
+        self, cmc: ClusterManagementContainer, logger: Logger = Logger()
+    ):
         self.__hosts = []
         self.__vms = []
-        # self.__name =     # TODO: add naming for cluster.
+        self.__failed_hosts = {}
+        self.__logger = logger
+        self.__name = cmc.get_cluster_name()
         hosts_name_and_ip = cmc.get_hosts_name_and_ip()
         for host in hosts_name_and_ip:
-            self.__hosts.append(Host(name=host["name"], ip=host["ip"]))
+            self.__hosts.append(
+                Host(name=host["name"], ip=host["ip_address"])
+            )
+
+    @property
+    def name(self) -> str:
+        """Cluster name (va-mn hostname)."""
+        return self.__name
+
+    @property
+    def hosts(self) -> list[Host]:
+        """Hosts of cluster."""
+        return self.__hosts
 
-    def concat_vms_from_hosts(self) -> list[VM]:
-        """List of VM entities from cluster."""
-        for host in self.__hosts:
-            self.__vms = self.__vms + host.get_vms()
+    @property
+    def failed_hosts(self) -> dict[str, str]:
+        """Host name -> error of hosts, not collected last time."""
+        return self.__failed_hosts
+
+    def concat_vms_from_hosts(
+        self,
+        max_workers: int = CLUSTER_MAX_WORKERS,
+        timeout: float = HOST_TIMEOUT
+    ) -> list[VM]:
+        """List of VM entities from cluster.
+
+        Hosts are queried in parallel, so cluster is collected in time of
+        its slowest host. VMs of each host are parsed while its output is
+        read (see `Host.iter_vms`). Host which failed or didn't send all its
+        VMs in `timeout` is skipped and listed in `failed_hosts`.
+        """
+        self.__failed_hosts = {}
+        if not self.__hosts:
+            self.__vms = []
+            return self.__vms
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(self.__hosts)),
+            thread_name_prefix="rp_host"
+        ) as executor:
+            futures = [
+                (host, executor.submit(self.__collect_host, host, timeout))
+                for host in self.__hosts
+            ]
+            vms = []
+            for host, future in futures:
+                try:
+                    vms.extend(future.result())
+                # Other hosts must be collected anyway.
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    self.__failed_hosts[str(host.name)] = str(e) or repr(e)
+                    self.__logger.log_error(
+                        f"Failed to get VMs from RP host {host}: {e}"
+                    )
+        self.__vms = vms
         return self.__vms
 
+    @staticmethod
+    def __collect_host(host: Host, timeout: float) -> list[VM]:
+        """All VMs of host. VMs, read before host failed, are dropped."""
+        return list(host.iter_vms(timeout=timeout))
+
 
 class VLAN:
     pass
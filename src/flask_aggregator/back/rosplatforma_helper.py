@@ -0,0 +1,140 @@
+"""Rosplatforma (RP) helper for virtualization aggregator."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from flask_aggregator.config import Config
+from flask_aggregator.back.logger import Logger
+from flask_aggregator.back.models import RPVM
+from flask_aggregator.back.records import RPVmRecord
+from flask_aggregator.back.virt_protocol import VirtProtocol
+from flask_aggregator.back.rosplatforma.rosplatforma import (
+    SESSIONS, Cluster, ClusterManagementContainer, VM)
+
+# Clusters (va-mn containers) connected and collected at a time. Hosts of
+# each cluster are queried in parallel by `Cluster` itself.
+RP_CLUSTER_WORKERS = 8
+
+
+class RosplatformaHelper(VirtProtocol):
+    """Collects data from RP clusters, one va-mn host per cluster."""
+    db_models = {"vms": RPVM}
+    supports_creation = False
+
+    def __init__(
+        self,
+        hosts: list = Config.RP_HOSTS,
+        port: int = Config.RP_PORT,
+        username: str = Config.RP_USER,
+        password: str = None,
+        logger=Logger()
+    ):
+        self.__hosts = hosts
+        self.__port = port
+        self.__username = username
+        self.__password = password
+        self.__clusters: dict[str, Cluster] = {}
+        self.__logger = logger
+
+    @property
+    def pretty_name(self) -> str:
+        """Return class' instance pretty name."""
+        return "rosplatforma"
+
+    @property
+    def dpc_list(self) -> list:
+        """Return va-mn hosts of clusters."""
+        return self.__hosts
+
+    def connect_to_virtualization(self):
+        """Get cluster names and hosts from va-mn of every cluster.
+
+        Cluster which failed is skipped, others are collected anyway.
+        """
+        self.__clusters = {}
+        for ip, cluster in self.__map_clusters(self.__connect_cluster):
+            if cluster is not None:
+                self.__clusters[ip] = cluster
+
+    def disconnect_from_virtualization(self):
+        """Close SSH sessions with all RP hosts."""
+        SESSIONS.close_all()
+        self.__clusters = {}
+
+    def __connect_cluster(self, ip: str) -> Cluster:
+        conn = SESSIONS.get(
+            ip, self.__port, self.__username, self.__password
+        )
+        return Cluster(ClusterManagementContainer(conn), logger=self.__logger)
+
+    def __map_clusters(self, func, items: list = None) -> list[tuple]:
+        """Run `func` for each item concurrently.
+
+        Returns:
+            list[tuple]: (item, result) pairs, result is `None` if `func`
+                failed.
+        """
+        items = self.__hosts if items is None else items
+        if not items:
+            return []
+        with ThreadPoolExecutor(
+            max_workers=min(RP_CLUSTER_WORKERS, len(items)),
+            thread_name_prefix="rp_cluster"
+        ) as executor:
+            futures = [(item, executor.submit(func, item)) for item in items]
+            result = []
+            for item, future in futures:
+                try:
+                    result.append((item, future.result()))
+                # Other clusters must be collected anyway.
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    self.__logger.log_error(
+                        f"{self.__class__.__name__} - {func.__name__} "
+                        f"failed for {item}: {e}"
+                    )
+                    result.append((item, None))
+        return result
+
+    def get_vms(self) -> list[RPVmRecord]:
+        """Get VMs of all clusters as rows of `RPVM` model.
+
+        VM, found on several hosts (e.g. during migration), is returned
+        once, since same key twice in one upsert is an error in Postgres.
+        """
+        result = {}
+        for cluster, vms in self.__map_clusters(
+            self.__collect_cluster, list(self.__clusters.values())
+        ):
+            for vm in vms or []:
+                # UUID is the upsert key, VM without it can't be stored.
+                if vm.uuid is None:
+                    self.__logger.log_error(
+                        f"RP VM {vm} on {vm.host} has no ID, skipped."
+                    )
+                    continue
+                result[vm.uuid] = vm.record(cluster.name)
+        return list(result.values())
+
+    @staticmethod
+    def __collect_cluster(cluster: Cluster) -> list[VM]:
+        return cluster.concat_vms_from_hosts()
+
+    def get_hosts(self) -> list:
+        """RP hosts are not stored: `hosts` table is for oVirt hosts only.
+        They are available through `Cluster.hosts`."""
+        return []
+
+    def get_clusters(self) -> list:
+        """RP has no cluster entities to store."""
+        return []
+
+    def get_data_centers(self) -> list:
+        """RP has no data centers."""
+        return []
+
+    def get_storages(self) -> list:
+        """RP storages are not collected."""
+        return []
+
+    def get_user_vm_list(self) -> dict:
+        """RP has no user permissions on VMs."""
+        return {}
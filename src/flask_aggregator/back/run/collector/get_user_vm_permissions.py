@@ -0,0 +1,15 @@
+"""Retrieves user permissions for VMs in oVirt.
+
+Only changes are written to `user_vm_permissions` table, so it is cheap to
+run often."""
+
+from flask_aggregator.back.virt_aggregator import VirtAggregator
+
+def run():
+    """External runner."""
+    virt_aggregator = VirtAggregator()
+    virt_aggregator.create_virt_helpers()
+    virt_aggregator.refresh_user_vm_permissions()
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,45 @@
+"""VM descriptions migration.
+
+Brings descriptions of all VMs to one format. Updated VMs are written to
+checkpoint file, so interrupted migration is continued by the same command.
+"""
+
+import argparse
+import json
+
+from flask_aggregator.back.logger import Logger
+from flask_aggregator.back.ovirt_helper import OvirtHelper
+from flask_aggregator.config import Config
+
+def run():
+    """External runner."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--mode", choices=("normalize", "clean"), default="normalize"
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true",
+        help="only print changes, don't apply them"
+    )
+    parser.add_argument(
+        "--checkpoint", default="vm_descriptions.checkpoint",
+        help="file with already updated VMs"
+    )
+    parser.add_argument(
+        "--dpc", action="append", help="engine (all from config by default)"
+    )
+    args = parser.parse_args()
+    ovirt_helper = OvirtHelper(
+        dpc_list=args.dpc or Config.DPC_LIST, logger=Logger()
+    )
+    ovirt_helper.connect_to_virtualization()
+    try:
+        result = ovirt_helper.migrate_vm_descriptions(
+            mode=args.mode, dry_run=args.dry_run, checkpoint=args.checkpoint
+        )
+    finally:
+        ovirt_helper.disconnect_from_virtualization()
+    print(json.dumps(result, ensure_ascii=False, indent=4))
+
+if __name__ == "__main__":
+    run()
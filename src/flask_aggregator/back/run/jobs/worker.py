@@ -0,0 +1,32 @@
+"""Background job worker.
+
+Runs jobs, submitted by frontend (VM and VLAN creation)."""
+
+import os
+import signal
+
+from flask_aggregator.back.db import DBConnection
+from flask_aggregator.back.jobs import JobQueue, JobWorker
+from flask_aggregator.back.logger import Logger
+from flask_aggregator.config import DevelopmentConfig, ProductionConfig
+
+def run():
+    """External runner."""
+    logger = Logger()
+    queue = JobQueue(DBConnection(
+        DevelopmentConfig.DB_URL
+        if os.getenv("FA_ENV") == "dev"
+        else ProductionConfig.DB_URL
+    ))
+    # Jobs, left running by previous worker, will never be finished.
+    interrupted = queue.fail_running("Interrupted by job worker restart.")
+    if interrupted:
+        logger.log_warning(f"Marked {interrupted} interrupted jobs as failed.")
+    worker = JobWorker(queue, logger=logger)
+    # Finish running jobs on service stop, but don't take new ones.
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    worker.run()
+
+if __name__ == "__main__":
+    run()
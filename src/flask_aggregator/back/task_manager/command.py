@@ -1,9 +1,10 @@
 """Commands and its factory module."""
 
-from typing import Any
+from typing import Any, NamedTuple
 from abc import ABC, abstractmethod
 
 from flask_aggregator.back.ovirt_helper import OvirtHelper
+from flask_aggregator.back.records import to_params
 
 class State:
     """Command states."""
@@ -29,6 +30,27 @@ class Command(ABC):
         # incorporation every time `execute` is implemented.
 
 
+class CommandOutcome(NamedTuple):
+    """Pickle-safe result of command, executed in another process."""
+    result: Any
+    error: str
+    state: str
+
+
+def execute_command(command: Command) -> CommandOutcome:
+    """Execute command in worker process.
+
+    Only outcome is sent back: changes of command itself stay in worker
+    process.
+    """
+    try:
+        command.execute()
+    # Exception may be not picklable, it is passed as string.
+    except Exception as e:  # pylint: disable=broad-exception-caught
+        return CommandOutcome(None, str(e) or repr(e), State.FAILED)
+    return CommandOutcome(command.result, command.error, command.state)
+
+
 # TODO: think this through. We are close to making real oVirt interaction
 # command. Need to think what to pass to command - user, pass, engine link
 # etc. Perhaps OvirtCommand should be subclassed by real command classes.
@@ -41,7 +63,7 @@ class OvirtCommand(Command):
         self._helper = OvirtHelper(urls_list=["e15-test2"])
 
     def execute(self):
-        self.result = self._helper.get_hosts()
+        self.result = list(to_params(self._helper.get_hosts()))
 
 class VMWareCommand(Command):
     pass
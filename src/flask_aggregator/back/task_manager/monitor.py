@@ -1,75 +1,234 @@
-"""Monitor client and server, unix-socket based."""
+"""Monitor client and server, unix-socket based.
+
+Server sends length-prefixed JSON messages: 4 bytes of payload length (big
+endian), then payload. Client gets `snapshot` message with all tasks on
+connect, then `delta` messages with changed tasks and UUIDs of removed ones.
+"""
 
 import os
 import json
 import time
 import socket
-from typing import Any
+import struct
+import selectors
+import threading
+from typing import Any, Iterator
 
 from flask_aggregator.back.logger import Logger
+from flask_aggregator.back.task_manager.observer import Observer, TaskEvent
+
+HEADER = struct.Struct("!I")
+# Frame with bigger length is treated as broken stream.
+MAX_MESSAGE_SIZE = 64 * 2**20
+RECV_SIZE = 65536
+# Client, which doesn't read as fast as server sends, is disconnected. It
+# gets fresh snapshot when it reconnects.
+MAX_CLIENT_BUFFER = 16 * 2**20
+
+
+def pack_message(message: dict[str, Any]) -> bytes:
+    """Frame of message, ready to be sent."""
+    payload = json.dumps(message).encode()
+    return HEADER.pack(len(payload)) + payload
+
+
+def task_key(task: dict[str, Any]) -> str:
+    """Key of task in monitor messages."""
+    return task.get("uuid", task.get("name"))
+
+
+class FrameDecoder:
+    """Collects messages from stream chunks, as they come."""
+    def __init__(self):
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> Iterator[dict[str, Any]]:
+        """Add chunk, yield messages, which are complete.
 
-# TODO: add logging.
-# TODO: MORE TESTS!
-class Server:
-    """Interface for watching at tasks interactivly and in real-time."""
+        Raises:
+            ValueError: If frame is longer than `MAX_MESSAGE_SIZE`.
+        """
+        self._buffer += data
+        while len(self._buffer) >= HEADER.size:
+            (length,) = HEADER.unpack_from(self._buffer)
+            if length > MAX_MESSAGE_SIZE:
+                raise ValueError(f"Monitor message of {length} bytes.")
+            end = HEADER.size + length
+            if len(self._buffer) < end:
+                return
+            payload = bytes(self._buffer[HEADER.size:end])
+            del self._buffer[:end]
+            yield json.loads(payload.decode())
+
+
+class Server(Observer):
+    """Interface for watching at tasks interactivly and in real-time.
+
+    Serves any number of clients from one selector loop. Changes are
+    collected between sends and sent at most once per `polling_interval`,
+    encoded once for all clients. Subscribed to task manager, server gets
+    changed tasks only.
+    """
     def __init__(
         self,
         socket_path: str="/tmp/fa-mon",
         polling_interval: float=1
     ):
+        super().__init__()
         self.socket_path = socket_path
-        # self._waiting_clients = True
         self._running = True
         self._polling_interval = polling_interval
-        self._task_data = []
+        self._tasks: dict[str, dict[str, Any]] = {}
+        self._changed: dict[str, dict[str, Any]] = {}
+        self._removed: set[str] = set()
+        self._version = 0
+        # Data comes from task manager thread, is sent from server one.
+        self._lock = threading.Lock()
+        self._clients: dict[socket.socket, bytearray] = {}
+        self._wakeup = None
         self._logger = Logger()
 
     def observer_callback(self, data: list[Any]):
         """Callback for filling monitoring server with data from task
         registry.
+
+        Only tasks, which differ from previous data, are sent to clients.
         """
-        self._task_data = data
+        tasks = {task_key(task): task for task in data}
+        with self._lock:
+            for key, task in tasks.items():
+                if self._tasks.get(key) != task:
+                    self._changed[key] = task
+                    self._removed.discard(key)
+            for key in self._tasks.keys() - tasks.keys():
+                self._changed.pop(key, None)
+                self._removed.add(key)
+            self._tasks = tasks
+
+    def update(self, events: list[TaskEvent]):
+        """Take changed tasks from task registry."""
+        with self._lock:
+            for event in events:
+                if event.data is None:
+                    self._tasks.pop(event.uuid, None)
+                    self._changed.pop(event.uuid, None)
+                    self._removed.add(event.uuid)
+                else:
+                    self._tasks[event.uuid] = event.data
+                    self._changed[event.uuid] = event.data
+                    self._removed.discard(event.uuid)
 
     def run(self):
         """Main entry for monitor."""
         if os.path.exists(self.socket_path):
             os.remove(self.socket_path)
 
+        selector = selectors.DefaultSelector()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._wakeup = socket.socketpair()
         try:
-            server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
             server.bind(self.socket_path)
-            server.listen(1)
-            server.settimeout(1)
-
-            # TODO: running part need more thorough approach. Setting timeout
-            # might not be the best idea. Need to find out how to close accept
-            # by server.
+            server.listen()
+            server.setblocking(False)
+            selector.register(server, selectors.EVENT_READ, self.__accept)
+            selector.register(
+                self._wakeup[0], selectors.EVENT_READ, self.__drain_wakeup
+            )
+            next_send = time.monotonic()
             while self._running:
-                try:
-                    conn, _ = server.accept()
-                    try:
-                        while self._running:
-                            serialized = json.dumps(self._task_data).encode()
-                            conn.sendall(serialized)
-                            time.sleep(self._polling_interval)
-                    # TODO: is there other way to make disconnect from server secure?
-                    # If there is no such 'except' disconnecting from client breaks
-                    # the server.
-                    except (BrokenPipeError, ConnectionResetError):
-                        pass
-                # TODO: is there other way to stop 'server.accept()'?
-                # If there is no following 'except' server remains working indefinitely,
-                # because of 'server.accept()' waiting for connections.
-                except socket.timeout:
-                    continue
+                timeout = max(next_send - time.monotonic(), 0)
+                for key, mask in selector.select(timeout):
+                    key.data(selector, key.fileobj, mask)
+                if time.monotonic() >= next_send:
+                    self.__broadcast_changes(selector)
+                    next_send = time.monotonic() + self._polling_interval
         finally:
             self._logger.log_info("Stopping monitor server.")
+            for conn in list(self._clients):
+                self.__disconnect(selector, conn)
+            selector.close()
             server.close()
+            for sock in self._wakeup:
+                sock.close()
+
+    def __accept(self, selector, server: socket.socket, _mask: int):
+        try:
+            conn, _ = server.accept()
+        except BlockingIOError:
+            return
+        conn.setblocking(False)
+        self._clients[conn] = bytearray()
+        selector.register(conn, selectors.EVENT_READ, self.__serve_client)
+        with self._lock:
+            snapshot = {
+                "type": "snapshot",
+                "version": self._version,
+                "tasks": list(self._tasks.values())
+            }
+        self.__send(selector, conn, pack_message(snapshot))
+
+    def __drain_wakeup(self, _selector, sock: socket.socket, _mask: int):
+        sock.recv(RECV_SIZE)
+
+    def __broadcast_changes(self, selector):
+        with self._lock:
+            if not (self._changed or self._removed):
+                return
+            self._version += 1
+            delta = {
+                "type": "delta",
+                "version": self._version,
+                "changed": list(self._changed.values()),
+                "removed": sorted(self._removed)
+            }
+            self._changed, self._removed = {}, set()
+        frame = pack_message(delta)
+        for conn in list(self._clients):
+            self.__send(selector, conn, frame)
+
+    def __send(self, selector, conn: socket.socket, frame: bytes):
+        buffer = self._clients[conn]
+        if len(buffer) + len(frame) > MAX_CLIENT_BUFFER:
+            self._logger.log_error("Monitor client is too slow, disconnected.")
+            self.__disconnect(selector, conn)
+            return
+        buffer += frame
+        selector.modify(
+            conn, selectors.EVENT_READ | selectors.EVENT_WRITE,
+            self.__serve_client
+        )
+
+    def __serve_client(self, selector, conn: socket.socket, mask: int):
+        try:
+            if mask & selectors.EVENT_READ and not conn.recv(RECV_SIZE):
+                self.__disconnect(selector, conn)
+                return
+            if mask & selectors.EVENT_WRITE:
+                buffer = self._clients[conn]
+                del buffer[:conn.send(buffer)]
+                if not buffer:
+                    selector.modify(
+                        conn, selectors.EVENT_READ, self.__serve_client
+                    )
+        except BlockingIOError:
+            pass
+        # Client disconnected: other clients are served anyway.
+        except (BrokenPipeError, ConnectionResetError):
+            self.__disconnect(selector, conn)
+
+    def __disconnect(self, selector, conn: socket.socket):
+        self._clients.pop(conn, None)
+        selector.unregister(conn)
+        conn.close()
 
     def stop(self):
         """Stop monitor."""
-        # self._waiting_clients = False
         self._running = False
+        if self._wakeup:
+            try:
+                self._wakeup[1].send(b"\0")
+            except OSError:
+                pass
         if os.path.exists(self.socket_path):
             os.remove(self.socket_path)
 
@@ -84,30 +243,54 @@ class Client:
         self._running = True
         self.socket_path = socket_path
         self._polling_interval = polling_interval
+        self._tasks: dict[str, dict[str, Any]] = {}
+
+    @property
+    def tasks(self) -> list[dict[str, Any]]:
+        """Tasks as server sent them."""
+        return list(self._tasks.values())
+
+    def apply_message(self, message: dict[str, Any]):
+        """Update tasks with snapshot or delta message."""
+        if message["type"] == "snapshot":
+            self._tasks = {
+                task_key(task): task for task in message["tasks"]
+            }
+            return
+        for task in message["changed"]:
+            self._tasks[task_key(task)] = task
+        for key in message["removed"]:
+            self._tasks.pop(key, None)
 
     def run(self):
         """Start monitoring client."""
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
         try:
-            client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
             client.connect(self.socket_path)
+            # Timeout only lets client check, whether it is stopped.
+            client.settimeout(self._polling_interval)
+            decoder = FrameDecoder()
 
             while self._running:
-                recieved_raw_data = client.recv(1024)
+                try:
+                    recieved_raw_data = client.recv(RECV_SIZE)
+                except socket.timeout:
+                    continue
 
                 if not recieved_raw_data:
                     self.stop()
+                    break
 
-                self.__render_task_monitor(recieved_raw_data)
-
-                time.sleep(self._polling_interval)
+                for message in decoder.feed(recieved_raw_data):
+                    self.apply_message(message)
+                self.__render_task_monitor()
         finally:
             client.close()
 
     # TODO: client 'beautification' is required. Perhaps via pprint.
-    def __render_task_monitor(self, data: any):
-        data = json.loads(data.decode())
+    def __render_task_monitor(self):
         os.system("clear")
-        for row in data:
+        for row in self._tasks.values():
             print(row["name"], row["result"], row["error"], row["state"])
 
     def stop(self):
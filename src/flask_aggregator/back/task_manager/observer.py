@@ -1,11 +1,21 @@
 """For updating info about task progress/status."""
 
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, NamedTuple, Optional
+
+
+class TaskEvent(NamedTuple):
+    """Change of task: its JSON view, `None` if task was removed."""
+    uuid: str
+    data: Optional[dict[str, Any]]
 
 
 class Observer(ABC):
-    """Abstract class for task observers."""
+    """Abstract class for task observers.
+
+    Subscribed to task registry, observer gets batches of events about
+    tasks, which changed since previous batch.
+    """
     def __init__(self):
         self._data = None
 
@@ -15,15 +25,28 @@ class Observer(ABC):
         return self._data
 
     @abstractmethod
-    def update(self, data: Any):
-        """Update task current state."""
+    def update(self, events: list[TaskEvent]):
+        """Update tasks current states."""
 
 
 class TaskState(Observer):
-    """Concrete class for task registry observer."""
-    def update(self, data: dict[str, Any]):
-        self._data = (
-            f'name: {data["name"]} result: {data["result"]}'
-            f'error: {data["error"]}'
-            f'last_run_time: {int(data["last_run_time"])}'
-        )
+    """Concrete class for task registry observer. Keeps short description
+    of each task."""
+    def __init__(self):
+        super().__init__()
+        self._data: dict[str, str] = {}
+
+    def update(self, events: list[TaskEvent]):
+        for event in events:
+            if event.data is None:
+                self._data.pop(event.uuid, None)
+                continue
+            data = event.data
+            last_run_time = data["last_run_time"]
+            if last_run_time is not None:
+                last_run_time = int(last_run_time)
+            self._data[event.uuid] = (
+                f'name: {data["name"]} result: {data["result"]} '
+                f'error: {data["error"]} '
+                f'last_run_time: {last_run_time}'
+            )
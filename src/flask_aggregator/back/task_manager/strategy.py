@@ -1,25 +1,60 @@
 """Task strategy module."""
 
+import random
 import time
 from abc import ABC, abstractmethod
 
 
+class Misfire:
+    """What to do with runs, missed while task was running or was late."""
+    # Run once for all missed runs, next interval counts from that run.
+    COALESCE = "coalesce"
+    # Run every missed run, one after another, until schedule is caught up.
+    CATCH_UP = "catch_up"
+    # Drop missed runs, run at the next time of original schedule.
+    SKIP = "skip"
+
+    ALL = (COALESCE, CATCH_UP, SKIP)
+
+
 class TaskRunStrategy(ABC):
-    """Abstract class for task run strategies."""
+    """Abstract class for task run strategies.
+
+    Args:
+        max_instances (int): How many runs of task may go at once. Default
+            1 - next run is skipped while previous is running.
+        jitter (float): First run is delayed by random time up to `jitter`
+            seconds, so tasks, created together, don't run together.
+    """
     TASK_WAS_NOT_RUN_YET = -1
 
-    def __init__(self):
+    def __init__(self, max_instances: int = 1, jitter: float = 0):
+        if max_instances < 1:
+            raise ValueError("Max instances can not be less than 1.")
+        if jitter < 0:
+            raise ValueError("Jitter can not be less than 0.")
         self.time_created = time.time()
         # Perhaps start and last run times are redundand.
         self.start_run_time = self.TASK_WAS_NOT_RUN_YET
         self.stop_run_time = self.TASK_WAS_NOT_RUN_YET
         self.last_run_time = self.TASK_WAS_NOT_RUN_YET
+        self.max_instances = max_instances
+        self.first_run_time = self.time_created + random.uniform(0, jitter)
 
     @property
     @abstractmethod
     def task_has_to_run(self):
         """Make sure that task was run at least once."""
 
+    def next_run_at(self) -> float:
+        """Epoch time, when task has to run next. `None` if it shouldn't run
+        anymore."""
+        return time.time() if self.task_has_to_run else None
+
+    def can_start(self, running: int) -> bool:
+        """`True` if one more run may start, while `running` runs go."""
+        return running < self.max_instances
+
     @property
     def run_time(self):
         """How long task was executed."""
@@ -35,38 +70,86 @@ class TaskRunStrategy(ABC):
         """Mark time when task ended."""
         self.stop_run_time = time.time()
 
+    def skip_missed(self, now: float):
+        """Drop runs, which were missed by `now`, if policy says so."""
+
 
 class OneTimeRun(TaskRunStrategy):
     """For tasks that have to be run once."""
     @property
     def task_has_to_run(self):
-        return self.start_run_time == self.TASK_WAS_NOT_RUN_YET
+        return (
+            self.start_run_time == self.TASK_WAS_NOT_RUN_YET
+            and self.first_run_time <= time.time()
+        )
+
+    def next_run_at(self) -> float:
+        if self.start_run_time == self.TASK_WAS_NOT_RUN_YET:
+            return self.first_run_time
+        return None
 
 
 class IntervalRun(OneTimeRun):
-    """For repeated tasks."""
-    def __init__(self, interval: int = 60):
+    """For repeated tasks.
+
+    Args:
+        interval (int): Seconds between runs.
+        misfire (str): Policy for runs, missed while task was running or
+            late, one of `Misfire`.
+    """
+    def __init__(
+        self,
+        interval: int = 60,
+        misfire: str = Misfire.COALESCE,
+        max_instances: int = 1,
+        jitter: float = 0
+    ):
         if interval <= 0:
             raise ValueError("Time interval can not be equal or less than 0.")
-        super().__init__()
+        if misfire not in Misfire.ALL:
+            raise ValueError(f"Unknown misfire policy {misfire}.")
+        super().__init__(max_instances=max_instances, jitter=jitter)
         self.interval = interval
+        self.misfire = misfire
         self.next_run_time = self.TASK_WAS_NOT_RUN_YET
         self.__calc_next_run_time()
 
     def __calc_next_run_time(self):
-        """Add interval time to last time run. Or, if it is empty, to time
-        created.
+        """Next run time by misfire policy: from last run, or from previous
+        scheduled time. Before first run it is time created (with jitter).
         """
         if self.last_run_time == self.TASK_WAS_NOT_RUN_YET:
-            self.next_run_time = self.time_created
+            self.next_run_time = self.first_run_time
+        elif self.misfire == Misfire.CATCH_UP:
+            self.next_run_time = self.next_run_time + self.interval
+        elif self.misfire == Misfire.SKIP:
+            missed = (self.last_run_time - self.next_run_time) // self.interval
+            self.next_run_time = (
+                self.next_run_time + (max(missed, 0) + 1) * self.interval
+            )
         else:
             self.next_run_time = self.last_run_time + self.interval
 
+    def skip_missed(self, now: float):
+        """With `Misfire.SKIP` move next run time, which passed while task
+        was running, to the next slot of schedule after `now`."""
+        if (
+            self.misfire != Misfire.SKIP
+            or self.last_run_time == self.TASK_WAS_NOT_RUN_YET
+            or self.next_run_time >= now
+        ):
+            return
+        missed = (now - self.next_run_time) // self.interval
+        self.next_run_time += (missed + 1) * self.interval
+
     def mark_start_time(self): # TODO: remove?
         self.start_run_time = time.time()
         self.last_run_time = time.time()
         self.__calc_next_run_time()
 
+    def next_run_at(self) -> float:
+        return self.next_run_time
+
     @property
     def task_has_to_run(self):
         if self.next_run_time <= time.time():
@@ -1,13 +1,17 @@
 """Task manager module."""
 
+import heapq
+import itertools
 import queue
 import threading
 import time
 import uuid
 from typing import Dict, Any
-from concurrent.futures import ThreadPoolExecutor
-from flask_aggregator.back.task_manager.command import Command, State
-from flask_aggregator.back.task_manager.observer import Observer
+from concurrent.futures import (
+    Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor)
+from flask_aggregator.back.task_manager.command import (
+    Command, CommandOutcome, State, execute_command)
+from flask_aggregator.back.task_manager.observer import Observer, TaskEvent
 
 # TODO: consider that default logging module can be used as an option.
 from flask_aggregator.back.logger import Logger
@@ -16,16 +20,56 @@ from flask_aggregator.back.logger import Logger
 # or something like that. Maybe only interface/abstract class.
 from flask_aggregator.back.task_manager.strategy import TaskRunStrategy
 
+class ExecutorKind:
+    """Where task runs are executed."""
+    # Shared thread pool, for I/O-bound commands (default).
+    THREAD = "thread"
+    # Process pool, for CPU-bound commands: they don't hold GIL of I/O
+    # ones. Command must be picklable, only its result, error and state
+    # come back.
+    PROCESS = "process"
+    # Scheduler thread itself, for short commands only: scheduling waits
+    # for them.
+    INLINE = "inline"
+
+    ALL = (THREAD, PROCESS, INLINE)
+
+
+class InlineExecutor(Executor):
+    """Executes calls at once in calling thread."""
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            future.set_exception(e)
+        return future
+
+
 # TODO: consider necessity of TaskResult or CommandResult class. Perhaps it
 # will be easier if there will be incapsulation for command/task execution.
 class Task:
     """Abstract task class. Runs all operations."""
 
-    def __init__(self, name: str, command: Command, strategy: TaskRunStrategy):
+    def __init__(
+        self,
+        name: str,
+        command: Command,
+        strategy: TaskRunStrategy,
+        executor: str = ExecutorKind.THREAD
+    ):
+        if executor not in ExecutorKind.ALL:
+            raise ValueError(f"Unknown executor {executor}.")
         self._uuid = uuid.uuid4()
         self._name = name
         self._command = command
         self._strategy = strategy
+        self._executor = executor
+        self._running = 0
+        self._running_lock = threading.Lock()
+        # Called with task on each state transition: run start and stop
+        # (with result or error), cancel.
+        self._listeners = []
 
     @property
     def uuid(self):
@@ -37,9 +81,43 @@ class Task:
         """Task string name."""
         return self._name
 
+    @property
+    def running(self) -> int:
+        """Count of runs going now."""
+        return self._running
+
+    @property
+    def executor(self) -> str:
+        """Kind of executor for task runs."""
+        return self._executor
+
+    @property
+    def state(self) -> str:
+        """Command state."""
+        return self._command.state
+
+    def add_listener(self, callback):
+        """Call `callback(task)` on each task state transition."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        """Stop calling `callback` on state transitions."""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def __changed(self):
+        for callback in list(self._listeners):
+            callback(self)
+
     def can_be_cancelled(self):
-        """`True` if task is running or should run, `False` otherwise."""
-        return self._command.state == State.RUNNING or self.should_run()
+        """`True` if task is running or should run (now or later), `False`
+        otherwise."""
+        return (
+            self._command.state == State.RUNNING
+            or self._running > 0
+            or self.should_run()
+            or self.next_run_time() is not None
+        )
 
     def to_dict(self) -> dict[str, Any]:
         """JSON-friendly view of task.
@@ -67,26 +145,105 @@ class Task:
         Returns:
             bool: True if task shoud run, False otherwise.
         """
-        if self._strategy.task_has_to_run and not self._command.state in [
-            State.RUNNING, State.FAILED, State.CANCELLED
-        ]:
+        if (
+            self._strategy.task_has_to_run
+            and not self._command.state in [State.FAILED, State.CANCELLED]
+            # Overlapping runs are limited by strategy.
+            and self._strategy.can_start(self._running)
+        ):
             return True
         return False
 
+    def next_run_time(self) -> float:
+        """Epoch time of next run, `None` if task shouldn't run anymore."""
+        if self._command.state in [State.FAILED, State.CANCELLED]:
+            return None
+        when = self._strategy.next_run_at()
+        # Strategy without schedule is run only when it is checked.
+        return when if isinstance(when, (int, float)) else None
+
+    def skip_missed_runs(self, now: float):
+        """Drop runs, missed by `now`, if strategy's misfire policy says
+        so."""
+        self._strategy.skip_missed(now)
+
     def run(self):
         """Execute commands and mark time, when in was run (in epoch
         seconds)."""
+        self.begin_run()
+        self.finish_run()
+
+    def begin_run(self):
+        """Count run as started and mark its start time.
+
+        Called by scheduler before run is passed to executor, so next run
+        time and running count are known at once.
+        """
+        with self._running_lock:
+            self._running += 1
         self._strategy.mark_start_time()
-        self._command.execute()
+        self.__changed()
+
+    def finish_run(self):
+        """Execute command of run, started by `begin_run`."""
+        try:
+            self._command.execute()
+        finally:
+            self.__end_run()
+
+    def submit_run(self, executor: Executor) -> Future:
+        """Start run in `executor`.
+
+        In process pool command is executed on its copy, outcome is applied
+        to task command, when run is done, with the same state transitions.
+
+        Returns:
+            Future: Done, when run is finished.
+        """
+        self.begin_run()
+        if not isinstance(executor, ProcessPoolExecutor):
+            return executor.submit(self.finish_run)
+        self._command.state = State.RUNNING
+        future = executor.submit(execute_command, self._command)
+        future.add_done_callback(self.__apply_outcome)
+        return future
+
+    def __apply_outcome(self, future: Future):
+        try:
+            outcome = future.result()
+        # E.g. command or result is not picklable, or worker died.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            outcome = CommandOutcome(None, str(e) or repr(e), State.FAILED)
+        self._command.result = outcome.result
+        self._command.error = outcome.error
+        if self._command.state != State.CANCELLED:
+            self._command.state = outcome.state
+        self.__end_run()
+
+    def __end_run(self):
         self._strategy.mark_stop_time()
+        with self._running_lock:
+            self._running -= 1
+        self.__changed()
 
     def cancel(self):
         """Set task state to CANCELLED."""
         self._command.state = State.CANCELLED
+        self.__changed()
 
 
 class TaskRegistry:
-    """Holding tasks info."""
+    """Holding tasks info.
+
+    Besides tasks by UUID, registry keeps indexes: UUID by name, UUIDs by
+    state and heap of next run times, so lookups and scheduling don't scan
+    all tasks. Every change bumps `version`: observers get the same cached
+    snapshot until something changes.
+
+    Tasks report their state transitions to registry, which marks them
+    dirty. `publish_changes` sends subscribed observers one batch of events
+    for dirty and removed tasks only.
+    """
 
     _instance = None
 
@@ -97,16 +254,90 @@ class TaskRegistry:
 
     def __init__(self):
         self._tasks: Dict[str, Any] = {}
+        self._names: dict[str, str] = {}
+        self._states: dict[str, set[str]] = {}
+        self._task_states: dict[str, str] = {}
+        # (next run time, sequence, task UUID). Entry is actual only if its
+        # sequence is in `_scheduled` for its task: rescheduled and deleted
+        # tasks leave stale entries, which are skipped.
+        self._schedule: list[tuple[float, int, str]] = []
+        self._scheduled: dict[str, int] = {}
+        self._sequence = itertools.count()
+        self._version = 0
+        self._snapshot = (-1, [])
+        self._dirty: set[str] = set()
+        self._removed: set[str] = set()
+        self._observers: list[Observer] = []
+        self._lock = threading.RLock()
+        self.observer_callback = None
+
+    @property
+    def version(self) -> int:
+        """Number of changes in registry."""
+        return self._version
+
+    def snapshot(self) -> tuple[int, list[dict[str, Any]]]:
+        """Version and JSON-friendly view of all tasks.
+
+        View is built once per version.
+        """
+        with self._lock:
+            if self._snapshot[0] != self._version:
+                self._snapshot = (
+                    self._version, [t.to_dict() for t in self._tasks.values()]
+                )
+            return self._snapshot
+
+    def attach_monitor(self, observer_callback):
+        """Attach callback, which gets all tasks, when they change."""
+        self.observer_callback = observer_callback
+
+    def detatch_monitor(self):
+        """Remove callback, attached by `attach_monitor`."""
         self.observer_callback = None
 
     def notify_monitor(self):
-        """Notify observers about tasks states."""
+        """Send all tasks to attached callback."""
         if not self.observer_callback:
             raise RuntimeError("No server observer callback attached!")
-        result = []
-        for task in self._tasks.values():
-            result.append(task.to_dict())
-        self.observer_callback(result)
+        self.observer_callback(self.snapshot()[1])
+
+    def subscribe(self, observer: Observer):
+        """Send task changes to `observer`."""
+        with self._lock:
+            if observer not in self._observers:
+                self._observers.append(observer)
+
+    def unsubscribe(self, observer: Observer):
+        """Stop sending task changes to `observer`."""
+        with self._lock:
+            if observer in self._observers:
+                self._observers.remove(observer)
+
+    def has_changes(self) -> bool:
+        """`True` if there are changes, which weren't published."""
+        return bool(self._dirty or self._removed)
+
+    def publish_changes(self):
+        """Send changes since previous call to observers, as one batch.
+
+        Attached monitor callback gets all tasks, only if there are
+        changes.
+        """
+        with self._lock:
+            if not self.has_changes():
+                return
+            events = [
+                TaskEvent(task_uuid, self._tasks[task_uuid].to_dict())
+                for task_uuid in self._dirty
+            ] + [TaskEvent(task_uuid, None) for task_uuid in self._removed]
+            self._dirty.clear()
+            self._removed.clear()
+            observers = list(self._observers)
+        for observer in observers:
+            observer.update(events)
+        if self.observer_callback:
+            self.notify_monitor()
 
     def get_tasks(self) -> list[Task]:
         """Get tasks as list.
@@ -124,19 +355,37 @@ class TaskRegistry:
         """
         return list(self._tasks)
 
-    # TODO: make sure that no task with same name exists.
+    def get_tasks_by_state(self, state: str) -> list[Task]:
+        """Tasks, which are in `state` (`RUNNING` if any run goes)."""
+        with self._lock:
+            return [self._tasks[u] for u in self._states.get(state, ())]
+
     def add_task(self, task: Task):
-        """Store result of task execution.
+        """Store task.
 
-        Args:
-            task_uuid (str): Task ID/name.
-            result (Any): Preferably dict, but could be anything.
-            error (str): Error string if there is any, None otherwise.
+        Raises:
+            NameError: If task with same name exists.
         """
-        for t in self._tasks.values():
-            if task.name == t.name:
+        with self._lock:
+            if task.name in self._names:
                 raise NameError(f"Task with name {task.name} already exists.")
-        self._tasks[task.uuid] = task
+            self._tasks[task.uuid] = task
+            self._names[task.name] = task.uuid
+            self.__index_state(task.uuid, self.__state_of(task))
+            self._dirty.add(task.uuid)
+            self._removed.discard(task.uuid)
+            self._version += 1
+        task.add_listener(self.update_task)
+
+    def update_task(self, task: Task):
+        """Reindex task and mark it dirty. Called by task on its state
+        transitions."""
+        with self._lock:
+            if task.uuid not in self._tasks:
+                return
+            self.__index_state(task.uuid, self.__state_of(task))
+            self._dirty.add(task.uuid)
+            self._version += 1
 
     def get_task_by_uuid(self, task_uuid: str) -> Task:
         """Get task.
@@ -158,13 +407,10 @@ class TaskRegistry:
         Returns:
             Task: task instance.
         """
-        result = None
-        for _, task in self._tasks.items():
-            if task.name == task_name:
-                result = task
-        if result:
-            return result
-        raise LookupError(f"No task with name {task_name} found.")
+        task_uuid = self._names.get(task_name)
+        if task_uuid is None:
+            raise LookupError(f"No task with name {task_name} found.")
+        return self._tasks[task_uuid]
 
     def delete_task(self, task_uuid: str):
         """Remore task from inventory.
@@ -172,15 +418,101 @@ class TaskRegistry:
         Args:
             task_uuid (str): Desired task ID/name.
         """
-        self._tasks.pop(task_uuid)
+        with self._lock:
+            task = self._tasks.pop(task_uuid)
+            self._names.pop(task.name, None)
+            self.__index_state(task_uuid, None)
+            self._scheduled.pop(task_uuid, None)
+            self.__forget(task)
+            self._version += 1
 
     def clear(self):
         """Empty task inventory."""
-        self._tasks.clear()
+        with self._lock:
+            for task in self._tasks.values():
+                self.__forget(task)
+            self._tasks.clear()
+            self._names.clear()
+            self._states.clear()
+            self._task_states.clear()
+            self.unschedule_all()
+            self._version += 1
+
+    def schedule(self, task: Task, when: float) -> bool:
+        """Put task to heap of next runs, unless it is there already.
+
+        Returns:
+            bool: `True` if task was put.
+        """
+        with self._lock:
+            if task.uuid in self._scheduled or task.uuid not in self._tasks:
+                return False
+            sequence = next(self._sequence)
+            heapq.heappush(self._schedule, (when, sequence, task.uuid))
+            self._scheduled[task.uuid] = sequence
+            return True
+
+    def is_scheduled(self, task_uuid: str) -> bool:
+        """`True` if task is in heap of next runs."""
+        return task_uuid in self._scheduled
+
+    def next_run_time(self) -> float:
+        """Earliest run time in heap, `None` if it is empty."""
+        with self._lock:
+            self.__drop_stale()
+            return self._schedule[0][0] if self._schedule else None
+
+    def pop_due(self, now: float) -> list[Task]:
+        """Take tasks, which run time has come, out of heap."""
+        result = []
+        with self._lock:
+            self.__drop_stale()
+            while self._schedule and self._schedule[0][0] <= now:
+                _, _, task_uuid = heapq.heappop(self._schedule)
+                del self._scheduled[task_uuid]
+                result.append(self._tasks[task_uuid])
+                self.__drop_stale()
+        return result
+
+    def unschedule_all(self):
+        """Empty heap of next runs."""
+        with self._lock:
+            self._schedule.clear()
+            self._scheduled.clear()
+
+    def __drop_stale(self):
+        while self._schedule and (
+            self._scheduled.get(self._schedule[0][2])
+            != self._schedule[0][1]
+        ):
+            heapq.heappop(self._schedule)
+
+    def __forget(self, task: Task):
+        task.remove_listener(self.update_task)
+        self._dirty.discard(task.uuid)
+        self._removed.add(task.uuid)
+
+    @staticmethod
+    def __state_of(task: Task) -> str:
+        return State.RUNNING if task.running else task.state
+
+    def __index_state(self, task_uuid: str, state: str):
+        old = self._task_states.pop(task_uuid, None)
+        if old is not None:
+            self._states[old].discard(task_uuid)
+        if state is not None:
+            self._task_states[task_uuid] = state
+            self._states.setdefault(state, set()).add(task_uuid)
 
 
 class TaskManager:
-    """TM singleton class."""
+    """TM singleton class.
+
+    Tasks are kept in a min-heap by their next run time. Scheduler thread
+    sleeps until the earliest one is due or a new task is added, finished
+    runs reschedule their tasks from executor callbacks, so idle manager
+    doesn't wake up at all.
+    """
 
     _instance = None
 
@@ -193,33 +525,54 @@ class TaskManager:
         self,
         polling_interval: int = 1,
         max_workers: int = 20,
-        max_iterations: int = None
+        max_iterations: int = None,
+        max_processes: int = None
     ):
         self._executor = ThreadPoolExecutor(
             max_workers=max_workers, thread_name_prefix="fatm"
         )
+        # Process pool is started on first task, which needs it.
+        self._max_processes = max_processes
+        self._executors: dict[str, Executor] = {
+            ExecutorKind.THREAD: self._executor,
+            ExecutorKind.INLINE: InlineExecutor()
+        }
+        # Observers get task changes at most once per polling interval.
         self._polling_interval = polling_interval
+        self._next_publish_time = 0
         self._max_iterations = max_iterations
         self._registry = TaskRegistry()
         self._task_queue = queue.Queue()
-        self._lock = threading.Lock()
+        self._lock = threading.Condition()
         self._running = True
-        self._futures = []
+        self._futures: dict[str, set] = {}
         self._logger = Logger()
-        if max_iterations:
-            self.__iteration = 0    # TODO: DEBUG. Consider removing
+        # TODO: DEBUG. Consider removing. Debug run lasts as long as
+        # `max_iterations` polls used to.
+        self.__deadline = None
 
     def add_task(self, task: Task):
         """Add task to task queue."""
         self._task_queue.put(task)
+        with self._lock:
+            self._lock.notify()
 
     def attach_monitor(self, observer_callback):
         """Attach observer (monitor server) to registry."""
-        self._registry.observer_callback = observer_callback
+        self._registry.attach_monitor(observer_callback)
 
     def detatch_monitor(self):
         """Remove observer (monitor server) from registry."""
-        self._registry.observer_callback = None
+        self._registry.detatch_monitor()
+
+    def subscribe(self, observer: Observer):
+        """Send task changes to `observer`, at most once per polling
+        interval."""
+        self._registry.subscribe(observer)
+
+    def unsubscribe(self, observer: Observer):
+        """Stop sending task changes to `observer`."""
+        self._registry.unsubscribe(observer)
 
     @property
     def registry(self):
@@ -228,54 +581,118 @@ class TaskManager:
 
     def run(self):
         """Run tasks."""
-        while self._running:
-            if self.__is_in_debug() and self.__should_debug_end():
-                self.stop(wait=True, cancel_futures=True)
-                break
-
-            self.__append_tasks_from_queue_if_not_empty()
-            self.__run_tasks()
-
-            time.sleep(self._polling_interval)
-
+        if self.__is_in_debug():
+            self.__deadline = (
+                time.time() + self._max_iterations * self._polling_interval
+            )
+        with self._lock:
+            while self._running:
+                if self.__is_in_debug() and self.__should_debug_end():
+                    break
+                self.__append_tasks_from_queue_if_not_empty()
+                self.__run_due_tasks()
+                self.__publish_changes()
+                self._lock.wait(self.__time_to_next_event())
+
+        if self.__is_in_debug() and self._running:
+            self.stop(wait=True, cancel_futures=True)
         self.__log_results()
 
     def __is_in_debug(self):
         return bool(self._max_iterations)
 
     def __should_debug_end(self):
-        self.__iteration += 1
-        if self.__iteration > self._max_iterations:
-            return True
-        return False
+        return time.time() >= self.__deadline
+
+    def __time_to_next_event(self) -> float:
+        """Seconds to sleep, `None` to sleep until notified."""
+        deadlines = []
+        next_run_time = self._registry.next_run_time()
+        if next_run_time is not None:
+            deadlines.append(next_run_time)
+        if self._registry.has_changes():
+            deadlines.append(self._next_publish_time)
+        if self.__is_in_debug():
+            deadlines.append(self.__deadline)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.time(), 0)
 
     def __append_tasks_from_queue_if_not_empty(self):
         while not self._task_queue.empty():
             task = self._task_queue.get()
-            with self._lock:
-                try:
-                    self._registry.add_task(task)
-                except NameError as e:
-                    self._logger.log_error(str(e))
+            try:
+                self._registry.add_task(task)
+            except NameError as e:
+                self._logger.log_error(str(e))
+                continue
+            # Task without schedule is checked once, when added.
+            self._registry.schedule(
+                task, task.next_run_time() or time.time()
+            )
+
+    def __run_due_tasks(self):
+        now = time.time()
+        for task in self._registry.pop_due(now):
+            if task.should_run():
+                self.__start(task)
+            self.__reschedule(task, now)
+
+    def __start(self, task: Task):
+        # Run is counted before it gets to executor, so next run time and
+        # overlapping limit are already actual for rescheduling.
+        # TODO: add thread naming by task name
+        future = task.submit_run(self.__get_executor(task.executor))
+        self._futures.setdefault(task.uuid, set()).add(future)
+        future.add_done_callback(
+            lambda f, t=task: self.__on_task_done(t, f)
+        )
+
+    def __get_executor(self, kind: str) -> Executor:
+        if kind not in self._executors:
+            self._executors[kind] = ProcessPoolExecutor(
+                max_workers=self._max_processes
+            )
+        return self._executors[kind]
 
-    def __run_tasks(self):
+    def __reschedule(self, task: Task, now: float):
+        """Put task to heap by its next run time, if it is not there yet.
+
+        Task, which is due, but can't start (has as many runs going as
+        allowed), is not put: it is rescheduled when one of runs finishes.
+        Runs, which were missed meanwhile, are dropped by misfire policy
+        first, so skipped slot doesn't start a run at once.
+        """
+        if self._registry.is_scheduled(task.uuid):
+            return
+        task.skip_missed_runs(now)
+        when = task.next_run_time()
+        if when is None or (when <= now and not task.should_run()):
+            return
+        self._registry.schedule(task, when)
+
+    def __on_task_done(self, task: Task, future):
+        """Executor callback: reschedule task and wake scheduler."""
+        try:
+            future.result()
+        # Error of one task must not stop others.
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            self._logger.log_error(f"Task {task.name} failed: {e}")
         with self._lock:
-            for uuid_ in self._registry.get_tasks_uuid():
-                task = self._registry.get_task_by_uuid(uuid_)
-                if task.should_run():
-                    # TODO: add thread naming by task name
-                    future = self._executor.submit(task.run)
-                    self._futures.append(future)
-
-            tasks_pending = []
-            for f in self._futures:
-                if f.done():
-                    f.result()
-                else:
-                    tasks_pending.append(f)
-
-            self._registry.notify_monitor()
-            self._futures = tasks_pending
+            futures = self._futures.get(task.uuid, set())
+            futures.discard(future)
+            if not futures:
+                self._futures.pop(task.uuid, None)
+            if self._running:
+                self.__reschedule(task, time.time())
+            self._lock.notify()
+
+    def __publish_changes(self):
+        """Send task changes to observers, if it is time to."""
+        now = time.time()
+        if self._registry.has_changes() and now >= self._next_publish_time:
+            self._registry.publish_changes()
+            self._next_publish_time = now + self._polling_interval
 
     def __log_results(self):
         self._logger.log_info("Stopped working. Tasks results below.")
@@ -294,12 +711,18 @@ class TaskManager:
             wait (bool, optional): Should wait for processes to finish.
                 Defaults to True.
         """
-        self._running = False
+        with self._lock:
+            self._running = False
+            self._registry.unschedule_all()
+            self._lock.notify()
         for task in self._registry.get_tasks():
             if task.can_be_cancelled():
                 task.cancel()
 
-        self._executor.shutdown(
-            wait=wait,
-            cancel_futures=cancel_futures
-        )
+        for executor in list(self._executors.values()):
+            executor.shutdown(
+                wait=wait,
+                cancel_futures=cancel_futures
+            )
+        # Final states are sent without waiting for polling interval.
+        self._registry.publish_changes()
@@ -1,49 +1,97 @@
-"""View objects with decorators."""
+"""View objects and column conversions."""
 
 from collections import OrderedDict
+from collections.abc import Iterable, Iterator
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from operator import attrgetter
 
 from sqlalchemy import Row
 
 from flask_aggregator.back.models import get_base
 
-def convert_bytes(col_name, unit="GB"):
-    """Recalculating bytes for convenience. Only dicts."""
-    units = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
-
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            if isinstance(result, dict) and col_name in result:
-                b = result[col_name]
-                if unit in units:
-                    result[col_name] = b / units[unit]
-                else:
-                    raise ValueError(
-                        "Unknown unit! Allowed: B, KB, MB, GB, TB."
-                    )
-            return result
-        return wrapper
-    return decorator
-
-def convert_backup_type(col_name):
-    """So far, viable only for Backups table (column 'source_key').
-
-    And converting only dicts."""
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            result = func(*args, **kwargs)
-            if isinstance(result, dict) and col_name in result:
-                result[col_name] = (
-                    "tape" if "POOL" in result[col_name] else "disk"
-                )
-            return result
-        return wrapper
-    return decorator
+UNITS = {"B": 1, "KB": 1024, "MB": 1024**2, "GB": 1024**3, "TB": 1024**4}
+
+def to_unit(unit="GB"):
+    """Make function, recalculating bytes to `unit`."""
+    if unit not in UNITS:
+        raise ValueError("Unknown unit! Allowed: B, KB, MB, GB, TB.")
+    divider = UNITS[unit]
+
+    def convert(b):
+        return None if b is None else b / divider
+    return convert
+
+def to_backup_type(source_key):
+    """So far, viable only for Backups table (column 'source_key')."""
+    return "tape" if "POOL" in source_key else "disk"
+
+# Conversions applied to view data. Each one is used only if its column is
+# present in column order.
+COLUMN_CONVERSIONS = {
+    "total": to_unit("GB"),
+    "available": to_unit("GB"),
+    "used": to_unit("GB"),
+    "committed": to_unit("GB"),
+    "source_key": to_backup_type,
+}
+
+
+class RowConverter:
+    """Compiled conversion of raw rows for given column order.
+
+    Column getters and only applicable conversions are prepared once, so
+    converting a row is a single pass over its values.
+    """
+    __slots__ = ("__cols", "__getter", "__conversions")
+
+    def __init__(self, cols: tuple[str]):
+        self.__cols = cols
+        if not cols:
+            self.__getter = lambda obj: ()
+        elif len(cols) == 1:
+            # Single argument attrgetter returns value, not tuple.
+            getter = attrgetter(cols[0])
+            self.__getter = lambda obj: (getter(obj),)
+        else:
+            self.__getter = attrgetter(*cols)
+        self.__conversions = tuple(
+            (i, COLUMN_CONVERSIONS[col])
+            for i, col in enumerate(cols)
+            if col in COLUMN_CONVERSIONS
+        )
+
+    @property
+    def cols(self) -> tuple[str]:
+        """Column order."""
+        return self.__cols
+
+    def values(self, obj) -> list:
+        """Get converted values of row in column order."""
+        values = list(self.__getter(obj))
+        for i, convert in self.__conversions:
+            values[i] = convert(values[i])
+        return values
+
+    def to_dict(self, obj) -> OrderedDict:
+        """Get converted row as dict."""
+        return OrderedDict(zip(self.__cols, self.values(obj)))
+
+
+# Column orders may come from request, so number of cached converters is
+# limited.
+@lru_cache(maxsize=256)
+def _compile_converter(model: type, cols: tuple[str]) -> RowConverter:
+    """One converter per (model, column order) pair."""
+    if not issubclass(model, Row) and not issubclass(model, get_base()):
+        raise ValueError("Unknown object class instance.")
+    return RowConverter(cols)
 
 
 class ViewObject(ABC):
     """Abstract class for all view objects."""
+    __slots__ = ()
+
     @abstractmethod
     def to_dict(self):
         """Every view object should be able to represent itself as dict/JSON.
@@ -68,32 +116,44 @@ class ViewObjectFactory:
             return SQLModelViewObject(obj, cols)
         raise ValueError("Unknown object class instance.")
 
+    @staticmethod
+    def get_converter(model: type, cols: list[str]) -> RowConverter:
+        """Return cached converter for rows of `model` class.
+
+        Args:
+            model (type): SQLAlchemy model or `Row` class.
+            cols (list[str]): Column order.
+
+        Raises:
+            ValueError: For unknown classes.
+        """
+        return _compile_converter(model, tuple(cols))
+
+    @staticmethod
+    def iter_dicts(rows: Iterable, cols: list[str]) -> Iterator[OrderedDict]:
+        """Convert raw rows to dicts without making view objects."""
+        converter = None
+        for row in rows:
+            if converter is None:
+                converter = ViewObjectFactory.get_converter(
+                    row.__class__, cols
+                )
+            yield converter.to_dict(row)
+
 class SQLModelViewObject(ViewObject):
     """Concrete SQLAlchemy model (table) view object."""
+    __slots__ = ("__model", "__cols")
+
     def __init__(self, model, cols):
-        # Copying source class attributes to this one.
-        # This might be redundant, but I want to have some flexibility if
-        # ViewObject class functionality will be extended. Working with class
-        # attributes is more 'clean' (IMO).
+        # Source object is kept as is, its attributes are read (and
+        # converted) only in `to_dict`.
+        self.__model = model
         self.__cols = cols
-        for col in self.__cols:
-            setattr(self, col, getattr(model, col))
-
-    @convert_backup_type("source_key")
-    @convert_bytes("total", "GB")
-    @convert_bytes("available", "GB")
-    @convert_bytes("used", "GB")
-    @convert_bytes("committed", "GB")
+
     def to_dict(self):
-        return (
-            OrderedDict(
-                zip(
-                    self.__cols, (
-                        getattr(self, col) for col in self.__cols
-                    )
-                )
-            )
-        )
+        return ViewObjectFactory.get_converter(
+            self.__model.__class__, self.__cols
+        ).to_dict(self.__model)
 
     def set_obj_attrs(self, lst: list[str]):
         self.__cols = lst
@@ -103,30 +163,16 @@ class SQLModelViewObject(ViewObject):
 
 class SQLTupleViewObject(ViewObject):
     """Concrete SQLAlchemy tuple (query result) view object."""
+    __slots__ = ("__row_obj", "__cols")
+
     def __init__(self, row_obj, cols):
-        # Copying source class attributes to this one.
-        # This might be redundant, but I want to have some flexibility if
-        # ViewObject class functionality will be extended. Working with class
-        # attributes is more 'clean' (IMO).
+        self.__row_obj = row_obj
         self.__cols = cols
-        for col in self.__cols:
-            setattr(self, col, getattr(row_obj, col))
-
-    @convert_backup_type("source_key")
-    @convert_bytes("total", "GB")
-    @convert_bytes("available", "GB")
-    @convert_bytes("used", "GB")
-    @convert_bytes("committed", "GB")
+
     def to_dict(self):
-        return (
-            OrderedDict(
-                zip(
-                    self.__cols, (
-                        getattr(self, col) for col in self.__cols
-                    )
-                )
-            )
-        )
+        return ViewObjectFactory.get_converter(
+            self.__row_obj.__class__, self.__cols
+        ).to_dict(self.__row_obj)
 
     def set_obj_attrs(self, lst: list[str]):
         self.__cols = lst
@@ -1,14 +1,17 @@
 """Cenral module for virtualizations."""
 
+import os
 from concurrent.futures import ThreadPoolExecutor
-from itertools import zip_longest
+from datetime import datetime, timezone
 
 from flask_aggregator.config import Config
 from flask_aggregator.back.virt_protocol import VirtProtocol
 from flask_aggregator.back.ovirt_helper import OvirtHelper
+from flask_aggregator.back.rosplatforma_helper import RosplatformaHelper
 from flask_aggregator.back.file_handler import FileHandler
 from flask_aggregator.back.logger import Logger
 from flask_aggregator.back.dbmanager import DBManager
+from flask_aggregator.back.models import UserVmPermission
 
 class VirtAggregator():
     """Operate different virtualizations automation."""
@@ -96,9 +99,15 @@ class VirtAggregator():
         self.__logger.log_debug(f"Started thread {dpcs}-{function_name}.")
         dbmanager = DBManager()
         raw_data = getattr(virt_helper, function_name)()
+        if not raw_data:
+            dbmanager.close()
+            self.__logger.log_debug(
+                f"Finished thread {dpcs}-{function_name}: no data."
+            )
+            return
         # TODO: Some research is required to deduplicate any entity.
         dbmanager.upsert_data(
-            Config.DB_MODELS[table],
+            virt_helper.db_models.get(table, Config.DB_MODELS[table]),
             raw_data,
             ["uuid"],
             ["id", "uuid"]
@@ -106,66 +115,86 @@ class VirtAggregator():
         dbmanager.close()
         self.__logger.log_debug(f"Finished thread {dpcs}-{function_name}.")
 
-    def create_vms(self, file_handler: FileHandler) -> None:
-        """Creating VMs with configs stored in JSON files."""
-        futures = {}
+    def create_vms(self, file_handler: FileHandler) -> list[dict]:
+        """Creating VMs with configs stored in JSON files.
+
+        Each helper creates its VMs as pipeline of stages, helpers are run in
+        parallel.
+
+        Returns:
+            list[dict]: Provisioning report of each helper: DPCs, VM results
+                and per-stage stats.
+        """
+        reports = []
 
         # 1. Establish connections with all virtualization endpoints.
         self.__connect_to_virtualizations()
 
-        # 2. Run threads to gather info from virtualizations.
-        for dpc in file_handler.dpc_vm_configs:
-            futures[dpc] = []
+        # 2. Run pipeline in each virtualization.
         self.__logger.log_debug(
             f"{self.__class__.__name__} - Starting futures."
         )
         with ThreadPoolExecutor(
             max_workers=10, thread_name_prefix="creator"
         ) as executor:
+            futures = {}
             for virt_helper in self.__virt_helpers:
-                for dpc, vm_configs in file_handler.dpc_vm_configs.items():
-                    for vm_config in vm_configs:
-                        if dpc in virt_helper.dpc_list:
-                            futures[dpc].append(executor.submit(
-                                virt_helper.create_vm, vm_config
-                            ))
-        for futures_tuple in zip_longest(*futures.values()):
-            self.__logger.log_debug(futures_tuple)
-            for future in futures_tuple:
-                if future is not None:
-                    future.result()
+                if not virt_helper.supports_creation:
+                    continue
+                vm_configs = [
+                    vm_config
+                    for dpc, configs in file_handler.dpc_vm_configs.items()
+                    if dpc in virt_helper.dpc_list
+                    for vm_config in configs
+                ]
+                if vm_configs:
+                    futures[executor.submit(
+                        virt_helper.provision_vms, vm_configs
+                    )] = virt_helper.dpc_list
+            for future, dpc_list in futures.items():
+                reports.append({"dpc_list": dpc_list, **future.result()})
 
         # 3. Close connections with virtualizations safely.
         self.__disconnect_from_virtualizations()
+        return reports
+
+    def create_vlans(self, file_handler: FileHandler) -> list[dict]:
+        """Create VLAN's based on input JSON configs.
 
-    def create_vlans(self, file_handler: FileHandler) -> None:
-        """Create VLAN's based on input JSON configs."""
-        futures = {}
+        Returns:
+            list[dict]: For each helper - DPCs and per-host attach results.
+        """
+        reports = []
 
         self.__connect_to_virtualizations()
 
-        for dpc in file_handler.dpc_vm_configs:
-            futures[dpc] = []
         self.__logger.log_debug(
             f"{self.__class__.__name__} - Starting futures."
         )
         with ThreadPoolExecutor(
             max_workers=10, thread_name_prefix="creator"
         ) as executor:
+            futures = {}
             for virt_helper in self.__virt_helpers:
-                for dpc, vm_configs in file_handler.dpc_vm_configs.items():
-                    for vm_config in vm_configs:
-                        if dpc in virt_helper.dpc_list:
-                            futures[dpc].append(executor.submit(
-                                virt_helper.create_vlan, vm_config
-                            ))
-        for futures_tuple in zip_longest(*futures.values()):
-            self.__logger.log_debug(futures_tuple)
-            for future in futures_tuple:
-                if future is not None:
-                    future.result()
+                if not virt_helper.supports_creation:
+                    continue
+                vlan_configs = [
+                    vlan_config
+                    for dpc, configs in file_handler.dpc_vm_configs.items()
+                    if dpc in virt_helper.dpc_list
+                    for vlan_config in configs
+                ]
+                if vlan_configs:
+                    futures[executor.submit(
+                        virt_helper.create_vlans, vlan_configs
+                    )] = virt_helper.dpc_list
+            for future, dpc_list in futures.items():
+                reports.append(
+                    {"dpc_list": dpc_list, "hosts": future.result()}
+                )
 
         self.__disconnect_from_virtualizations()
+        return reports
 
     def create_virt_helpers(
             self, file_handler: dict=None, dpc_list: list=None
@@ -194,6 +223,64 @@ class VirtAggregator():
                 self.__virt_helpers.append(OvirtHelper(
                     dpc_list=[dpc], logger=self.__logger
                 ))
+            # RP is collected only where its SSH password is set.
+            if Config.RP_HOSTS and os.getenv("RP_PASS") is not None:
+                self.__virt_helpers.append(RosplatformaHelper(
+                    hosts=Config.RP_HOSTS, logger=self.__logger
+                ))
+
+    def refresh_user_vm_permissions(self) -> dict:
+        """Update `user_vm_permissions` table from all virtualizations.
+
+        Only new and changed permissions are written, removed ones are
+        deleted. Engines, which answered, are synced even without any
+        permission found. Engines, which failed to answer (or engines of
+        failed helper), are left as is.
+
+        Returns:
+            dict: DPC -> `upserted`, `deleted` and `unchanged` count.
+        """
+        result = {}
+        self.__connect_to_virtualizations()
+        dbmanager = DBManager()
+        try:
+            with ThreadPoolExecutor(
+                max_workers=10, thread_name_prefix="collector"
+            ) as executor:
+                futures = {
+                    virt_helper: executor.submit(virt_helper.get_user_vm_list)
+                    for virt_helper in self.__virt_helpers
+                }
+                # DPC -> its permissions, only for DPCs, which answered.
+                engine_rows = {}
+                for virt_helper, future in futures.items():
+                    # Failed helper doesn't stop others' engines update.
+                    try:
+                        engine_rows.update(future.result())
+                    except Exception as e:  # pylint: disable=broad-exception-caught
+                        self.__logger.log_error(
+                            "Failed to get user VM permissions from "
+                            f"{virt_helper.pretty_name}: {e}"
+                        )
+            updated_at = datetime.now(timezone.utc)
+            for dpc in sorted(engine_rows):
+                rows = engine_rows[dpc]
+                for row in rows:
+                    row["updated_at"] = updated_at
+                result[dpc] = dbmanager.sync_data(
+                    UserVmPermission,
+                    rows,
+                    "uuid",
+                    {"engine": dpc},
+                    ["user_name", "user_uuid", "vm_uuid", "vm_name", "role"]
+                )
+                self.__logger.log_info(
+                    f"User VM permissions in {dpc}: {result[dpc]}."
+                )
+        finally:
+            dbmanager.close()
+            self.__disconnect_from_virtualizations()
+        return result
 
     def collect_user_vms_list(self):
         """Test function, to be removed eventually."""
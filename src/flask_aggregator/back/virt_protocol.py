@@ -4,14 +4,25 @@ from typing import Protocol
 
 class VirtProtocol(Protocol):
     """Protocol for virtualization classes."""
+    # Table -> model for data of this virtualization, where it differs from
+    # `Config.DB_MODELS` (e.g. own VM table).
+    db_models: dict = {}
+    # Whether VMs and VLANs can be created (`create_*`, `provision_vms`).
+    # Aggregator doesn't pass creation configs to helpers without it.
+    supports_creation: bool = True
+
     def connect_to_virtualization(self) -> None:
         """Open connections with virtualization endpoint"""
     def disconnect_from_virtualization(self) -> None:
         """Close connections with virtualization endpoint."""
     def create_vm(self, config: dict) -> None:
         """Create VM."""
+    def provision_vms(self, configs: list) -> dict:
+        """Create many VMs, overlapping creation stages."""
     def create_vlan(self, config: dict) -> None:
         """Create VLAN."""
+    def create_vlans(self, configs: list) -> dict:
+        """Create many VLANs, attaching them to each host at once."""
     def get_vms(self) -> list:
         """Get all VMs."""
     def get_hosts(self) -> list:
@@ -0,0 +1,254 @@
+"""Waiting for conditions with backoff and deadline.
+
+`wait_until` blocks calling thread and checks condition by itself.
+`Poller` runs checks of many waits in one thread, so dozens of concurrent
+waits (e.g. VMs being created in one engine) don't make dozens of polling
+loops. `RateLimiter` spaces out requests to the same server.
+"""
+
+import random
+import threading
+import time
+from typing import Any, Callable
+
+
+class WaitTimeoutError(TimeoutError):
+    """Condition wasn't met before deadline."""
+
+
+class Backoff:
+    """Exponential backoff intervals with jitter.
+
+    Each next interval is `factor` times longer than previous, up to
+    `max_interval`. Every interval is randomly changed by up to `jitter`
+    share of it, so waits, started together, don't hit server together.
+    """
+    __slots__ = ("__initial", "__factor", "__max", "__jitter", "__current")
+
+    def __init__(
+        self,
+        initial: float = 1,
+        factor: float = 2,
+        max_interval: float = 30,
+        jitter: float = 0.2
+    ):
+        if initial <= 0 or factor < 1 or max_interval < initial:
+            raise ValueError("Invalid backoff parameters.")
+        if not 0 <= jitter < 1:
+            raise ValueError("'jitter' must be in [0, 1).")
+        self.__initial = initial
+        self.__factor = factor
+        self.__max = max_interval
+        self.__jitter = jitter
+        self.__current = initial
+
+    def next(self) -> float:
+        """Get next interval in seconds."""
+        interval = self.__current
+        self.__current = min(self.__current * self.__factor, self.__max)
+        return interval * random.uniform(1 - self.__jitter, 1 + self.__jitter)
+
+    def reset(self):
+        """Start from initial interval again."""
+        self.__current = self.__initial
+
+
+def wait_until(
+    check: Callable[[], Any],
+    timeout: float,
+    backoff: Backoff = None,
+    description: str = "condition",
+    clock: Callable[[], float] = time.monotonic,
+    sleep: Callable[[float], None] = time.sleep
+) -> Any:
+    """Call `check` until it returns truthy value.
+
+    Args:
+        check (Callable[[], Any]): Condition. Exceptions are not caught.
+        timeout (float): Overall deadline in seconds.
+        backoff (Backoff): Intervals between checks. Defaults to `Backoff()`.
+        description (str): What is awaited, for error message.
+
+    Raises:
+        WaitTimeoutError: If condition wasn't met in time.
+
+    Returns:
+        Any: Truthy value, returned by `check`.
+    """
+    backoff = backoff or Backoff()
+    deadline = clock() + timeout
+    while True:
+        result = check()
+        if result:
+            return result
+        remaining = deadline - clock()
+        if remaining <= 0:
+            raise WaitTimeoutError(
+                f"Timed out after {timeout}s waiting for {description}."
+            )
+        sleep(min(backoff.next(), remaining))
+
+
+class _Wait:
+    """Single registered wait in poller."""
+    __slots__ = (
+        "check", "deadline", "backoff", "next_at", "description", "done",
+        "result", "error"
+    )
+
+    def __init__(self, check, deadline, backoff, description):
+        self.check = check
+        self.deadline = deadline
+        self.backoff = backoff
+        self.next_at = 0
+        self.description = description
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class Poller:
+    """One thread, checking conditions of all waits, registered in it.
+
+    Each wait has its own backoff and deadline, thread sleeps until the
+    nearest check is due. Thread is started on first wait and runs until
+    `stop`.
+    """
+    def __init__(
+        self,
+        name: str = "poller",
+        backoff_factory: Callable[[], Backoff] = Backoff,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.__name = name
+        self.__backoff_factory = backoff_factory
+        self.__clock = clock
+        self.__waits: list[_Wait] = []
+        self.__cond = threading.Condition()
+        self.__thread = None
+        self.__running = False
+
+    def wait(
+        self,
+        check: Callable[[], Any],
+        timeout: float,
+        description: str = "condition",
+        backoff: Backoff = None
+    ) -> Any:
+        """Block calling thread until `check` returns truthy value.
+
+        `check` is called from poller thread. If it raises, exception is
+        re-raised here.
+
+        Raises:
+            WaitTimeoutError: If condition wasn't met in time.
+            RuntimeError: If poller was stopped during wait.
+
+        Returns:
+            Any: Truthy value, returned by `check`.
+        """
+        w = _Wait(
+            check,
+            self.__clock() + timeout,
+            backoff or self.__backoff_factory(),
+            description
+        )
+        with self.__cond:
+            if not self.__running:
+                self.__running = True
+                self.__thread = threading.Thread(
+                    target=self.__run, name=self.__name, daemon=True
+                )
+                self.__thread.start()
+            self.__waits.append(w)
+            self.__cond.notify()
+        w.done.wait()
+        if w.error is not None:
+            raise w.error
+        return w.result
+
+    def stop(self):
+        """Stop poller thread. Unfinished waits get `RuntimeError`."""
+        with self.__cond:
+            if not self.__running:
+                return
+            self.__running = False
+            self.__cond.notify()
+            thread = self.__thread
+        thread.join()
+
+    def __run(self):
+        while True:
+            with self.__cond:
+                if not self.__running:
+                    for w in self.__waits:
+                        w.error = RuntimeError("Poller was stopped.")
+                        w.done.set()
+                    self.__waits.clear()
+                    return
+                now = self.__clock()
+                due = [w for w in self.__waits if w.next_at <= now]
+                if not due:
+                    wake_at = min(
+                        (min(w.next_at, w.deadline) for w in self.__waits),
+                        default=None
+                    )
+                    self.__cond.wait(
+                        None if wake_at is None else wake_at - now
+                    )
+                    continue
+            # Checks are run without lock, so new waits can be registered
+            # meanwhile.
+            for w in due:
+                self.__check(w)
+            with self.__cond:
+                self.__waits = [w for w in self.__waits if not w.done.is_set()]
+
+    def __check(self, w: _Wait):
+        try:
+            result = w.check()
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            w.error = e
+            w.done.set()
+            return
+        now = self.__clock()
+        if result:
+            w.result = result
+            w.done.set()
+        elif now >= w.deadline:
+            w.error = WaitTimeoutError(
+                f"Timed out waiting for {w.description}."
+            )
+            w.done.set()
+        else:
+            w.next_at = min(now + w.backoff.next(), w.deadline)
+
+
+class RateLimiter:
+    """Lets callers through no more often than `rate` times per second.
+
+    Thread-safe: concurrent callers get consecutive slots, each waits for
+    its own.
+    """
+    def __init__(
+        self,
+        rate: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        if rate <= 0:
+            raise ValueError("'rate' must be positive.")
+        self.__interval = 1 / rate
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__next_at = None
+        self.__lock = threading.Lock()
+
+    def acquire(self):
+        """Block until caller's slot comes."""
+        with self.__lock:
+            now = self.__clock()
+            slot = now if self.__next_at is None else max(now, self.__next_at)
+            self.__next_at = slot + self.__interval
+        if slot > now:
+            self.__sleep(slot - now)
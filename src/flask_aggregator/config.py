@@ -4,7 +4,7 @@ import os
 
 from flask_aggregator.back.models import (
     Vm, Host, Cluster, DataCenter, Storage, Backups, ElmaVM, BackupsView,
-    VmsToBeBackedUpView
+    VmsToBeBackedUpView, UserVmPermission
 )
 
 class Config:
@@ -114,7 +114,8 @@ class Config:
         "elma_vms": ElmaVM,
         "backups_view": BackupsView,
         "vms_to_be_backed_up_view": VmsToBeBackedUpView,
-        "backups_tape": Backups
+        "backups_tape": Backups,
+        "user_vm_permissions": UserVmPermission
     }
 
     # CB database connection.
@@ -3,31 +3,33 @@
 Used primarily for aggregating oVirt information.
 """
 
+import hashlib
 import json
 import os
+from datetime import datetime
 from urllib.parse import urlencode
-import io
 
-import pandas as pd
 from flask import (
-    Flask, request, render_template, jsonify, send_file
+    Flask, Response, request, render_template, jsonify, make_response,
+    stream_with_context
 )
+from werkzeug.http import is_resource_modified
 
 from flask_aggregator.config import (
     Config, DevelopmentConfig, ProductionConfig
 )
 from flask_aggregator.back.models import DataCenter, Cluster
 from flask_aggregator.back.logger import Logger
-from flask_aggregator.back.virt_aggregator import VirtAggregator
 from flask_aggregator.back.ovirt_helper import OvirtHelper
-from flask_aggregator.back.file_handler import FileHandler
 from flask_aggregator.back.dbmanager import DBManager
 from flask_aggregator.back.models import Storage
 # from flask_aggregator.back.controllers import DBController
 from flask_aggregator.back.db import (
-    DBRepositoryFactory, DBRepository, DBConnection
+    DBRepositoryFactory, DBRepository, DBConnection, DBTableVersions
 )
 from flask_aggregator.back.view_object import ViewObjectFactory, ViewObject
+from flask_aggregator.back.export import ExporterFactory, dumps_json
+from flask_aggregator.back.jobs import JobQueue
 from flask_aggregator.front.view import (
     TextField,
     DropDownField,
@@ -37,6 +39,7 @@ from flask_aggregator.front.view import (
     Table,
     TableRow,
     TableCell,
+    TableBody,
     LinkButton
 )
 
@@ -47,6 +50,99 @@ class FlaskAggregator():
         self.__app = Flask(__name__)
         self.__configure_routes()
 
+    def __get_db_connection(self) -> DBConnection:
+        """Make connection to aggregator database, based on `FA_ENV`."""
+        return DBConnection(
+            DevelopmentConfig.DB_URL
+            if os.getenv("FA_ENV") == "dev"
+            else ProductionConfig.DB_URL
+        )
+
+    def __get_cache_validators(
+        self,
+        db_con: DBConnection,
+        tables: list[str],
+        time_filters: list[str] = ()
+    ) -> tuple[str, datetime]:
+        """Make `ETag` and `Last-Modified` values for current request.
+
+        ETag covers both tables versions and request URL (filters, page,
+        sorting), so every distinct view gets its own validator.
+
+        Args:
+            db_con (DBConnection): Connection to aggregator database.
+            tables (list[str]): Tables, which data is in response.
+            time_filters (list[str]): Filters, relative to current time.
+                Response changes with time, if any of them is set.
+
+        Returns:
+            tuple[str, datetime]: ETag and last modification time.
+                `(None, None)` if response can't be validated: versions
+                table is absent or time relative filter is set.
+        """
+        if any(request.args.get(name) for name in time_filters):
+            return None, None
+        session = db_con.get_scoped_session()
+        versions = DBTableVersions.get_versions(session, tables)
+        session.close()
+        if versions is None:
+            return None, None
+        seed = request.full_path + ''.join(
+            f";{k}={v.isoformat()}" for k, v in sorted(versions.items())
+        )
+        etag = hashlib.sha1(seed.encode()).hexdigest()
+        return etag, max(versions.values())
+
+    def __is_not_modified(self, etag: str, last_modified: datetime) -> bool:
+        """Check conditional request headers against validators."""
+        return etag is not None and not is_resource_modified(
+            request.environ, etag=etag, last_modified=last_modified
+        )
+
+    def __set_cache_validators(
+        self, response: Response, etag: str, last_modified: datetime
+    ) -> Response:
+        """Add `ETag`/`Last-Modified` headers to response, if there are any.
+
+        `no-cache` makes clients revalidate every time instead of showing
+        stale data.
+        """
+        if etag is not None:
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            response.cache_control.no_cache = True
+        return response
+
+    def __submit_json_file_job(self, job_type: str) -> Response:
+        """Put job with uploaded JSON file as payload into job queue.
+
+        Returns:
+            Response: `202 Accepted` with job id and status URL, `400` if
+                file is absent or is not valid JSON.
+        """
+        if "jsonfile" not in request.files:
+            return jsonify({"error": "No file part."}), 400
+
+        json_file = request.files["jsonfile"]
+
+        if json_file.name == '':
+            return jsonify({"error": "No selected file."}), 400
+
+        if not (json_file and json_file.filename.endswith(".json")):
+            return jsonify({"error": "File is not a valid JSON."}), 400
+        try:
+            payload = json.load(json_file)
+        except json.JSONDecodeError:
+            return jsonify({"error": "Invalid JSON file."}), 400
+        job_id = JobQueue(self.__get_db_connection()).submit(
+            job_type, payload
+        )
+        status_url = f"/jobs/{job_id}"
+        response = jsonify({"job_id": job_id, "status_url": status_url})
+        response.status_code = 202
+        response.headers["Location"] = status_url
+        return response
+
     def __configure_routes(self):
         """Configure each url for server."""
         @self.__app.route('/')
@@ -58,18 +154,25 @@ class FlaskAggregator():
         def view(model_name):
             # Set up connection and correct repository for database
             # interactions.
-            db_con = DBConnection(
-                DevelopmentConfig.DB_URL
-                if os.getenv("FA_ENV") == "dev"
-                else ProductionConfig.DB_URL
+            db_con = self.__get_db_connection()
+            # If data hasn't changed since client's last visit - there is no
+            # need to query and render it again.
+            etag, last_modified = self.__get_cache_validators(
+                db_con,
+                DBRepositoryFactory.get_repo_tables(model_name),
+                DBRepositoryFactory.get_repo_time_filters(model_name)
             )
+            if self.__is_not_modified(etag, last_modified):
+                return self.__set_cache_validators(
+                    Response(status=304), etag, last_modified
+                )
             repo_factory = DBRepositoryFactory()
             repo_factory.set_connection(db_con)
             repo = repo_factory.make_repo(model_name)
             # Get filters from frontend.
-            filters = {}
-            for fltr in repo.filter_fields:
-                filters[fltr["name"]] = request.args.get(fltr["name"])
+            filters = {
+                name: request.args.get(name) for name in repo.filter_names
+            }
             # Pass filters to database backend.
             repo.add_filter(
                 filters=filters,
@@ -80,11 +183,7 @@ class FlaskAggregator():
             )
             # Make data from repository.
             raw_data, item_count = repo.build()
-            raw_view_objects = [
-                ViewObjectFactory.create_obj(obj, repo.col_order)
-                for obj in raw_data
-            ]
-            data = [obj.to_dict() for obj in raw_view_objects]
+            data = list(ViewObjectFactory.iter_dicts(raw_data, repo.col_order))
             # Make pagination function, which is being passed to frontend.
             def get_pagination_url(page: int) -> str:
                 args = request.args.to_dict()
@@ -160,7 +259,9 @@ class FlaskAggregator():
                 name="table-view"
             )
             table_header_container = UIContainer(tag="thead")
-            table_body_container = UIContainer(tag="tbody")
+            table_body_container = TableBody(
+                repo.col_order, data, links={"href": "ovirt engine link"}
+            )
             table_container.add_component(table)
             table.add_component(table_header_container)
             table.add_component(table_body_container)
@@ -173,17 +274,6 @@ class FlaskAggregator():
                     class_="table-clickable-header"
                 ))
             table_header_container.add_component(table_header)
-            for row in data:
-                table_row = TableRow()
-                for k, v in row.items():
-                    if k == "href":
-                        table_row.add_component(TableCell(
-                            "ovirt engine link",
-                            link=v
-                        ))
-                    else:
-                        table_row.add_component(TableCell(v))
-                table_body_container.add_component(table_row)
             layout = UIContainer(
                 id_="view",
                 name="view"
@@ -191,65 +281,179 @@ class FlaskAggregator():
             view_footer_container = UIContainer(class_="view-footer-container")
             download_btn = LinkButton(
                 label="Download as CSV",
-                href=f"/download/{model_name}"
+                href=(
+                    f"/download/{model_name}?"
+                    f"{urlencode({**request.args.to_dict(), 'all': 1})}"
+                )
             )
             view_footer_container.add_component(download_btn)
             layout.add_component(filter_container)
             layout.add_component(table_container)
             layout.add_component(view_footer_container)
 
-            return render_template(
+            response = make_response(render_template(
                 "test.html",
                 layout=layout,
                 **kwargs
+            ))
+            return self.__set_cache_validators(
+                response, etag, last_modified
             )
 
         @self.__app.route("/download/<model_name>")
         def view_csv(model_name):
-            """Get file from frontend."""
-            db_con = DBConnection(
-                DevelopmentConfig.DB_URL
-                if os.getenv("FA_ENV") == "dev"
-                else ProductionConfig.DB_URL
+            """Get file from frontend.
+
+            Format is set by `format` argument: `csv` (default), `csv.gz`,
+            `ndjson` or `parquet`.
+            """
+            db_con = self.__get_db_connection()
+            etag, last_modified = self.__get_cache_validators(
+                db_con,
+                DBRepositoryFactory.get_repo_tables(model_name),
+                DBRepositoryFactory.get_repo_time_filters(model_name)
             )
+            if self.__is_not_modified(etag, last_modified):
+                return self.__set_cache_validators(
+                    Response(status=304), etag, last_modified
+                )
             repo_factory = DBRepositoryFactory()
             repo_factory.set_connection(db_con)
             repo = repo_factory.make_repo(model_name)
-            # Make data from repository.
-            raw_data, _ = repo.build()
-            raw_view_objects = [
-                ViewObjectFactory.create_obj(obj, repo.col_order)
-                for obj in raw_data
-            ]
-            data = [obj.to_dict() for obj in raw_view_objects]
-            # Saving as .csv file.
-            df = pd.DataFrame(data)
-            memory_output = io.BytesIO()
-            df.to_csv(memory_output, index=False, encoding="utf-8-sig")
-            memory_output.seek(0)
-            return send_file(
-                memory_output,
-                mimetype="text/csv",
-                as_attachment=True,
-                download_name=f"{model_name}.csv"
+            # Same filters as in view. Pagination is applied only if it is
+            # set explicitly and `all` is not, otherwise whole filtered result
+            # is exported.
+            export_all = request.args.get("all") is not None
+            repo.add_filter(
+                filters={
+                    name: request.args.get(name) for name in repo.filter_names
+                },
+                sort_by=request.args.get("sort_by", "name"),
+                sort_order=request.args.get("order", "asc"),
+                page=None if export_all else request.args.get(
+                    "page", type=int
+                ),
+                per_page=None if export_all else request.args.get(
+                    "per_page", type=int
+                )
+            )
+            # Rows are fetched, converted and written one batch at a time.
+            rows = ViewObjectFactory.iter_dicts(repo.stream(), repo.col_order)
+            try:
+                exporter = ExporterFactory.create_exporter(
+                    request.args.get("format", "csv"),
+                    repo.col_order,
+                    repo.col_types
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            response = Response(
+                stream_with_context(exporter.iter_chunks(rows)),
+                mimetype=exporter.mimetype,
+                headers={
+                    "Content-Disposition": (
+                        "attachment; "
+                        f"filename={model_name}.{exporter.extension}"
+                    )
+                }
+            )
+            return self.__set_cache_validators(
+                response, etag, last_modified
+            )
+
+        @self.__app.route("/api/<model_name>")
+        def api(model_name):
+            """Get repository data as JSON, page by page.
+
+            Arguments:
+                fields: comma-separated columns, all columns if empty.
+                limit: rows per page (100 by default, 1000 max).
+                cursor: `next_cursor` from previous page.
+                sort_by, order: same as in view.
+                Filter fields of repository: same as in view.
+            """
+            try:
+                tables = DBRepositoryFactory.get_repo_tables(model_name)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 404
+            db_con = self.__get_db_connection()
+            etag, last_modified = self.__get_cache_validators(
+                db_con,
+                tables,
+                DBRepositoryFactory.get_repo_time_filters(model_name)
+            )
+            if self.__is_not_modified(etag, last_modified):
+                return self.__set_cache_validators(
+                    Response(status=304), etag, last_modified
+                )
+            repo_factory = DBRepositoryFactory()
+            repo_factory.set_connection(db_con)
+            repo = repo_factory.make_repo(model_name)
+            repo.add_filter(
+                filters={
+                    name: request.args.get(name) for name in repo.filter_names
+                },
+                sort_by=request.args.get("sort_by"),
+                sort_order=request.args.get("order", "asc")
+            )
+            # Fields are deduplicated and put in column order, so same set
+            # of fields always gets same (cached) row converter. Unknown
+            # ones are left for `fetch_page` to reject.
+            requested = {
+                f.strip() for f in request.args.get("fields", "").split(",")
+            } - {""}
+            fields = [c for c in repo.col_order if c in requested]
+            fields += sorted(requested - set(fields))
+            limit = min(request.args.get("limit", 100, type=int), 1000)
+            try:
+                rows, next_cursor = repo.fetch_page(
+                    fields=fields,
+                    cursor=request.args.get("cursor"),
+                    limit=limit
+                )
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            data = list(
+                ViewObjectFactory.iter_dicts(rows, fields or repo.col_order)
+            )
+            response = Response(
+                dumps_json({"data": data, "next_cursor": next_cursor}),
+                mimetype="application/json"
+            )
+            return self.__set_cache_validators(
+                response, etag, last_modified
             )
 
         @self.__app.route("/ovirt/cluster_list/raw_json")
         def ovirt_cluster_raw_json():
             """Show cluster list (raw JSON)."""
+            etag, last_modified = self.__get_cache_validators(
+                self.__get_db_connection(), [Cluster.__tablename__]
+            )
+            if self.__is_not_modified(etag, last_modified):
+                return self.__set_cache_validators(
+                    Response(status=304), etag, last_modified
+                )
             dbmanager = DBManager()
             data = dbmanager.get_all_data_as_dict(Cluster)
-            return jsonify(
-                data=data
+            return self.__set_cache_validators(
+                jsonify(data=data), etag, last_modified
             )
 
         @self.__app.route("/ovirt/data_center_list/raw_json")
         def ovirt_data_center_raw_json():
             """Show data center list (raw JSON)."""
+            etag, last_modified = self.__get_cache_validators(
+                self.__get_db_connection(), [DataCenter.__tablename__]
+            )
+            if self.__is_not_modified(etag, last_modified):
+                return self.__set_cache_validators(
+                    Response(status=304), etag, last_modified
+                )
             dbmanager = DBManager()
             data = dbmanager.get_all_data_as_dict(DataCenter)
-            return jsonify(
-                data=data
+            return self.__set_cache_validators(
+                jsonify(data=data), etag, last_modified
             )
 
         @self.__app.route("/ovirt/set_vm_ha", methods=["POST"])
@@ -284,57 +488,21 @@ class FlaskAggregator():
 
         @self.__app.route("/ovirt/create_vm", methods=["POST"])
         def ovirt_create_vm():
-            """Create VM endpoint."""
-            if "jsonfile" not in request.files:
-                return jsonify({"error": "No file part."}), 400
-
-            json_file = request.files["jsonfile"]
-
-            if json_file.name == '':
-                return jsonify({"error": "No selected file."}), 400
-
-            if json_file and json_file.filename.endswith(".json"):
-                try:
-                    file_handler = FileHandler()
-                    file_handler.input_json = json.load(json_file)
-                    # Formatting to get separate list for each unique DPC.
-                    file_handler.reformat_input_json()
-                    virt_aggregator = VirtAggregator(logger=Logger())
-                    virt_aggregator.create_virt_helpers(file_handler)
-                    virt_aggregator.create_vms(file_handler)
-                    return jsonify({"success": "Created VMs."}), 200
-                except json.JSONDecodeError:
-                    return jsonify({"error": "Invalid JSON file."}), 400
-            else:
-                return jsonify({"error": "File is not a valid JSON."}), 400
+            """Create VM endpoint. VMs are created by background job."""
+            return self.__submit_json_file_job("create_vm")
 
         @self.__app.route("/ovirt/create_vlan", methods=["POST"])
         def ovirt_create_vlan():
-            """Create VLAN endpoint."""
-            if "jsonfile" not in request.files:
-                return jsonify({"error": "No file part."}), 400
-
-            json_file = request.files["jsonfile"]
+            """Create VLAN endpoint. VLANs are created by background job."""
+            return self.__submit_json_file_job("create_vlan")
 
-            if json_file.name == '':
-                return jsonify({"error": "No selected file."}), 400
-
-            if json_file and json_file.filename.endswith(".json"):
-                try:
-                    file_handler = FileHandler()
-                    file_handler.input_json = json.load(json_file)
-                    # Formatting to get separate list for each unique DPC.
-                    file_handler.reformat_input_json()
-                    # Creating list of unique VLANs per DPC.
-                    file_handler.make_unique_vlan_configs()
-                    virt_aggregator = VirtAggregator(logger=Logger())
-                    virt_aggregator.create_virt_helpers(file_handler)
-                    virt_aggregator.create_vlans(file_handler)
-                    return jsonify({"success": "Created VMs."}), 200
-                except json.JSONDecodeError:
-                    return jsonify({"error": "Invalid JSON file."}), 400
-            else:
-                return jsonify({"error": "File is not a valid JSON."}), 400
+        @self.__app.route("/jobs/<job_id>")
+        def job_status(job_id):
+            """Background job state and result."""
+            job = JobQueue(self.__get_db_connection()).get(job_id)
+            if job is None:
+                return jsonify({"error": "Job not found."}), 404
+            return Response(dumps_json(job), mimetype="application/json")
 
     def get_app(self) -> Flask:
         """Return Flask aggregator server."""
@@ -1,6 +1,8 @@
 """Attempt to make full-scale view (MVC pattern)."""
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterable
+from html import escape
 
 # 'Composite' pattern implementation attempt.
 
@@ -233,6 +235,61 @@ class TableCell(FlaskUIComponent):
             )
         return f'<td>{self.__link_wrap.render()}</td>'
 
+class TableBody(FlaskUIComponent):
+    """Table body, rendered from raw rows in one pass.
+
+    Has the same markup as 'tbody' `UIContainer` filled with `TableRow`
+    and `TableCell` objects, but without making object per cell: row
+    template is prepared once and filled with values. Unlike `TableCell`,
+    values, link labels and hrefs are HTML-escaped (quotes too), so output
+    differs for values with special characters. `None` is rendered as
+    'None', empty href gives cell with label only.
+    """
+    def __init__(
+        self,
+        cols: list[str],
+        rows: Iterable[dict],
+        id_: str=None,
+        name: str=None,
+        class_: str="container",
+        links: dict[str, str]=None
+    ):
+        self.__ui_meta = UIMeta(id_, class_, name)
+        self.__cols = cols
+        self.__rows = rows
+        # Columns, rendered as links: {column: link label}.
+        self.__links = links or {}
+
+    @staticmethod
+    def __make_link_cell(label: str):
+        label = escape(label)
+
+        def render_link_cell(href) -> str:
+            if href:
+                return f'<td><a href="{escape(str(href))}">{label}</a></td>'
+            return f'<td>{label}</td>'
+        return render_link_cell
+
+    def render(self):
+        cols = self.__cols
+        # Link cells are rendered completely by their functions.
+        row_template = '<tr>' + ''.join(
+            '{}' if col in self.__links else '<td>{}</td>' for col in cols
+        ) + '</tr>'
+        link_cells = [
+            (i, self.__make_link_cell(self.__links[col]))
+            for i, col in enumerate(cols) if col in self.__links
+        ]
+
+        def render_row(row: dict) -> str:
+            values = [escape(str(row[col])) for col in cols]
+            for i, render_link_cell in link_cells:
+                values[i] = render_link_cell(row[cols[i]])
+            return row_template.format(*values)
+
+        rows_html = ''.join([render_row(row) for row in self.__rows])
+        return f'<tbody {self.__ui_meta.render()}> {rows_html}</tbody>'
+
 
 class UIContainer(FlaskUIComponent):
     """Container for UI components."""
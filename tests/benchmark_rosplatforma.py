@@ -0,0 +1,81 @@
+"""Benchmark of `prlctl list --info --json --full` output parsing.
+
+Compares old `ast.literal_eval` parsing with JSON decoding of whole output
+and with VM by VM stream parsing.
+
+Run as `python tests/benchmark_rosplatforma.py [recorded_output.json ...]`.
+Without arguments outputs of 100, 500 and 2000 VMs are generated from VM
+config in `test_rosplatforma.py`.
+"""
+
+import ast
+import json
+import sys
+import timeit
+
+from flask_aggregator.back.rosplatforma.rosplatforma import (
+    VM, get_structure_from_string, iter_vm_configs)
+from test_rosplatforma import ETALON_JSON_VM_CONFIGS
+
+CHUNK_SIZE = 65536
+
+
+def make_output(count: int) -> str:
+    """Output of host with `count` VMs."""
+    configs = []
+    for i in range(count):
+        config = dict(ETALON_JSON_VM_CONFIGS[0])
+        config["Name"] = f"vm-{i}"
+        configs.append(config)
+    return json.dumps(configs, ensure_ascii=False, indent=8)
+
+def parse_literal_eval(output: str) -> list:
+    """VMs, parsed as it was done before."""
+    result = output.replace("false", "False").replace("true", "True")
+    return [VM(config) for config in ast.literal_eval(result)]
+
+def parse_json(output: str) -> list:
+    """VMs from whole output, decoded as JSON."""
+    return [VM(config) for config in get_structure_from_string(output)]
+
+def parse_stream(output: str) -> list:
+    """VMs, parsed one by one from output chunks."""
+    chunks = (
+        output[i:i + CHUNK_SIZE] for i in range(0, len(output), CHUNK_SIZE)
+    )
+    return [VM(config) for config in iter_vm_configs(chunks)]
+
+def run(outputs: dict[str, str], repeat: int = 3, number: int = 3):
+    """Compare parsers on each output."""
+    print(
+        f"{'output':>20} {'MB':>6} {'literal_eval, ms':>17} "
+        f"{'json, ms':>9} {'stream, ms':>11}"
+    )
+    for name, output in outputs.items():
+        expected = parse_json(output)
+        if parse_stream(output) != expected:
+            raise AssertionError(f"Stream parsing of {name} differs.")
+        timings = []
+        for parser in (parse_literal_eval, parse_json, parse_stream):
+            try:
+                timings.append(min(timeit.repeat(
+                    lambda p=parser: p(output), repeat=repeat, number=number
+                )) / number * 1000)
+            # Old parser fails on values it corrupts.
+            except (ValueError, SyntaxError):
+                timings.append(float("nan"))
+        print(
+            f"{name[-20:]:>20} {len(output) / 2**20:>6.2f} "
+            f"{timings[0]:>17.1f} {timings[1]:>9.1f} {timings[2]:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        recorded = {}
+        for path in sys.argv[1:]:
+            with open(path, encoding="utf-8") as file:
+                recorded[path] = file.read()
+        run(recorded)
+    else:
+        run({f"{n} VMs": make_output(n) for n in (100, 500, 2000)})
@@ -0,0 +1,72 @@
+"""Benchmark of table body rendering: UI composite vs one-pass `TableBody`.
+
+Run as `python tests/benchmark_view.py`.
+"""
+
+import timeit
+
+from flask_aggregator.front.view import (
+    UIContainer, TableRow, TableCell, TableBody)
+
+COLS = [
+    "id", "name", "engine", "cluster", "host", "memory", "cpu", "href",
+    "state", "description"
+]
+LINKS = {"href": "ovirt engine link"}
+
+
+def make_rows(count: int) -> list[dict]:
+    """Rows, similar to what view gets from repository."""
+    return [
+        {
+            "id": i,
+            "name": f"vm-{i}",
+            "engine": "engine-01",
+            "cluster": "cluster-01",
+            "host": f"host-{i % 16}",
+            "memory": 8.0,
+            "cpu": 4,
+            "href": f"https://engine-01/ovirt-engine/vms/{i}",
+            "state": "up",
+            "description": "Some description",
+        } for i in range(count)
+    ]
+
+def render_composite(rows: list[dict]) -> str:
+    """Table body, as it was rendered with UI composite."""
+    body = UIContainer(tag="tbody")
+    for row in rows:
+        table_row = TableRow()
+        for k, v in row.items():
+            if k in LINKS:
+                table_row.add_component(TableCell(LINKS[k], link=v))
+            else:
+                table_row.add_component(TableCell(v))
+        body.add_component(table_row)
+    return body.render()
+
+def render_table_body(rows: list[dict]) -> str:
+    """Table body, rendered in one pass."""
+    return TableBody(COLS, rows, links=LINKS).render()
+
+def run(sizes: tuple[int]=(10, 100, 1000), repeat: int=5, number: int=20):
+    """Compare both renderers on each rows count."""
+    print(f"{'rows':>6} {'composite, ms':>14} {'table body, ms':>15} {'x':>6}")
+    for size in sizes:
+        rows = make_rows(size)
+        if render_composite(rows) != render_table_body(rows):
+            raise AssertionError("Renderers output differs.")
+        composite = min(timeit.repeat(
+            lambda: render_composite(rows), repeat=repeat, number=number
+        )) / number * 1000
+        table_body = min(timeit.repeat(
+            lambda: render_table_body(rows), repeat=repeat, number=number
+        )) / number * 1000
+        print(
+            f"{size:>6} {composite:>14.3f} {table_body:>15.3f} "
+            f"{composite / table_body:>6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    run()
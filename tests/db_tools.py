@@ -0,0 +1,39 @@
+"""SQLite database for tests of code, working through SQLAlchemy models."""
+
+import os
+import tempfile
+import unittest
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
+
+from flask_aggregator.back.db import DBConnection
+from flask_aggregator.back.models import get_base
+
+
+@compiles(JSONB, "sqlite")
+def compile_jsonb(_type, _compiler, **_kw):
+    """SQLite stores JSONB columns as JSON."""
+    return "JSON"
+
+
+class SQLiteTestCase(unittest.TestCase):
+    """Base for test cases with all model tables in SQLite file."""
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.db_url = (
+            f"sqlite:///{os.path.join(self.tmp_dir.name, 'aggregator.db')}"
+        )
+        self.db_con = DBConnection(self.db_url)
+        get_base().metadata.create_all(self.db_con.get_engine())
+
+    def tearDown(self):
+        self.db_con.get_engine().dispose()
+        self.tmp_dir.cleanup()
+
+    def add_rows(self, *rows):
+        """Store model instances."""
+        session = self.db_con.get_scoped_session()
+        session.add_all(rows)
+        session.commit()
+        session.close()
@@ -0,0 +1,161 @@
+"""Flask aggregator routes tests module."""
+
+import io
+import uuid
+import unittest
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pyarrow.parquet as pq
+
+from flask_aggregator.back.db import DBRepositoryFactory
+from flask_aggregator.back.models import OvirtEngine, TableVersion, Vm
+from flask_aggregator.front.app import FlaskAggregator
+from tests.db_tools import SQLiteTestCase
+
+
+class AppTestCase(SQLiteTestCase):
+    """Base for route test cases: app works with test database."""
+    def setUp(self):
+        super().setUp()
+        patcher = patch(
+            "flask_aggregator.front.app.DBConnection",
+            return_value=self.db_con
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = FlaskAggregator().get_app().test_client()
+
+
+class TestConditionalGet(AppTestCase):
+    """ETag/Last-Modified test cases."""
+    def test_never_written_tables(self):
+        """Tables without version are validated as never changed."""
+        response = self.client.get("/view/VmOvirt")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(response.headers.get("ETag"))
+        self.assertIsNotNone(response.headers.get("Last-Modified"))
+
+        response = self.client.get(
+            "/view/VmOvirt",
+            headers={"If-None-Match": response.headers["ETag"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_write_changes_etag(self):
+        """Marked write makes old ETag stale."""
+        etag = self.client.get("/api/VmOvirt").headers["ETag"]
+        self.add_rows(
+            Vm(uuid=uuid.uuid4(), name="vm1", engine="e15"),
+            TableVersion(
+                table_name="vms", updated_at=datetime.now(timezone.utc)
+            )
+        )
+        response = self.client.get(
+            "/api/VmOvirt", headers={"If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+        self.assertEqual(
+            [row["name"] for row in response.get_json()["data"]], ["vm1"]
+        )
+
+    def test_etag_depends_on_url(self):
+        """Different filters get different ETags."""
+        etags = {
+            self.client.get(f"/api/VmOvirt?name={name}").headers["ETag"]
+            for name in ("a", "b")
+        }
+        self.assertEqual(len(etags), 2)
+
+    def test_time_filter_not_cached(self):
+        """Result of filter, relative to now, is not validated."""
+        response = self.client.get("/view/LatestBackup?show_backups=older")
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.headers.get("ETag"))
+        self.assertIsNotNone(
+            self.client.get("/view/LatestBackup").headers.get("ETag")
+        )
+
+
+class TestRepoRoutes(AppTestCase):
+    """Routes work for every repository."""
+    def setUp(self):
+        super().setUp()
+        self.add_rows(
+            OvirtEngine(name="e15", href="https://e15"),
+            Vm(uuid=uuid.uuid4(), name="vm1", engine="e15")
+        )
+
+    def test_download(self):
+        """Every repository is exported with its filters applied."""
+        factory = DBRepositoryFactory()
+        factory.set_connection(self.db_con)
+        for model_name in DBRepositoryFactory.REPO_TABLES:
+            with self.subTest(model_name):
+                response = self.client.get(
+                    f"/download/{model_name}?name=vm&engine=e15"
+                )
+                self.assertEqual(response.status_code, 200)
+                header = response.get_data(as_text=True).splitlines()[0]
+                self.assertEqual(
+                    header.lstrip("\ufeff").split(","),
+                    factory.make_repo(model_name).col_order
+                )
+
+    def test_view(self):
+        """Every repository is shown with its filters applied."""
+        for model_name in DBRepositoryFactory.REPO_TABLES:
+            with self.subTest(model_name):
+                response = self.client.get(f"/view/{model_name}?name=vm")
+                self.assertEqual(response.status_code, 200)
+
+    def test_api(self):
+        """Every repository is served by API."""
+        for model_name in DBRepositoryFactory.REPO_TABLES:
+            with self.subTest(model_name):
+                response = self.client.get(f"/api/{model_name}?name=vm")
+                self.assertEqual(response.status_code, 200)
+
+    def test_parquet_download(self):
+        """Every repository is exported to Parquet with its column order."""
+        factory = DBRepositoryFactory()
+        factory.set_connection(self.db_con)
+        for model_name in DBRepositoryFactory.REPO_TABLES:
+            with self.subTest(model_name):
+                response = self.client.get(
+                    f"/download/{model_name}?format=parquet"
+                )
+                self.assertEqual(response.status_code, 200)
+                table = pq.read_table(io.BytesIO(response.get_data()))
+                self.assertEqual(
+                    table.column_names,
+                    factory.make_repo(model_name).col_order
+                )
+
+    def test_api_fields(self):
+        """Requested fields are deduplicated and put in column order."""
+        response = self.client.get(
+            "/api/VmOvirt?fields=engine, name,engine,,name"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(response.get_json()["data"][0]), ["name", "engine"]
+        )
+        response = self.client.get("/api/VmOvirt?fields=name,unknown")
+        self.assertEqual(response.status_code, 400)
+
+    def test_filtered_download(self):
+        """Filters of repository are applied to export."""
+        rows = self.client.get(
+            "/download/VmOvirt?name=vm1&format=ndjson"
+        ).get_data(as_text=True).splitlines()
+        self.assertEqual(len(rows), 1)
+        rows = self.client.get(
+            "/download/VmOvirt?name=other&format=ndjson"
+        ).get_data(as_text=True).splitlines()
+        self.assertEqual(rows, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Database repositories tests module."""
+
+import uuid
+import unittest
+
+from flask_aggregator.back.db import DBRepositoryFactory
+from flask_aggregator.back.models import ElmaVmAccessDoc, Vm
+from tests.db_tools import SQLiteTestCase
+
+
+class TestFetchPage(SQLiteTestCase):
+    """Cursor pagination test cases."""
+    def setUp(self):
+        super().setUp()
+        self.factory = DBRepositoryFactory()
+        self.factory.set_connection(self.db_con)
+
+    def make_repo(self, name, filters=None, sort_by=None, sort_order="asc"):
+        """Repository with filter."""
+        repo = self.factory.make_repo(name)
+        repo.add_filter(
+            filters=filters or {}, sort_by=sort_by, sort_order=sort_order
+        )
+        return repo
+
+    def fetch_all(self, name, limit=2, **kwargs) -> list:
+        """All rows, page by page."""
+        rows, cursor, pages = [], None, 0
+        while True:
+            page, cursor = self.make_repo(name, **kwargs).fetch_page(
+                fields=["name"], cursor=cursor, limit=limit
+            )
+            rows.extend(page)
+            pages += 1
+            self.assertLessEqual(pages, 100)
+            if cursor is None:
+                return rows
+
+    def test_ties(self):
+        """Rows with same sort value are neither lost nor repeated."""
+        self.add_rows(*[
+            Vm(uuid=uuid.uuid4(), name="same" if i < 5 else None)
+            for i in range(7)
+        ])
+        for order in ("asc", "desc"):
+            with self.subTest(order):
+                rows = self.fetch_all(
+                    "VmOvirt", sort_by="name", sort_order=order
+                )
+                self.assertEqual(
+                    sorted(row.id for row in rows), list(range(1, 8))
+                )
+                # NULLs are last in both orders.
+                self.assertEqual(
+                    [row.name for row in rows], ["same"] * 5 + [None] * 2
+                )
+
+    def test_cursor_round_trip(self):
+        """Cursor keeps UUID sort value between pages."""
+        uuids = sorted(uuid.uuid4() for _ in range(5))
+        self.add_rows(
+            *[Vm(uuid=u, name=f"vm{i}") for i, u in enumerate(uuids)]
+        )
+        repo = self.make_repo("VmOvirt", sort_by="uuid")
+        page, cursor = repo.fetch_page(fields=["uuid"], limit=2)
+        self.assertEqual([row.uuid for row in page], uuids[:2])
+        page, cursor = self.make_repo("VmOvirt", sort_by="uuid").fetch_page(
+            fields=["uuid"], cursor=cursor, limit=2
+        )
+        self.assertEqual([row.uuid for row in page], uuids[2:4])
+        self.assertIsNotNone(cursor)
+
+    def test_invalid_cursor(self):
+        """Malformed cursor and cursor of other order are rejected."""
+        self.add_rows(*[Vm(uuid=uuid.uuid4(), name="vm") for _ in range(3)])
+        _, cursor = self.make_repo("VmOvirt", sort_by="name").fetch_page(
+            limit=1
+        )
+        for bad_cursor, sort_order in (
+            ("not a cursor", "asc"), (cursor, "desc")
+        ):
+            with self.subTest(bad_cursor):
+                repo = self.make_repo(
+                    "VmOvirt", sort_by="name", sort_order=sort_order
+                )
+                with self.assertRaises(ValueError):
+                    repo.fetch_page(cursor=bad_cursor, limit=1)
+
+    def test_absent_vms(self):
+        """VMs, absent in oVirt, have no id but are paginated anyway."""
+        self.add_rows(
+            *[
+                ElmaVmAccessDoc(doc_id=i, name=f"vm{i}", backup=True)
+                for i in range(5)
+            ],
+            Vm(uuid=uuid.uuid4(), name="vm0", engine="e15"),
+            Vm(uuid=uuid.uuid4(), name="vm0", engine="e16")
+        )
+        rows = self.fetch_all(
+            "ToBeBackedUpVms", filters={"show_absent_in_ov": "on"}
+        )
+        self.assertEqual(
+            sorted(row.name for row in rows),
+            ["vm0", "vm0", "vm1", "vm2", "vm3", "vm4"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
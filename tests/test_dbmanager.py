@@ -0,0 +1,180 @@
+"""Database manager tests module."""
+
+import uuid
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask_aggregator.back.dbmanager import DBManager
+from flask_aggregator.back.models import TableVersion, UserVmPermission
+from flask_aggregator.back.virt_aggregator import VirtAggregator
+from tests.db_tools import SQLiteTestCase
+
+COMPARED = ["user_name", "user_uuid", "vm_uuid", "vm_name", "role"]
+
+
+def permission(engine: str, vm_name: str, **kwargs) -> dict:
+    """Permission row, as virtualization helpers return it."""
+    row = {
+        "uuid": uuid.uuid4(),
+        "user_name": "user",
+        "user_uuid": uuid.uuid4(),
+        "vm_uuid": uuid.uuid4(),
+        "vm_name": vm_name,
+        "role": "UserRole",
+        "engine": engine
+    }
+    row.update(kwargs)
+    return row
+
+
+class DBManagerTestCase(SQLiteTestCase):
+    """Base for test cases with manager of test database."""
+    def setUp(self):
+        super().setUp()
+        self.manager = DBManager(db_url=self.db_url)
+        self.addCleanup(self.manager.close)
+
+    def permissions(self) -> dict:
+        """Stored permissions: UUID -> (engine, VM name)."""
+        session = self.db_con.get_scoped_session()
+        try:
+            return {
+                row.uuid: (row.engine, row.vm_name)
+                for row in session.query(UserVmPermission)
+            }
+        finally:
+            session.close()
+
+    def table_version(self):
+        """Last change time of permissions table."""
+        session = self.db_con.get_scoped_session()
+        try:
+            return session.query(TableVersion.updated_at).filter(
+                TableVersion.table_name == UserVmPermission.__tablename__
+            ).scalar()
+        finally:
+            session.close()
+
+
+class TestSyncData(DBManagerTestCase):
+    """Test cases for writing only differences."""
+    def sync(self, engine: str, rows: list) -> dict:
+        """Sync rows of engine."""
+        return self.manager.sync_data(
+            UserVmPermission, rows, "uuid", {"engine": engine}, COMPARED
+        )
+
+    def test_sync(self):
+        """New and changed rows are upserted, absent ones are deleted."""
+        rows = [permission("e15", f"vm{i}") for i in range(3)]
+        other = permission("e16", "vm")
+        self.sync("e16", [other])
+        self.assertEqual(
+            self.sync("e15", rows),
+            {"upserted": 3, "deleted": 0, "unchanged": 0}
+        )
+
+        rows[0] = dict(rows[0], vm_name="renamed")
+        self.assertEqual(
+            self.sync("e15", rows[:2]),
+            {"upserted": 1, "deleted": 1, "unchanged": 1}
+        )
+        self.assertEqual(self.permissions(), {
+            rows[0]["uuid"]: ("e15", "renamed"),
+            rows[1]["uuid"]: ("e15", "vm1"),
+            other["uuid"]: ("e16", "vm"),
+        })
+
+    def test_duplicates(self):
+        """Same key twice in data is written once."""
+        row = permission("e15", "vm")
+        result = self.sync("e15", [row, dict(row, vm_name="last")])
+        self.assertEqual(result["upserted"], 1)
+        self.assertEqual(self.permissions(), {row["uuid"]: ("e15", "last")})
+
+    def test_unchanged_not_touched(self):
+        """Table version changes only if something was written."""
+        rows = [permission("e15", "vm")]
+        self.sync("e15", rows)
+        version = self.table_version()
+        self.assertIsNotNone(version)
+        self.assertEqual(
+            self.sync("e15", rows),
+            {"upserted": 0, "deleted": 0, "unchanged": 1}
+        )
+        self.assertEqual(self.table_version(), version)
+
+
+class FakeHelper:
+    """Virtualization helper with given permissions or error."""
+    def __init__(
+        self, name: str, rows: list = None, error: Exception = None,
+        engines: tuple = ()
+    ):
+        self.pretty_name = name
+        # Engines, which answered, even without permissions.
+        self.rows = {engine: [] for engine in engines}
+        for row in rows or []:
+            self.rows.setdefault(row["engine"], []).append(row)
+        self.error = error
+
+    def connect_to_virtualization(self):
+        """Nothing to connect to."""
+
+    def disconnect_from_virtualization(self):
+        """Nothing to disconnect from."""
+
+    def get_user_vm_list(self) -> dict:
+        """Permissions by engine or error."""
+        if self.error is not None:
+            raise self.error
+        return self.rows
+
+
+class TestRefreshUserVmPermissions(DBManagerTestCase):
+    """Test cases for permissions update from all virtualizations."""
+    def refresh(self, *helpers) -> dict:
+        """Refresh permissions with helpers."""
+        aggregator = VirtAggregator(logger=MagicMock())
+        aggregator._VirtAggregator__virt_helpers = list(helpers)
+        with patch(
+            "flask_aggregator.back.virt_aggregator.DBManager",
+            return_value=self.manager
+        ):
+            return aggregator.refresh_user_vm_permissions()
+
+    def test_refresh(self):
+        """Every engine is synced separately."""
+        rows = [permission("e15", "vm1"), permission("e16", "vm2")]
+        result = self.refresh(FakeHelper("ovirt", rows))
+        self.assertEqual(sorted(result), ["e15", "e16"])
+        self.assertEqual(result["e15"]["upserted"], 1)
+        self.assertEqual(len(self.permissions()), 2)
+
+    def test_failed_helper(self):
+        """Failed helper leaves its engines as is, others are updated."""
+        old = permission("rp", "vm0")
+        self.refresh(FakeHelper("rp", [old]))
+        new = permission("e15", "vm1")
+        result = self.refresh(
+            FakeHelper("rp", error=OSError("unreachable")),
+            FakeHelper("ovirt", [new])
+        )
+        self.assertEqual(list(result), ["e15"])
+        self.assertEqual(self.permissions(), {
+            old["uuid"]: ("rp", "vm0"),
+            new["uuid"]: ("e15", "vm1"),
+        })
+
+    def test_engine_without_permissions(self):
+        """Engine, which answered without permissions, has them deleted."""
+        self.refresh(FakeHelper("ovirt", [permission("e15", "vm1")]))
+        result = self.refresh(FakeHelper("ovirt", engines=("e15",)))
+        self.assertEqual(
+            result, {"e15": {"upserted": 0, "deleted": 1, "unchanged": 0}}
+        )
+        self.assertEqual(self.permissions(), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
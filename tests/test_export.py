@@ -0,0 +1,113 @@
+"""Streaming exporters tests module."""
+
+import io
+import gzip
+import json
+import uuid
+import unittest
+from datetime import datetime, timezone
+
+import pyarrow.parquet as pq
+from sqlalchemy import DateTime, Float, Integer, String
+
+from flask_aggregator.back.export import ExporterFactory
+
+COLS = ["name", "size", "created"]
+COL_TYPES = {
+    "name": String(), "size": Integer(), "created": DateTime(timezone=True)
+}
+CREATED = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+
+
+def export(fmt, rows, col_types=None, chunk_rows=None) -> bytes:
+    """Whole file content, made by exporter of format."""
+    exporter = ExporterFactory.create_exporter(fmt, COLS, col_types)
+    if chunk_rows is not None:
+        exporter._chunk_rows = chunk_rows
+    chunks = [
+        chunk.encode() if isinstance(chunk, str) else chunk
+        for chunk in exporter.iter_chunks(iter(rows))
+    ]
+    return b"".join(chunks)
+
+
+class TestExporters(unittest.TestCase):
+    """Exporter test cases."""
+    def setUp(self):
+        self.rows = [
+            {"name": f"vm{i}", "size": i, "created": CREATED}
+            for i in range(5)
+        ]
+
+    def test_unknown_format(self):
+        """Unknown format is rejected before streaming."""
+        with self.assertRaises(ValueError):
+            ExporterFactory.create_exporter("xlsx", COLS)
+
+    def test_csv_gz(self):
+        """Compressed CSV has header and all rows."""
+        data = gzip.decompress(export("csv.gz", self.rows, chunk_rows=2))
+        lines = data.decode().lstrip("\ufeff").splitlines()
+        self.assertEqual(lines[0], "name,size,created")
+        self.assertEqual(len(lines), len(self.rows) + 1)
+        self.assertEqual(lines[1], f"vm0,0,{CREATED}")
+
+    def test_ndjson(self):
+        """One JSON object per row, UUIDs are dumped as strings."""
+        vm_id = uuid.uuid4()
+        rows = [dict(self.rows[0], name=vm_id)] + self.rows[1:]
+        lines = export("ndjson", rows, chunk_rows=2).decode().splitlines()
+        self.assertEqual(len(lines), len(rows))
+        self.assertEqual(json.loads(lines[0])["name"], str(vm_id))
+        self.assertEqual(json.loads(lines[4])["size"], 4)
+
+    def test_parquet(self):
+        """Columns get types of SQLAlchemy columns in every row group."""
+        data = export("parquet", self.rows, COL_TYPES, chunk_rows=2)
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        self.assertEqual(parquet.metadata.num_row_groups, 3)
+        schema = parquet.schema_arrow
+        self.assertEqual(str(schema.field("size").type), "int64")
+        self.assertEqual(
+            str(schema.field("created").type), "timestamp[us, tz=UTC]"
+        )
+        table = parquet.read()
+        self.assertEqual(table.column("size").to_pylist(), list(range(5)))
+        self.assertEqual(table.column("created")[0].as_py(), CREATED)
+
+    def test_parquet_nulls_first(self):
+        """Column, which is null in first row group, keeps its type."""
+        rows = [
+            {"name": None, "size": None, "created": None},
+            {"name": "vm1", "size": 1, "created": CREATED},
+        ]
+        data = export("parquet", rows, COL_TYPES, chunk_rows=1)
+        table = pq.read_table(io.BytesIO(data))
+        self.assertEqual(str(table.schema.field("size").type), "int64")
+        self.assertEqual(table.column("size").to_pylist(), [None, 1])
+
+    def test_parquet_unknown_types(self):
+        """Columns of unknown types are strings, whatever values are."""
+        vm_id = uuid.uuid4()
+        rows = [
+            {"name": vm_id, "size": 1, "created": CREATED},
+            {"name": "vm1", "size": "big", "created": None},
+        ]
+        data = export("parquet", rows, chunk_rows=1)
+        table = pq.read_table(io.BytesIO(data))
+        self.assertEqual(
+            table.column("name").to_pylist(), [str(vm_id), "vm1"]
+        )
+        self.assertEqual(table.column("size").to_pylist(), ["1", "big"])
+
+    def test_parquet_float_columns(self):
+        """Integers in float columns are stored as floats."""
+        data = export(
+            "parquet", self.rows[:2], {"size": Float()}, chunk_rows=1
+        )
+        table = pq.read_table(io.BytesIO(data))
+        self.assertEqual(table.column("size").to_pylist(), [0.0, 1.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
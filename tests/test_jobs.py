@@ -0,0 +1,171 @@
+"""Background jobs tests module."""
+
+import time
+import threading
+import unittest
+from unittest.mock import patch
+
+from flask_aggregator.back.jobs import JOB_HANDLERS, JobQueue, JobWorker
+from flask_aggregator.back.task_manager.command import State
+from tests.db_tools import SQLiteTestCase
+
+
+class TestJobQueue(SQLiteTestCase):
+    """Job queue test cases."""
+    def setUp(self):
+        super().setUp()
+        self.queue = JobQueue(self.db_con)
+
+    def test_submit(self):
+        """Job is new after submit, unknown types are rejected."""
+        job_uuid = self.queue.submit("create_vm", {"vms": []})
+        job = self.queue.get(job_uuid)
+        self.assertEqual(job["state"], State.NEW)
+        self.assertEqual(job["type"], "create_vm")
+        self.assertNotIn("payload", job)
+        with self.assertRaises(ValueError):
+            self.queue.submit("unknown", {})
+
+    def test_get_unknown(self):
+        """Unknown and malformed UUIDs give no job."""
+        self.assertIsNone(self.queue.get("not-uuid"))
+        self.assertIsNone(
+            self.queue.get("00000000-0000-0000-0000-000000000000")
+        )
+
+    def test_claim(self):
+        """Jobs are claimed oldest first and only once."""
+        first = self.queue.submit("create_vm", {"n": 1})
+        second = self.queue.submit("create_vlan", {"n": 2})
+        self.assertEqual(self.queue.claim(), (first, "create_vm", {"n": 1}))
+        self.assertEqual(self.queue.get(first)["state"], State.RUNNING)
+        self.assertIsNotNone(self.queue.get(first)["started_at"])
+        self.assertEqual(self.queue.claim()[0], second)
+        self.assertIsNone(self.queue.claim())
+
+    def test_finish(self):
+        """Finished job keeps result, failed one keeps error."""
+        done = self.queue.submit("create_vm", {})
+        failed = self.queue.submit("create_vm", {})
+        self.queue.claim()
+        self.queue.claim()
+        self.queue.finish(done, result={"success": "ok"})
+        self.queue.finish(failed, error="boom")
+
+        job = self.queue.get(done)
+        self.assertEqual(job["state"], State.SUCCESS)
+        self.assertEqual(job["result"], {"success": "ok"})
+        self.assertIsNotNone(job["finished_at"])
+        job = self.queue.get(failed)
+        self.assertEqual(job["state"], State.FAILED)
+        self.assertEqual(job["error"], "boom")
+
+    def test_fail_running(self):
+        """Only running jobs are failed on worker start."""
+        running = self.queue.submit("create_vm", {})
+        new = self.queue.submit("create_vm", {})
+        self.queue.claim()
+        self.assertEqual(self.queue.fail_running("Worker restarted."), 1)
+        self.assertEqual(self.queue.get(running)["state"], State.FAILED)
+        self.assertEqual(
+            self.queue.get(running)["error"], "Worker restarted."
+        )
+        self.assertEqual(self.queue.get(new)["state"], State.NEW)
+        self.assertEqual(self.queue.claim()[0], new)
+
+
+class FakeQueue:
+    """Queue in memory, which remembers finished jobs."""
+    def __init__(self, jobs):
+        self.jobs = list(jobs)
+        self.finished = {}
+        self.lock = threading.Lock()
+
+    def claim(self):
+        """Next job, if any."""
+        with self.lock:
+            return self.jobs.pop(0) if self.jobs else None
+
+    def finish(self, job_uuid, result=None, error=None):
+        """Remember result."""
+        with self.lock:
+            self.finished[job_uuid] = (result, error)
+
+
+class TestJobWorker(unittest.TestCase):
+    """Job worker loop test cases."""
+    def setUp(self):
+        self.release = threading.Event()
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+        patcher = patch.dict(JOB_HANDLERS, {"fake": self.handler})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def handler(self, payload):
+        """Fake job: waits for release, fails on demand."""
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.release.wait(5)
+        with self.lock:
+            self.running -= 1
+        if payload == "fail":
+            raise RuntimeError("boom")
+        return {"payload": payload}
+
+    def run_worker(self, queue, max_workers):
+        """Start worker in background, stop it on cleanup."""
+        worker = JobWorker(
+            queue, max_workers=max_workers, polling_interval=0.01
+        )
+        thread = threading.Thread(target=worker.run)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(worker.stop)
+        self.addCleanup(self.release.set)
+        return worker, thread
+
+    def wait_for(self, condition, timeout=5):
+        """Wait until condition is true."""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def test_results(self):
+        """Every job is finished with result or error."""
+        queue = FakeQueue([("1", "fake", "ok"), ("2", "fake", "fail")])
+        self.release.set()
+        self.run_worker(queue, max_workers=2)
+        self.wait_for(lambda: len(queue.finished) == 2)
+        self.assertEqual(queue.finished["1"], ({"payload": "ok"}, None))
+        self.assertEqual(queue.finished["2"], (None, "boom"))
+
+    def test_max_workers(self):
+        """No more than `max_workers` jobs run at a time."""
+        queue = FakeQueue([(str(i), "fake", i) for i in range(5)])
+        self.run_worker(queue, max_workers=2)
+        self.wait_for(lambda: self.running == 2)
+        time.sleep(0.1)
+        self.assertEqual(len(queue.jobs), 3)
+        self.release.set()
+        self.wait_for(lambda: len(queue.finished) == 5)
+        self.assertEqual(self.max_running, 2)
+
+    def test_stop_waits_for_jobs(self):
+        """Stopped worker takes no new jobs, but finishes running ones."""
+        queue = FakeQueue([("1", "fake", "ok")])
+        worker, thread = self.run_worker(queue, max_workers=1)
+        self.wait_for(lambda: self.running == 1)
+        queue.jobs.append(("2", "fake", "ok"))
+        worker.stop()
+        self.release.set()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        self.assertEqual(list(queue.finished), ["1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
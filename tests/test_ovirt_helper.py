@@ -0,0 +1,481 @@
+"""oVirt helper tests module."""
+
+import os
+import json
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import ovirtsdk4 as sdk
+
+from flask_aggregator.back.ovirt_helper import (
+    _EMPTY_DESC, OvirtHelper, _EngineJobs, _EngineMetadata)
+from flask_aggregator.back.virt_aggregator import VirtAggregator
+
+
+class FakeJobsService:
+    """Jobs service, which remembers searches."""
+    def __init__(self, jobs):
+        self.jobs = jobs
+        self.searches = []
+
+    def list(self, search=None):
+        """Jobs, which contain searched correlation ID."""
+        self.searches.append(search)
+        correlation_id = search.split("=", 1)[1]
+        return [j for j in self.jobs if correlation_id in j.correlation_id]
+
+
+def job(correlation_id, status):
+    """Engine job stub."""
+    return SimpleNamespace(correlation_id=correlation_id, status=status)
+
+
+class TestEngineJobs(unittest.TestCase):
+    """Engine jobs lookup test cases."""
+    def setUp(self):
+        self.service = FakeJobsService([
+            job("a", sdk.types.JobStatus.FINISHED),
+            job("a", sdk.types.JobStatus.STARTED),
+            job("ab", sdk.types.JobStatus.FAILED),
+        ])
+        self.jobs = _EngineJobs(self.service, max_age=10)
+
+    def test_search_by_correlation_id(self):
+        """Only jobs of awaited action are searched and matched exactly."""
+        self.assertFalse(self.jobs.is_finished("a"))
+        self.assertEqual(self.service.searches, ["correlation_id=a"])
+        self.assertIsNone(self.jobs.is_finished("none"))
+
+    def test_max_age(self):
+        """Statuses are fetched again only after `max_age`."""
+        self.jobs.statuses("a")
+        self.jobs.statuses("a")
+        self.assertEqual(len(self.service.searches), 1)
+        with patch("time.monotonic", return_value=10**9):
+            self.jobs.statuses("a")
+        self.assertEqual(len(self.service.searches), 2)
+
+    def test_forget(self):
+        """Forgotten action is searched again."""
+        self.jobs.statuses("a")
+        self.jobs.forget("a")
+        self.jobs.statuses("a")
+        self.assertEqual(len(self.service.searches), 2)
+
+    def test_failed(self):
+        """Failed job fails wait."""
+        with self.assertRaises(sdk.Error):
+            self.jobs.is_finished("ab")
+
+
+class TestEngineMetadata(unittest.TestCase):
+    """Engine entities cache test cases."""
+    def setUp(self):
+        self.connection = MagicMock()
+        self.system_service = self.connection.system_service.return_value
+        self.networks = self.system_service.networks_service.return_value
+        self.networks.list.side_effect = lambda: [
+            SimpleNamespace(id=f"n{self.networks.list.call_count}")
+        ]
+        self.nics = (
+            self.system_service.hosts_service.return_value
+            .host_service.return_value.nics_service.return_value
+        )
+        self.metadata = _EngineMetadata(self.connection, ttl=10)
+
+    def test_ttl(self):
+        """List is fetched again only after TTL."""
+        with patch("time.monotonic", return_value=100):
+            self.assertEqual(list(self.metadata.networks()), ["n1"])
+        with patch("time.monotonic", return_value=109):
+            self.assertEqual(list(self.metadata.networks()), ["n1"])
+        with patch("time.monotonic", return_value=110):
+            self.assertEqual(list(self.metadata.networks()), ["n2"])
+        self.assertEqual(self.networks.list.call_count, 2)
+
+    def test_invalidate_by_kind(self):
+        """Only invalidated kinds are fetched again, with all their keys."""
+        self.metadata.networks()
+        self.metadata.host_nics("h1")
+        self.metadata.host_nics("h2")
+        self.metadata.invalidate("host_nics")
+        self.metadata.networks()
+        self.metadata.host_nics("h1")
+        self.metadata.host_nics("h2")
+        self.assertEqual(self.networks.list.call_count, 1)
+        self.assertEqual(self.nics.list.call_count, 4)
+
+        self.metadata.invalidate()
+        self.metadata.networks()
+        self.assertEqual(self.networks.list.call_count, 2)
+
+    def test_one_fetch_for_concurrent_lookups(self):
+        """Concurrent lookups of same list wait for one fetch."""
+        started, release = threading.Event(), threading.Event()
+
+        def slow_list():
+            started.set()
+            release.wait(5)
+            return [SimpleNamespace(id="n1")]
+
+        self.networks.list.side_effect = slow_list
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(self.metadata.networks())
+            ) for _ in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        self.assertTrue(started.wait(5))
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual([list(r) for r in results], [["n1"]] * 3)
+        self.assertEqual(self.networks.list.call_count, 1)
+
+    def test_invalidate_during_fetch(self):
+        """List, fetched while its kind was invalidated, is not cached."""
+        for invalidate_args in (("networks",), ()):
+            with self.subTest(invalidate_args):
+                self.metadata.invalidate()
+                started, release = threading.Event(), threading.Event()
+
+                def stale_list():
+                    started.set()
+                    release.wait(5)
+                    return [SimpleNamespace(id="stale")]
+
+                self.networks.list.side_effect = stale_list
+                results = []
+                thread = threading.Thread(
+                    target=lambda: results.append(self.metadata.networks())
+                )
+                thread.start()
+                self.assertTrue(started.wait(5))
+                self.metadata.invalidate(*invalidate_args)
+                release.set()
+                thread.join(5)
+                self.assertEqual(list(results[0]), ["stale"])
+
+                self.networks.list.side_effect = lambda: [
+                    SimpleNamespace(id="fresh")
+                ]
+                self.assertEqual(list(self.metadata.networks()), ["fresh"])
+
+
+class TestSetVmHa(unittest.TestCase):
+    """VM search for HA enabling test cases."""
+    def setUp(self):
+        self.helper = OvirtHelper(dpc_list=["e15"], logger=MagicMock())
+        self.connection = MagicMock()
+        self.vms_service = (
+            self.connection.system_service.return_value
+            .vms_service.return_value
+        )
+        self.helper._OvirtHelper__connections = {"e15": self.connection}
+        patcher = patch.object(
+            OvirtHelper, "_OvirtHelper__set_vm_ha_parameter",
+            side_effect=lambda _ss, vm, dpc: {"success": vm.name}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_names_quoted(self):
+        """Names are quoted in search and matched exactly in results."""
+        self.vms_service.list.return_value = [
+            SimpleNamespace(id="1", name='vm "1"'),
+            SimpleNamespace(id="2", name='vm "1"0'),
+        ]
+        result = self.helper.set_vm_ha({"vm_names": ['vm "1"', "a\\b"]})
+        self.assertEqual(result, [{"success": 'vm "1"'}])
+        self.assertEqual(
+            self.vms_service.list.call_args.kwargs["search"],
+            'name="vm \\"1\\"" or name="a\\\\b"'
+        )
+
+    def test_ids(self):
+        """VMs are matched by ID."""
+        self.vms_service.list.return_value = [
+            SimpleNamespace(id="1", name="vm1"),
+            SimpleNamespace(id="12", name="vm12"),
+        ]
+        result = self.helper.set_vm_ha({"vm_ids": ["12"]})
+        self.assertEqual(result, [{"success": "vm12"}])
+        self.assertEqual(
+            self.vms_service.list.call_args.kwargs["search"], 'id="12"'
+        )
+
+
+class FakeEngine:
+    """Engine with one cluster and its hosts, which remembers host network
+    setups."""
+    def __init__(self, hosts: list, failing: tuple = (), cluster="Dev or *"):
+        self.connection = MagicMock()
+        self.networks = []
+        self.searches = []
+        # Host name -> attachments of each `setup_networks` call.
+        self.setups = {}
+        self.hosts = {
+            f"{name}-id": SimpleNamespace(id=f"{name}-id", name=name)
+            for name in hosts
+        }
+        self.failing = failing
+        ss = self.connection.system_service.return_value
+        ss.clusters_service.return_value.list.return_value = [
+            SimpleNamespace(
+                id="c1", name=cluster, data_center=SimpleNamespace(id="dc1")
+            )
+        ]
+        (
+            ss.clusters_service.return_value.cluster_service.return_value
+            .networks_service.return_value.list.return_value
+        ) = []
+        dcs_service = ss.data_centers_service.return_value
+        dcs_service.list.return_value = [SimpleNamespace(id="dc1", name="DC")]
+        (
+            dcs_service.service.return_value.networks_service.return_value
+            .add.side_effect
+        ) = self.add_network
+        ss.networks_service.return_value.list.side_effect = (
+            lambda: list(self.networks)
+        )
+        hosts_service = ss.hosts_service.return_value
+        hosts_service.list.side_effect = self.list_hosts
+        hosts_service.host_service.side_effect = self.host_service
+
+    def add_network(self, network):
+        """New network with ID by VLAN."""
+        added = SimpleNamespace(
+            id=f"net{network.vlan.id}", vlan=network.vlan,
+            data_center=network.data_center
+        )
+        self.networks.append(added)
+        return added
+
+    def list_hosts(self, search=None):
+        """All hosts, search is remembered."""
+        if search is not None:
+            self.searches.append(search)
+        return list(self.hosts.values())
+
+    def host_service(self, host_id):
+        """Host with VLAN NIC and without unmanaged networks."""
+        name = self.hosts[host_id].name
+        service = MagicMock()
+        service.nics_service.return_value.list.return_value = [
+            SimpleNamespace(id=f"{name}-eth0", name="eth0"),
+            SimpleNamespace(id=f"{name}-bond0", name="bond0"),
+        ]
+        service.unmanaged_networks_service.return_value.list.return_value = []
+
+        def setup_networks(modified_bonds, modified_network_attachments):
+            if name in self.failing:
+                raise sdk.Error("host is down")
+            self.setups.setdefault(name, []).append(sorted(
+                (a.network.id, a.host_nic.id)
+                for a in modified_network_attachments
+            ))
+
+        service.setup_networks.side_effect = setup_networks
+        return service
+
+
+def vlan_config(engine: str, vlan_id: int, cluster="Dev or *") -> dict:
+    """VLAN config, as it comes from request."""
+    return {
+        "ovirt": {"engine": engine, "cluster": cluster, "host_nic": "bond0"},
+        "vlan": {"name": f"{vlan_id}-test", "id": vlan_id, "suffix": ""}
+    }
+
+
+def connect(helper: OvirtHelper, engines: dict):
+    """Use fake engines as connected ones."""
+    helper._OvirtHelper__connections = {
+        dpc: engine.connection for dpc, engine in engines.items()
+    }
+    helper._OvirtHelper__metadata = {
+        dpc: _EngineMetadata(engine.connection)
+        for dpc, engine in engines.items()
+    }
+
+
+class TestCreateVlans(unittest.TestCase):
+    """VLAN creation and attachment test cases."""
+    def create(self, engines: dict, configs: list) -> dict:
+        """Create VLANs in fake engines."""
+        helper = OvirtHelper(dpc_list=list(engines), logger=MagicMock())
+        connect(helper, engines)
+        return helper.create_vlans(configs)
+
+    def test_one_setup_per_host(self):
+        """All VLANs of host are attached by one call, to configured NIC."""
+        engine = FakeEngine(["h1", "h2"])
+        result = self.create(
+            {"e15": engine}, [vlan_config("e15", 10), vlan_config("e15", 20)]
+        )
+        self.assertEqual(result, {"e15": {"h1": 2, "h2": 2}})
+        self.assertEqual(engine.setups, {
+            "h1": [[("net10", "h1-bond0"), ("net20", "h1-bond0")]],
+            "h2": [[("net10", "h2-bond0"), ("net20", "h2-bond0")]],
+        })
+        # Cluster name is quoted, hosts are searched once per cluster.
+        self.assertEqual(engine.searches, ['cluster="Dev or *"'])
+
+    def test_failed_host(self):
+        """Failed host is reported, others get VLANs anyway."""
+        engine = FakeEngine(["h1", "h2", "h3"], failing=("h2",))
+        result = self.create({"e15": engine}, [vlan_config("e15", 10)])
+        self.assertEqual(
+            result, {"e15": {"h1": 1, "h2": "host is down", "h3": 1}}
+        )
+        self.assertEqual(sorted(engine.setups), ["h1", "h3"])
+
+    def test_unknown_cluster(self):
+        """VLAN of unknown cluster is not created."""
+        engine = FakeEngine(["h1"])
+        result = self.create(
+            {"e15": engine}, [vlan_config("e15", 10, cluster="none")]
+        )
+        self.assertEqual(result, {})
+        self.assertEqual(engine.networks, [])
+
+    def test_aggregator_report(self):
+        """Hosts with same names in different engines are reported apart."""
+        engines = {"e15": FakeEngine(["h1"]), "e16": FakeEngine(["h1"])}
+        helper = OvirtHelper(dpc_list=list(engines), logger=MagicMock())
+        aggregator = VirtAggregator(logger=MagicMock())
+        aggregator._VirtAggregator__virt_helpers = [helper]
+        file_handler = MagicMock(dpc_vm_configs={
+            dpc: [vlan_config(dpc, 10)] for dpc in engines
+        })
+        with patch.object(
+            helper, "connect_to_virtualization",
+            side_effect=lambda: connect(helper, engines)
+        ), patch.object(helper, "disconnect_from_virtualization"):
+            reports = aggregator.create_vlans(file_handler)
+        self.assertEqual(reports, [{
+            "dpc_list": ["e15", "e16"],
+            "hosts": {"e15": {"h1": 1}, "e16": {"h1": 1}}
+        }])
+
+
+class TestVmDescriptions(unittest.TestCase):
+    """VM descriptions migration test cases."""
+    def setUp(self):
+        self.helper = OvirtHelper(dpc_list=["e15"], logger=MagicMock())
+        connection = MagicMock()
+        self.vms_service = (
+            connection.system_service.return_value.vms_service.return_value
+        )
+        self.vms_service.list.return_value = [
+            SimpleNamespace(
+                id="1", name="vm1", description="Migrated by IntelSource"
+            ),
+            SimpleNamespace(id="2", name="vm2", description=_EMPTY_DESC),
+            SimpleNamespace(id="3", name="vm3", description=""),
+        ]
+        self.helper._OvirtHelper__connections = {"e15": connection}
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.checkpoint = os.path.join(self.tmp_dir.name, "checkpoint")
+
+    def updated(self) -> list:
+        """IDs of VMs, updated since last call."""
+        vm_service = self.vms_service.vm_service
+        ids = [c.args[0] for c in vm_service.call_args_list]
+        vm_service.reset_mock()
+        return sorted(ids)
+
+    def test_plan(self):
+        """Only changed descriptions are planned, in either mode."""
+        changes = self.helper.plan_vm_descriptions("normalize")
+        self.assertEqual([c["id"] for c in changes], ["1", "3"])
+        self.assertEqual(changes[0]["mode"], "normalize")
+        self.assertEqual(json.loads(changes[0]["new"])["Migrated"], "True")
+        self.assertEqual(
+            self.helper.plan_vm_descriptions("clean"),
+            [{
+                "engine": "e15", "id": "2", "name": "vm2", "mode": "clean",
+                "old": _EMPTY_DESC, "new": ""
+            }]
+        )
+        with self.assertRaises(ValueError):
+            self.helper.plan_vm_descriptions("unknown")
+
+    def test_resume(self):
+        """Interrupted migration continues with VMs, which are not done."""
+        update = self.vms_service.vm_service.return_value.update
+        update.side_effect = [None, sdk.Error("boom")]
+        result = self.helper.migrate_vm_descriptions(
+            checkpoint=self.checkpoint
+        )
+        self.assertEqual(result["applied"], 1)
+        self.assertEqual(len(result["failed"]), 1)
+        self.updated()
+
+        update.side_effect = None
+        result = self.helper.migrate_vm_descriptions(
+            checkpoint=self.checkpoint
+        )
+        self.assertEqual((result["applied"], result["skipped"]), (1, 1))
+        self.assertEqual(len(self.updated()), 1)
+
+    def test_checkpoint_of_other_mode(self):
+        """Checkpoint entries skip only changes of same mode and result."""
+        self.helper.migrate_vm_descriptions(
+            "clean", checkpoint=self.checkpoint
+        )
+        self.assertEqual(self.updated(), ["2"])
+        result = self.helper.migrate_vm_descriptions(
+            "normalize", checkpoint=self.checkpoint
+        )
+        self.assertEqual(result["skipped"], 0)
+        self.assertEqual(self.updated(), ["1", "3"])
+
+        # VM description changed after update, so it is updated again.
+        self.vms_service.list.return_value[0].description = "owner: me"
+        result = self.helper.migrate_vm_descriptions(
+            "normalize", checkpoint=self.checkpoint
+        )
+        self.assertEqual((result["applied"], result["skipped"]), (1, 1))
+        self.assertEqual(self.updated(), ["1"])
+
+
+class TestUserVmList(unittest.TestCase):
+    """User VM permissions test cases."""
+    def test_failed_engine(self):
+        """Engine, which failed to answer, doesn't break others and is
+        absent in result."""
+        helper = OvirtHelper(dpc_list=["e15", "e16"], logger=MagicMock())
+        good, bad = MagicMock(), MagicMock()
+        ss = good.system_service.return_value
+        ss.vms_service.return_value.list.return_value = [
+            SimpleNamespace(id="vm1", name="vm1")
+        ]
+        ss.roles_service.return_value.list.return_value = []
+        ss.users_service.return_value.list.return_value = [
+            SimpleNamespace(id="u1", user_name="user@internal")
+        ]
+        (
+            ss.users_service.return_value.user_service.return_value
+            .permissions_service.return_value.list.return_value
+        ) = [SimpleNamespace(id="p1", vm=SimpleNamespace(id="vm1"), role=None)]
+        bad.system_service.return_value.vms_service.side_effect = sdk.Error(
+            "unreachable"
+        )
+        helper._OvirtHelper__connections = {"e16": bad, "e15": good}
+
+        result = helper.get_user_vm_list()
+        self.assertEqual(list(result), ["e15"])
+        self.assertEqual(
+            [(row["engine"], row["user_name"]) for row in result["e15"]],
+            [("e15", "user")]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
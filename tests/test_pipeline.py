@@ -0,0 +1,136 @@
+"""Staged pipeline tests module."""
+
+import threading
+import time
+import unittest
+
+from flask_aggregator.back.pipeline import Pipeline, Stage
+
+
+class TestPipeline(unittest.TestCase):
+    """Pipeline test cases."""
+    def test_all_items_pass_stages_in_order(self):
+        """Every item goes through all stages in order."""
+        seen = []
+        lock = threading.Lock()
+
+        def make_stage(name):
+            def func(item):
+                with lock:
+                    seen.append((item["n"], name))
+                item["path"].append(name)
+            return func
+
+        items = [{"n": i, "path": []} for i in range(10)]
+        pipeline = Pipeline(
+            [Stage(name, make_stage(name)) for name in ("a", "b", "c")]
+        )
+        results = pipeline.run(items)
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(r.ok for r in results))
+        for item in items:
+            self.assertEqual(item["path"], ["a", "b", "c"])
+        self.assertEqual(
+            [s["succeeded"] for s in pipeline.stats], [10, 10, 10]
+        )
+
+    def test_failed_item_stops(self):
+        """Failed item leaves pipeline, others are not affected."""
+        def fail_odd(item):
+            if item % 2:
+                raise ValueError(f"odd {item}")
+
+        later = []
+        pipeline = Pipeline([
+            Stage("check", fail_odd),
+            Stage("later", later.append)
+        ])
+        results = pipeline.run(list(range(6)))
+        failed = [r for r in results if not r.ok]
+        self.assertEqual(sorted(r.item for r in failed), [1, 3, 5])
+        self.assertEqual({r.failed_stage for r in failed}, {"check"})
+        self.assertEqual(sorted(later), [0, 2, 4])
+        stats = pipeline.stats
+        self.assertEqual((stats[0]["succeeded"], stats[0]["failed"]), (3, 3))
+        self.assertEqual(stats[1]["succeeded"], 3)
+
+    def test_stages_overlap(self):
+        """Later stage of first item runs while next items are in first."""
+        second_started = threading.Event()
+        overlapped = []
+
+        def first(item):
+            if item > 0:
+                overlapped.append(second_started.wait(timeout=5))
+
+        def second(item):
+            if item == 0:
+                second_started.set()
+
+        pipeline = Pipeline([
+            Stage("first", first, workers=1),
+            Stage("second", second, workers=1)
+        ])
+        pipeline.run([0, 1])
+        self.assertEqual(overlapped, [True])
+
+    def test_per_key_limit(self):
+        """No more than `limit` items with same key run at a time."""
+        running = {}
+        peaks = {}
+        lock = threading.Lock()
+
+        def func(item):
+            key = item % 2
+            with lock:
+                running[key] = running.get(key, 0) + 1
+                peaks[key] = max(peaks.get(key, 0), running[key])
+            time.sleep(0.02)
+            with lock:
+                running[key] -= 1
+
+        pipeline = Pipeline([
+            Stage("limited", func, workers=10, limit_key=lambda i: i % 2,
+                  limit=2)
+        ])
+        pipeline.run(list(range(12)))
+        self.assertEqual(peaks, {0: 2, 1: 2})
+
+    def test_limit_key_fails(self):
+        """Item, whose limit key can't be got, fails instead of hanging."""
+        def limit_key(item):
+            return item["domain"]
+
+        later = []
+        pipeline = Pipeline([
+            Stage("first", lambda item: None),
+            Stage("limited", later.append, limit_key=limit_key, limit=1)
+        ])
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.extend(
+                pipeline.run([{"domain": "sd1"}, {}])
+            ),
+            daemon=True
+        )
+        thread.start()
+        thread.join(5)
+        self.assertFalse(thread.is_alive())
+        failed = [r for r in results if not r.ok]
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(failed[0].item, {})
+        self.assertEqual(failed[0].failed_stage, "limited")
+        self.assertIsInstance(failed[0].error, KeyError)
+        self.assertEqual(later, [{"domain": "sd1"}])
+        self.assertEqual(pipeline.stats[1]["failed"], 1)
+
+    def test_empty(self):
+        """Empty input finishes at once."""
+        self.assertEqual(Pipeline([Stage("a", print)]).run([]), [])
+        with self.assertRaises(ValueError):
+            Pipeline([])
+
+
+if __name__ == "__main__":
+    unittest.main()
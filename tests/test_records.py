@@ -0,0 +1,49 @@
+"""Collected entity records tests module."""
+
+import unittest
+
+from flask_aggregator.back.models import Host, RPVM, Storage, Vm
+from flask_aggregator.back.records import (
+    HostRecord, RPVmRecord, StorageRecord, VmRecord, join_ips, pack_ips,
+    to_params)
+
+
+class TestRecords(unittest.TestCase):
+    """Record test cases."""
+    def test_fields_match_models(self):
+        """Every record field is a column of its model."""
+        for record, model in (
+            (VmRecord, Vm), (RPVmRecord, RPVM), (HostRecord, Host),
+            (StorageRecord, Storage)
+        ):
+            columns = {c.name for c in model.__table__.columns}
+            self.assertLessEqual(set(record._fields), columns, record)
+            self.assertIn("uuid", record._fields)
+
+    def test_no_instance_dict(self):
+        """Records keep values only."""
+        host = HostRecord("id", "h1", "e15", "ovirt", "10.0.0.1", "c1")
+        self.assertFalse(hasattr(host, "__dict__"))
+        self.assertIsNone(host.status)
+
+    def test_to_params(self):
+        """Records become dicts, dicts are passed as is."""
+        host = HostRecord("id", "h1", "e15", "ovirt", "10.0.0.1", "c1")
+        row = {"uuid": "id2"}
+        params = list(to_params([host, row]))
+        self.assertEqual(params[0]["name"], "h1")
+        self.assertEqual(set(params[0]), set(HostRecord._fields))
+        self.assertIs(params[1], row)
+
+    def test_ips(self):
+        """IPs are packed to ints and joined back in order."""
+        packed = pack_ips(["10.166.11.143", "10.0.0.100"])
+        self.assertEqual(packed, (178654095, 167772260))
+        self.assertEqual(join_ips(packed), "10.166.11.143 10.0.0.100")
+        self.assertEqual(join_ips(()), "")
+        with self.assertRaises(ValueError):
+            pack_ips(["10.0.0"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,11 +1,17 @@
 """Dedicated testing module for Rosplatforma basic API."""
 
+import socket
+import threading
 import unittest
 from unittest.mock import MagicMock, patch
 import ipaddress
 
+import paramiko
+
 from flask_aggregator.back.rosplatforma.rosplatforma import (
-    ClusterManagementContainer, Connection, Host, VM, Cluster)
+    ClusterManagementContainer, Connection, Host, VM, Cluster, SESSIONS,
+    SessionPool, Command, get_structure_from_string, iter_json_array,
+    iter_vm_configs)
 
 VM_LIST_AS_JSON_FILE_PATH = "/home/krasnoschekovvd/flask-aggregator/src/flask_aggregator/tests/test-vms.json"
 RAW_STRING_VM_CONFIGS = """[
@@ -273,8 +279,11 @@ class TestConnection(unittest.TestCase):
         result = self.connection.exec("ls -la")
         self.assertEqual(result, "Success\n")
         self.mock_ssh_client.connect.assert_called_once()
-        self.mock_ssh_client.exec_command.assert_called_once_with("ls -la")
-        self.mock_ssh_client.close.assert_called_once()
+        self.mock_ssh_client.exec_command.assert_called_once_with(
+            "ls -la", timeout=None
+        )
+        # Session is kept open for next commands.
+        self.mock_ssh_client.close.assert_not_called()
 
     def test_exec_failed(self):
         """Testing exec function failed variant."""
@@ -295,8 +304,141 @@ class TestConnection(unittest.TestCase):
             self.connection.exec("cat /var/log/messages")
         self.assertIn("Error while executing command", str(context.exception))
         self.mock_ssh_client.connect.assert_called_once()
+        self.mock_ssh_client.close.assert_not_called()
+
+    def __set_output(self, output: bytes):
+        self.mock_ssh_client.exec_command.return_value = (
+            None, MagicMock(), MagicMock()
+        )
+        self.mock_ssh_client.exec_command.return_value[1].read.return_value = (
+            output
+        )
+        self.mock_ssh_client.exec_command.return_value[2].read.return_value = (
+            b""
+        )
+
+    def test_session_reused(self):
+        """Several commands use one SSH session."""
+        self.__set_output(b"ok")
+        for _ in range(3):
+            self.assertEqual(self.connection.exec("hostname"), "ok")
+        self.mock_ssh_client.connect.assert_called_once()
+        self.assertEqual(self.mock_ssh_client.exec_command.call_count, 3)
+        self.mock_ssh_client.get_transport.return_value.set_keepalive\
+            .assert_called_once()
+
+    def test_reconnect_inactive_session(self):
+        """Dead session is reopened before command."""
+        self.__set_output(b"ok")
+        self.connection.exec("hostname")
+        self.mock_ssh_client.get_transport.return_value.is_active\
+            .return_value = False
+        self.connection.exec("hostname")
+        self.assertEqual(self.mock_ssh_client.connect.call_count, 2)
         self.mock_ssh_client.close.assert_called_once()
 
+    def test_retry_on_ssh_error(self):
+        """Command is retried once in new session if channel fails."""
+        self.__set_output(b"ok")
+        result = self.mock_ssh_client.exec_command.return_value
+        self.mock_ssh_client.exec_command.side_effect = [
+            paramiko.SSHException("dropped"), result
+        ]
+        self.assertEqual(self.connection.exec("hostname"), "ok")
+        self.assertEqual(self.mock_ssh_client.connect.call_count, 2)
+
+        self.mock_ssh_client.exec_command.side_effect = paramiko.SSHException(
+            "dropped"
+        )
+        with self.assertRaises(paramiko.SSHException):
+            self.connection.exec("hostname")
+
+    def test_timeout_not_retried(self):
+        """Timed out command is not retried and session is kept."""
+        self.__set_output(b"ok")
+        stdout = self.mock_ssh_client.exec_command.return_value[1]
+        stdout.read.side_effect = socket.timeout()
+        with self.assertRaises(socket.timeout):
+            self.connection.exec("prlctl", timeout=1)
+        self.mock_ssh_client.exec_command.assert_called_once()
+        stdout.channel.close.assert_called_once()
+        self.mock_ssh_client.close.assert_not_called()
+
+        stdout.read.side_effect = None
+        self.assertEqual(self.connection.exec("hostname"), "ok")
+        self.mock_ssh_client.connect.assert_called_once()
+
+    def __set_stream(self, chunks):
+        stdout, stderr = MagicMock(), MagicMock()
+        stdout.channel.recv.side_effect = chunks
+        stderr.read.return_value = b""
+        self.mock_ssh_client.exec_command.return_value = (None, stdout, stderr)
+        return stdout.channel
+
+    def test_exec_stream(self):
+        """Output is yielded by chunks, multibyte chars are not broken."""
+        channel = self.__set_stream(
+            ["привет".encode()[:3], "привет".encode()[3:], b""]
+        )
+        self.assertEqual(
+            "".join(self.connection.exec_stream("prlctl", chunk_size=3)),
+            "привет"
+        )
+        channel.close.assert_called_once()
+
+    @patch("time.monotonic")
+    def test_exec_stream_deadline(self, mock_monotonic):
+        """Slow output doesn't extend timeout of whole command."""
+        mock_monotonic.side_effect = [0, 1, 2, 11]
+        channel = self.__set_stream(lambda size: b"x")
+        chunks = []
+        with self.assertRaises(socket.timeout):
+            for chunk in self.connection.exec_stream("prlctl", timeout=10):
+                chunks.append(chunk)
+        self.assertEqual(chunks, ["x", "x"])
+        self.assertEqual(
+            [c.args[0] for c in channel.settimeout.call_args_list], [9, 8]
+        )
+        channel.close.assert_called_once()
+
+    def test_exec_stream_closed(self):
+        """Channel is closed if reading stops early or fails."""
+        channel = self.__set_stream([b"x", b"y"])
+        stream = self.connection.exec_stream("prlctl")
+        next(stream)
+        stream.close()
+        channel.close.assert_called_once()
+
+        channel = self.__set_stream(socket.timeout())
+        with self.assertRaises(socket.timeout):
+            list(self.connection.exec_stream("prlctl", timeout=1))
+        channel.close.assert_called_once()
+        self.mock_ssh_client.close.assert_not_called()
+
+    def test_close(self):
+        """Close ends session, next command opens new one."""
+        self.__set_output(b"ok")
+        self.connection.exec("hostname")
+        self.connection.close()
+        self.mock_ssh_client.close.assert_called_once()
+        self.connection.exec("hostname")
+        self.assertEqual(self.mock_ssh_client.connect.call_count, 2)
+
+
+class TestSessionPool(unittest.TestCase):
+    """SSH sessions pool test case."""
+    @patch("flask_aggregator.back.rosplatforma.rosplatforma.Connection")
+    def test_one_connection_per_host(self, mock_connection):
+        """Same host gets same connection until pool is closed."""
+        mock_connection.side_effect = lambda *args: MagicMock()
+        pool = SessionPool()
+        first = pool.get("192.168.1.1")
+        self.assertIs(pool.get("192.168.1.1"), first)
+        self.assertIsNot(pool.get("192.168.1.2"), first)
+        pool.close_all()
+        first.close.assert_called_once()
+        self.assertIsNot(pool.get("192.168.1.1"), first)
+
 
 class TestClusterManagementContainer(unittest.TestCase):
     """va-mn management container test case."""
@@ -355,6 +497,12 @@ class TestClusterManagementContainer(unittest.TestCase):
         self.assertEqual(result_dict, test_dict)
         self.mock_connection.exec.assert_called_once()
 
+    def test_get_cluster_name(self):
+        """Cluster is named after va-mn hostname."""
+        self.mock_connection.exec.return_value = "k45-test-va-mn\n"
+        self.assertEqual(self.cmc_client.get_cluster_name(), "k45-test-va-mn")
+        self.mock_connection.exec.assert_called_once_with(Command.HOSTNAME)
+
     def test_set_hosts_name_and_ip_empty_xml(self):
         """Case when XML is empty (empty string from exec)."""
         self.mock_connection.exec.return_value = ""
@@ -368,28 +516,93 @@ class TestCluster(unittest.TestCase):
     def setUp(self):
         self.mock_cmc = MagicMock()
         self.mock_cmc.get_hosts_name_and_ip.return_value = [
-            {"name": "host_1", "ip": "192.168.1.2"},
-            {"name": "host_2", "ip": "192.168.1.3"}
-        ]   
+            {"name": "host_1", "ip_address": "192.168.1.2"},
+            {"name": "host_2", "ip_address": "192.168.1.3"}
+        ]
 
     @patch("flask_aggregator.back.rosplatforma.rosplatforma.Host")
     def test_get_vms(self, MockHost):
         """Make sure that list is concatenated properly."""
         mock_host_1 = MagicMock()
         mock_host_2 = MagicMock()
-        mock_host_1.get_vms.return_value = [VM(ETALON_JSON_VM_CONFIGS[0]), VM(ETALON_JSON_VM_CONFIGS[0])]
-        mock_host_2.get_vms.return_value = [VM(ETALON_JSON_VM_CONFIGS[0])]
+        mock_host_1.iter_vms.return_value = [VM(ETALON_JSON_VM_CONFIGS[0]), VM(ETALON_JSON_VM_CONFIGS[0])]
+        mock_host_2.iter_vms.return_value = [VM(ETALON_JSON_VM_CONFIGS[0])]
 
         MockHost.side_effect = [mock_host_1, mock_host_2]
 
         cluster = Cluster(self.mock_cmc)
         expected_result = [VM(ETALON_JSON_VM_CONFIGS[0]), VM(ETALON_JSON_VM_CONFIGS[0]), VM(ETALON_JSON_VM_CONFIGS[0])]
         self.assertEqual(cluster.concat_vms_from_hosts(), expected_result)
+        # Repeated collection doesn't accumulate VMs.
+        self.assertEqual(cluster.concat_vms_from_hosts(), expected_result)
+
+    @patch("flask_aggregator.back.rosplatforma.rosplatforma.Host")
+    def test_get_vms_failed_host(self, MockHost):
+        """Failed host is skipped, others are collected."""
+        mock_host_1 = MagicMock()
+        mock_host_2 = MagicMock()
+        mock_host_1.name = "host_1"
+        mock_host_1.iter_vms.side_effect = TimeoutError("no answer")
+        mock_host_2.iter_vms.return_value = [VM(ETALON_JSON_VM_CONFIGS[0])]
+        MockHost.side_effect = [mock_host_1, mock_host_2]
+
+        cluster = Cluster(self.mock_cmc, logger=MagicMock())
+        self.assertEqual(
+            cluster.concat_vms_from_hosts(timeout=5),
+            [VM(ETALON_JSON_VM_CONFIGS[0])]
+        )
+        self.assertEqual(cluster.failed_hosts, {"host_1": "no answer"})
+        mock_host_2.iter_vms.assert_called_once_with(timeout=5)
+
+    @patch("flask_aggregator.back.rosplatforma.rosplatforma.Host")
+    def test_host_failed_while_reading(self, MockHost):
+        """Host, which failed in the middle of output, gives no VMs."""
+        def iter_vms(timeout):
+            yield VM(ETALON_JSON_VM_CONFIGS[0])
+            raise TimeoutError("no answer")
+
+        mock_host_1 = MagicMock()
+        mock_host_1.name = "host_1"
+        mock_host_1.iter_vms.side_effect = iter_vms
+        mock_host_2 = MagicMock()
+        mock_host_2.iter_vms.return_value = iter([])
+        MockHost.side_effect = [mock_host_1, mock_host_2]
+
+        cluster = Cluster(self.mock_cmc, logger=MagicMock())
+        self.assertEqual(cluster.concat_vms_from_hosts(), [])
+        self.assertEqual(cluster.failed_hosts, {"host_1": "no answer"})
+
+    @patch("flask_aggregator.back.rosplatforma.rosplatforma.Host")
+    def test_hosts_in_parallel(self, MockHost):
+        """Hosts are queried at the same time."""
+        barrier = threading.Barrier(3, timeout=5)
+
+        def iter_vms(timeout):
+            # Each host waits for others: passes only if all run at once.
+            barrier.wait()
+            return []
+
+        hosts = []
+        for _ in range(3):
+            host = MagicMock()
+            host.iter_vms.side_effect = iter_vms
+            hosts.append(host)
+        MockHost.side_effect = hosts
+        self.mock_cmc.get_hosts_name_and_ip.return_value = [
+            {"name": f"host_{i}", "ip_address": f"192.168.1.{i}"}
+            for i in range(3)
+        ]
+        cluster = Cluster(self.mock_cmc)
+        self.assertEqual(cluster.concat_vms_from_hosts(), [])
+        self.assertEqual(cluster.failed_hosts, {})
 
 class TestHost(unittest.TestCase):
     """Host test cases."""
     @patch("flask_aggregator.back.rosplatforma.rosplatforma.Connection")
     def setUp(self, mock_connection):
+        # Connections are shared by hosts through pool, drop ones of other
+        # tests.
+        SESSIONS.close_all()
         self.mock_connection = mock_connection.return_value
         self.host = Host("rp-host", "192.168.1.1")
 
@@ -403,6 +616,8 @@ class TestHost(unittest.TestCase):
         result = [vm.get() for vm in vms]
         self.assertEqual(result, etalon_configs)
         self.mock_connection.exec.assert_called_once()
+        # Repeated call doesn't duplicate VMs.
+        self.assertEqual(len(self.host.get_vms()), len(etalon_configs))
 
     def test_get_vms_empty_exec(self):
         """Case if connection exec function returns empty string."""
@@ -421,6 +636,64 @@ class TestHost(unittest.TestCase):
             self.host.get_vms()
         self.mock_connection.exec.assert_called_once()
 
+    def test_iter_vms(self):
+        """VMs are parsed from streamed output same as from whole one."""
+        self.mock_connection.exec_stream.return_value = iter([
+            RAW_STRING_VM_CONFIGS[i:i + 100]
+            for i in range(0, len(RAW_STRING_VM_CONFIGS), 100)
+        ])
+        vms = list(self.host.iter_vms(timeout=10))
+        self.assertEqual([vm.get() for vm in vms], ETALON_VM_CONFIGS)
+        self.mock_connection.exec_stream.assert_called_once()
+
+class TestParsing(unittest.TestCase):
+    """prlctl output parsing test cases."""
+    def test_json_literals(self):
+        """JSON literals are decoded, strings with them are left intact."""
+        result = get_structure_from_string(
+            '[{"Name": "true-false-vm", "Description": "not true", '
+            '"enabled": true, "hotplug": false, "x": null}]'
+        )
+        self.assertEqual(result, [{
+            "Name": "true-false-vm", "Description": "not true",
+            "enabled": True, "hotplug": False, "x": None
+        }])
+
+    def test_full_parse(self):
+        """Whole output is parsed as JSON."""
+        self.assertEqual(
+            get_structure_from_string(RAW_STRING_VM_CONFIGS),
+            ETALON_JSON_VM_CONFIGS
+        )
+
+    def test_stream_parse_any_chunks(self):
+        """Array elements are same for any chunk boundaries."""
+        text = f"[{RAW_STRING_VM_CONFIGS[1:-2]}, {RAW_STRING_VM_CONFIGS[1:]}"
+        expected = ETALON_JSON_VM_CONFIGS * 2
+        for size in (1, 7, 4096, len(text)):
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            self.assertEqual(list(iter_json_array(chunks)), expected)
+
+    def test_stream_parse_empty_and_bad(self):
+        """Empty output has no elements, broken one is an error."""
+        self.assertEqual(list(iter_json_array([])), [])
+        self.assertEqual(list(iter_json_array(["[", " ]"])), [])
+        with self.assertRaises(ValueError):
+            list(iter_json_array(["[Some text info]"]))
+        with self.assertRaises(ValueError):
+            list(iter_json_array(['[{"a": 1}, {"b"']))
+
+    def test_trimmed_configs(self):
+        """Trimmed configs give same VMs as full ones."""
+        configs = list(iter_vm_configs([RAW_STRING_VM_CONFIGS]))
+        self.assertEqual(
+            [VM(c).get() for c in configs], ETALON_VM_CONFIGS
+        )
+        self.assertEqual(
+            set(configs[0]["Hardware"]), {"cpu", "memory", "hdd0", "hdd1",
+                                          "net0"}
+        )
+
 class TestVM(unittest.TestCase):
     """VM class test cases."""
     def setUp(self):
@@ -0,0 +1,154 @@
+"""Rosplatforma helper tests module."""
+
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+from flask_aggregator.back.models import RPVM
+from flask_aggregator.back.rosplatforma.rosplatforma import VM
+from flask_aggregator.back.rosplatforma_helper import RosplatformaHelper
+from flask_aggregator.back.virt_aggregator import VirtAggregator
+from tests.test_rosplatforma import ETALON_JSON_VM_CONFIGS
+
+MODULE = "flask_aggregator.back.rosplatforma_helper"
+
+
+def make_cluster(name: str, hosts: list[str], vms: list[VM]) -> MagicMock:
+    """Mocked cluster with hosts and VMs."""
+    cluster = MagicMock()
+    cluster.name = name
+    cluster.hosts = []
+    for i, host_name in enumerate(hosts):
+        host = MagicMock()
+        host.name = host_name
+        host.ip = f"192.168.1.{i}"
+        cluster.hosts.append(host)
+    cluster.concat_vms_from_hosts.return_value = vms
+    return cluster
+
+
+class TestRosplatformaHelper(unittest.TestCase):
+    """RP helper test cases."""
+    def setUp(self):
+        self.logger = MagicMock()
+        self.helper = RosplatformaHelper(
+            hosts=["10.0.0.1", "10.0.0.2"], password="x", logger=self.logger
+        )
+
+    def connect(self, clusters: list):
+        """Connect helper to mocked clusters."""
+        with patch(f"{MODULE}.SESSIONS"), patch(
+            f"{MODULE}.ClusterManagementContainer"
+        ), patch(f"{MODULE}.Cluster", side_effect=clusters):
+            self.helper.connect_to_virtualization()
+
+    def test_db_models(self):
+        """VMs are stored in RP table."""
+        self.assertIs(self.helper.db_models["vms"], RPVM)
+        self.assertNotIn("hosts", self.helper.db_models)
+
+    def test_get_vms(self):
+        """VMs of all clusters are converted to RPVM rows."""
+        config = ETALON_JSON_VM_CONFIGS[0]
+        other = dict(config, ID="other-id", Name="other")
+        self.connect([
+            make_cluster("c1", ["h1"], [VM(config, host="h1")]),
+            make_cluster("c2", ["h2"], [VM(other, host="h2")]),
+        ])
+        rows = self.helper.get_vms()
+        self.assertEqual(
+            [(r.cluster, r.host, r.uuid) for r in rows],
+            [("c1", "h1", config["ID"]), ("c2", "h2", "other-id")]
+        )
+        self.assertEqual(rows[0].name, config["Name"])
+        self.assertEqual(rows[0].ip, "10.166.11.143 10.0.0.100")
+        self.assertEqual(
+            set(rows[0]._fields),
+            {c.name for c in RPVM.__table__.columns} - {"id"}
+        )
+
+    def test_get_vms_deduplicated(self):
+        """VM, found on several hosts, is returned once."""
+        config = ETALON_JSON_VM_CONFIGS[0]
+        self.connect([
+            make_cluster("c1", ["h1"], [VM(config, host="h1")] * 2),
+            make_cluster("c2", ["h2"], [VM(config, host="h2")]),
+        ])
+        rows = self.helper.get_vms()
+        self.assertEqual([(r.cluster, r.host) for r in rows], [("c2", "h2")])
+
+    def test_failed_cluster_skipped(self):
+        """Cluster which failed to connect is not collected."""
+        cluster = make_cluster(
+            "c2", ["h2"], [VM(ETALON_JSON_VM_CONFIGS[0], host="h2")]
+        )
+        self.connect([ConnectionError("no route"), cluster])
+        self.assertEqual([r.cluster for r in self.helper.get_vms()], ["c2"])
+        self.logger.log_error.assert_called_once()
+
+    def test_vm_without_id_skipped(self):
+        """VM without ID can't be upserted and is skipped."""
+        config = dict(ETALON_JSON_VM_CONFIGS[0])
+        del config["ID"]
+        self.connect([
+            make_cluster("c1", ["h1"], [VM(config, host="h1")]),
+            make_cluster("c2", [], []),
+        ])
+        self.assertEqual(self.helper.get_vms(), [])
+
+    def test_no_ovirt_entities(self):
+        """RP hosts are not written to oVirt tables, VMs are not created,
+        there are no engines to sync user permissions of."""
+        self.connect([make_cluster("c1", ["h1", "h2"], [])])
+        self.assertEqual(self.helper.get_hosts(), [])
+        self.assertEqual(self.helper.get_user_vm_list(), {})
+        self.assertFalse(self.helper.supports_creation)
+
+    def test_clusters_in_parallel(self):
+        """Clusters are collected at the same time."""
+        barrier = threading.Barrier(2, timeout=5)
+
+        def collect():
+            # Each cluster waits for other: passes only if both run at once.
+            barrier.wait()
+            return []
+
+        clusters = [make_cluster(f"c{i}", [], []) for i in range(2)]
+        for cluster in clusters:
+            cluster.concat_vms_from_hosts.side_effect = collect
+        self.connect(clusters)
+        self.assertEqual(self.helper.get_vms(), [])
+        self.logger.log_error.assert_not_called()
+
+
+class TestCreation(unittest.TestCase):
+    """Creation is requested only from helpers, which support it."""
+    def test_rp_skipped(self):
+        """RP helper gets no VM or VLAN configs."""
+        rp_helper = RosplatformaHelper(
+            hosts=["10.0.0.1"], password="x", logger=MagicMock()
+        )
+        ovirt_helper = MagicMock(dpc_list=["e15"], supports_creation=True)
+        ovirt_helper.provision_vms.return_value = {"vms": []}
+        ovirt_helper.create_vlans.return_value = []
+        file_handler = MagicMock(
+            dpc_vm_configs={"10.0.0.1": [{"n": 1}], "e15": [{"n": 2}]}
+        )
+        aggregator = VirtAggregator(logger=MagicMock())
+        aggregator._VirtAggregator__virt_helpers = [rp_helper, ovirt_helper]
+        with patch(f"{MODULE}.SESSIONS"), patch.object(
+            rp_helper, "connect_to_virtualization"
+        ):
+            self.assertEqual(
+                aggregator.create_vms(file_handler),
+                [{"dpc_list": ["e15"], "vms": []}]
+            )
+            self.assertEqual(
+                aggregator.create_vlans(file_handler),
+                [{"dpc_list": ["e15"], "hosts": []}]
+            )
+        ovirt_helper.provision_vms.assert_called_once_with([{"n": 2}])
+
+
+if __name__ == "__main__":
+    unittest.main()
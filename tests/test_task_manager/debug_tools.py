@@ -1,5 +1,7 @@
 """Debug classes for tests."""
 
+import os
+import threading
 import time
 import flask_aggregator.back.task_manager.command as cmd
 
@@ -147,3 +149,27 @@ class GetVmNameCommand(cmd.Command):
         except TypeError as e:
             self.error = str(e)
             self.state = cmd.State.FAILED
+
+
+class PidCommand(cmd.Command):
+    """Returns ID of process, command was executed in."""
+    def execute(self):
+        self.state = cmd.State.RUNNING
+        self.result = os.getpid()
+        self.state = cmd.State.SUCCESS
+
+
+class ThreadNameCommand(cmd.Command):
+    """Returns name of thread, command was executed in."""
+    def execute(self):
+        self.state = cmd.State.RUNNING
+        self.result = threading.current_thread().name
+        self.state = cmd.State.SUCCESS
+
+
+class UnpicklableResultCommand(cmd.Command):
+    """Result can't be passed between processes."""
+    def execute(self):
+        self.state = cmd.State.RUNNING
+        self.result = threading.Lock()
+        self.state = cmd.State.SUCCESS
@@ -15,7 +15,7 @@ class TaskManagerWithMonitor:
     def __init__(self):
         self._tm = tm.TaskManager()
         self._mon = mon.Server()
-        self._tm.attach_monitor(self._mon.observer_callback)
+        self._tm.subscribe(self._mon)
         self._task = tm.Task(
             "e15-test2 hosts",
             cmd.OvirtCommand(),
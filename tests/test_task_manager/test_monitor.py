@@ -1,156 +1,212 @@
 """Test cases for monitor module."""
 
+import io
+import os
 import time
-import json
+import socket
+import tempfile
 import unittest
-from unittest.mock import patch, MagicMock
+from contextlib import redirect_stdout
+from unittest.mock import patch
 from concurrent.futures import ThreadPoolExecutor
 
 import flask_aggregator.back.task_manager.monitor as mon
-
-
-class TestServer(unittest.TestCase):
-    """Test cases for monitor server, which only sends messages to client."""
+import flask_aggregator.back.task_manager.observer as obs
+
+TASKS = [
+    {
+        "uuid": "1",
+        "name": "some_name",
+        "result": "some_result",
+        "error": None,
+        "state": "running"
+    },
+    {
+        "uuid": "2",
+        "name": "some_other_name",
+        "result": None,
+        "error": "some_error",
+        "state": "success"
+    }
+]
+
+
+class TestProtocol(unittest.TestCase):
+    """Test cases for message framing."""
+    def test_frames_in_chunks(self):
+        """Messages are decoded, however stream is split."""
+        messages = [{"type": "delta", "n": i} for i in range(3)]
+        stream = b"".join(mon.pack_message(m) for m in messages)
+        decoder = mon.FrameDecoder()
+        result = []
+        for i in range(0, len(stream), 5):
+            result.extend(decoder.feed(stream[i:i + 5]))
+        self.assertEqual(result, messages)
+
+    def test_too_long_frame(self):
+        """Frame longer than limit breaks stream."""
+        decoder = mon.FrameDecoder()
+        with self.assertRaises(ValueError):
+            list(decoder.feed(mon.HEADER.pack(mon.MAX_MESSAGE_SIZE + 1)))
+
+
+class MonitorTestCase(unittest.TestCase):
+    """Base for test cases with monitor server running in background."""
     def setUp(self):
-        self.server = mon.Server()
-        self.timeout = 3
-
-    @patch("socket.socket")
-    def test_run(self, mock_socket_class):
-        """Simple run test. Make sure that monitor server is sending data to
-        client via unix socket.
-        """
-        # Making test data for observer external callback.
-        # Also mocking 'sendall' to check what it has when called.
-        data = [
-            {
-                "name": "some_name",
-                "result": "some_result",
-                "error": None
-            },
-            {
-                "name": "some_other_name",
-                "result": None,
-                "error": "some_error"
-            }
-        ]
-        self.server.observer_callback(data)
-        mock_socket = MagicMock()
-        mock_conn = MagicMock()
-        mock_socket_class.return_value = mock_socket
-        mock_socket.accept.return_value = (mock_conn, None)
-
-        # Test run for 'timeout' seconds.
-        with ThreadPoolExecutor() as e:
-            future = e.submit(self.server.run)
-
-            start_time = time.time()
-            now = start_time
-            while now - start_time < self.timeout:
-                now = time.time()
-                time.sleep(1)
-
-            self.server.stop()
-
-            future.result()
-
-        # Checking that mocked sendall called and that data is correct.
-        mock_conn.sendall.assert_called()
-        args, _ = mock_conn.sendall.call_args
-        sent_data = args[0].decode()
-        self.assertEqual(json.loads(sent_data), data)
-
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.socket_path = os.path.join(self.tmp_dir.name, "fa-mon")
+        self.server = mon.Server(self.socket_path, polling_interval=0.05)
+        self.executor = ThreadPoolExecutor()
+        self.server_future = self.executor.submit(self.server.run)
+        self.wait_for(lambda: os.path.exists(self.socket_path))
 
-class TestClient(unittest.TestCase):
-    """Test cases for monitor client. It only shows what server sends him."""
-    def setUp(self):
-        self.client = mon.Client()
-        self.timeout = 3
-
-    @patch("socket.socket")
-    def test_run(self, mock_socket_class):
-        """Simple run test. Make sure that monitor client is showing the
-        result in stdout.
-        """
-        mock_socket = MagicMock()
-        mock_socket.recv.return_value = b"""[
-            {
-                "name": "some_name",
-                "result": "some_result",
-                "error": null,
-                "state": "running"
-            },
-            {
-                "name": "some_other_name",
-                "result": null,
-                "error": "some_error",
-                "state": "success"
-            }
-        ]"""
-        mock_socket_class.return_value = mock_socket
-
-        with ThreadPoolExecutor() as e:
-            future = e.submit(self.client.run)
-
-            start_time = time.time()
-            now = start_time
-            while now - start_time < self.timeout:
-                now = time.time()
-                time.sleep(1)
-
-            self.client.stop()
-
-            future.result()
-
-
-class TestServerClient(unittest.TestCase):
+    def tearDown(self):
+        self.server.stop()
+        self.server_future.result(timeout=5)
+        self.executor.shutdown()
+        self.tmp_dir.cleanup()
+
+    def wait_for(self, condition, timeout=5):
+        """Wait until condition is true."""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.01)
+
+    def connect(self) -> socket.socket:
+        """Raw client socket, connected to server."""
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        client.settimeout(5)
+        client.connect(self.socket_path)
+        self.addCleanup(client.close)
+        return client
+
+    @staticmethod
+    def receive(client: socket.socket, decoder: mon.FrameDecoder) -> dict:
+        """Next message from server."""
+        while True:
+            for message in decoder.feed(client.recv(mon.RECV_SIZE)):
+                return message
+
+
+class TestServer(MonitorTestCase):
+    """Test cases for monitor server, which only sends messages to client."""
+    def test_snapshot_then_delta(self):
+        """Client gets all tasks on connect, then only changed ones."""
+        self.server.observer_callback(TASKS)
+        self.wait_for(lambda: not self.server._changed)
+        client = self.connect()
+        decoder = mon.FrameDecoder()
+        snapshot = self.receive(client, decoder)
+        self.assertEqual(snapshot["type"], "snapshot")
+        self.assertEqual(snapshot["tasks"], TASKS)
+
+        changed = dict(TASKS[0], state="success")
+        self.server.observer_callback([changed])
+        delta = self.receive(client, decoder)
+        self.assertEqual(delta["type"], "delta")
+        self.assertEqual(delta["changed"], [changed])
+        self.assertEqual(delta["removed"], ["2"])
+        self.assertGreater(delta["version"], snapshot["version"])
+
+    def test_unchanged_data_not_sent(self):
+        """Same data is not sent again."""
+        self.server.observer_callback(TASKS)
+        self.wait_for(lambda: not self.server._changed)
+        client = self.connect()
+        decoder = mon.FrameDecoder()
+        self.receive(client, decoder)
+        self.server.observer_callback([dict(task) for task in TASKS])
+        client.settimeout(0.3)
+        with self.assertRaises(socket.timeout):
+            self.receive(client, decoder)
+
+    def test_observer_update(self):
+        """Events from task registry are sent as delta."""
+        self.server.update([obs.TaskEvent(t["uuid"], t) for t in TASKS])
+        self.wait_for(lambda: not self.server._changed)
+        client = self.connect()
+        decoder = mon.FrameDecoder()
+        self.assertEqual(self.receive(client, decoder)["tasks"], TASKS)
+
+        self.server.update([obs.TaskEvent("1", None)])
+        delta = self.receive(client, decoder)
+        self.assertEqual(delta["changed"], [])
+        self.assertEqual(delta["removed"], ["1"])
+
+    def test_many_clients(self):
+        """Every client gets changes, disconnected one doesn't break
+        others."""
+        clients = [self.connect() for _ in range(3)]
+        decoders = [mon.FrameDecoder() for _ in clients]
+        for client, decoder in zip(clients, decoders):
+            self.assertEqual(self.receive(client, decoder)["tasks"], [])
+        clients[0].close()
+
+        self.server.observer_callback(TASKS)
+        for client, decoder in zip(clients[1:], decoders[1:]):
+            self.assertEqual(self.receive(client, decoder)["changed"], TASKS)
+        self.wait_for(lambda: len(self.server._clients) == 2)
+
+
+class TestServerClient(MonitorTestCase):
     """Test cases for both monitor client and server."""
     def setUp(self):
-        self.server = mon.Server()
-        self.client = mon.Client()
-        self.timeout = 3
+        super().setUp()
+        self.client = mon.Client(self.socket_path, polling_interval=0.05)
+
+    def run_client(self):
+        """Run client in background, without clearing terminal."""
+        patcher = patch("os.system")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        output = io.StringIO()
+        redirect = redirect_stdout(output)
+        redirect.__enter__()
+        self.addCleanup(redirect.__exit__, None, None, None)
+        future = self.executor.submit(self.client.run)
+        self.addCleanup(future.result, 5)
+        self.addCleanup(self.client.stop)
+        return output
 
     def test_send_message_from_server_to_client(self):
-        """Test case for sending message from server to client."""
-        self.server.observer_callback([
-            {
-                "name": "some_name",
-                "result": "some_result",
-                "error": None,
-                "state": "running"
-            },
-            {
-                "name": "some_other_name",
-                "result": None,
-                "error": "some_error",
-                "state": "success"
-            }
-        ])
-
-        with ThreadPoolExecutor() as e:
-            server_future = e.submit(self.server.run)
-            time.sleep(1)
-            client_future = e.submit(self.client.run)
-
-            start_time = time.time()
-            now = start_time
-            while now - start_time < self.timeout:
-                now = time.time()
-                time.sleep(1)
-
-            self.client.stop()  # TODO: some warning here. Don't know what to
-                                # do with it yet.
-            self.server.stop()
-
-            server_future.result()
-            client_future.result()
-
-    # TODO: test big message.
-    # TODO: test None message.
+        """Client follows tasks, sent by server."""
+        self.server.observer_callback(TASKS)
+        output = self.run_client()
+        self.wait_for(lambda: self.client.tasks == TASKS)
+        self.assertIn(
+            "some_other_name None some_error success", output.getvalue()
+        )
+
+        self.server.observer_callback(TASKS[1:])
+        self.wait_for(lambda: self.client.tasks == TASKS[1:])
+
+    def test_big_message(self):
+        """Messages bigger than one read are not truncated."""
+        tasks = [
+            dict(TASKS[0], uuid=str(i), result="x" * 1000)
+            for i in range(200)
+        ]
+        self.run_client()
+        self.server.observer_callback(tasks)
+        self.wait_for(lambda: self.client.tasks == tasks)
 
-    def tearDown(self):
-        self.client.stop()
-        self.server.stop()
+
+class TestClient(unittest.TestCase):
+    """Test cases for applying server messages by client."""
+    def test_apply_message(self):
+        """Delta updates tasks from snapshot."""
+        client = mon.Client()
+        client.apply_message(
+            {"type": "snapshot", "version": 0, "tasks": TASKS}
+        )
+        self.assertEqual(client.tasks, TASKS)
+        changed = dict(TASKS[1], state="failed")
+        client.apply_message({
+            "type": "delta", "version": 1, "changed": [changed],
+            "removed": ["1"]
+        })
+        self.assertEqual(client.tasks, [changed])
 
 
 def start_test():
@@ -130,3 +130,82 @@ class TestIntervalRun(unittest.TestCase):
         self.assertEqual(strategy.next_run_time, 40)
         self.assertEqual(strategy.interval, 20)
         self.assertEqual(strategy.task_has_to_run, True)
+
+
+class TestPolicies(unittest.TestCase):
+    """Misfire, overlapping and jitter policies test cases."""
+    @patch("time.time")
+    def run_late(self, misfire, mock_time):
+        """Run at 0, then late at 35 with interval 10, next run times."""
+        mock_time.return_value = 0
+        strategy = strat.IntervalRun(10, misfire=misfire)
+        strategy.mark_start_time()
+        first = strategy.next_run_time
+        mock_time.return_value = 35
+        strategy.mark_start_time()
+        return first, strategy.next_run_time
+
+    def test_coalesce(self):
+        """Missed runs make one run, next interval counts from it."""
+        self.assertEqual(self.run_late(strat.Misfire.COALESCE), (10, 45))
+
+    def test_catch_up(self):
+        """Every missed run is run."""
+        self.assertEqual(self.run_late(strat.Misfire.CATCH_UP), (10, 20))
+
+    def test_skip(self):
+        """Missed runs are dropped, schedule stays the same."""
+        self.assertEqual(self.run_late(strat.Misfire.SKIP), (10, 40))
+
+    @patch("time.time", return_value=0)
+    def test_skip_missed(self, _):
+        """Slots, passed while task was running, are dropped only by SKIP
+        and only after first run."""
+        strategy = strat.IntervalRun(10, misfire=strat.Misfire.SKIP)
+        strategy.skip_missed(25)
+        self.assertEqual(strategy.next_run_time, 0)
+        strategy.mark_start_time()
+        strategy.skip_missed(25)
+        self.assertEqual(strategy.next_run_time, 30)
+        strategy.skip_missed(30)
+        self.assertEqual(strategy.next_run_time, 30)
+        coalesce = strat.IntervalRun(10)
+        coalesce.mark_start_time()
+        coalesce.skip_missed(25)
+        self.assertEqual(coalesce.next_run_time, 10)
+
+    def test_max_instances(self):
+        """Runs may overlap up to max instances."""
+        self.assertFalse(strat.IntervalRun(10).can_start(1))
+        strategy = strat.IntervalRun(10, max_instances=2)
+        self.assertTrue(strategy.can_start(1))
+        self.assertFalse(strategy.can_start(2))
+
+    @patch("random.uniform", return_value=3)
+    @patch("time.time", return_value=100)
+    def test_jitter(self, mock_time, _):
+        """First run is delayed by jitter."""
+        strategy = strat.IntervalRun(10, jitter=5)
+        self.assertEqual(strategy.next_run_time, 103)
+        self.assertFalse(strategy.task_has_to_run)
+        one_time = strat.OneTimeRun(jitter=5)
+        self.assertEqual(one_time.next_run_at(), 103)
+        self.assertFalse(one_time.task_has_to_run)
+        mock_time.return_value = 103
+        self.assertTrue(strategy.task_has_to_run)
+        self.assertTrue(one_time.task_has_to_run)
+
+    def test_jitter_spreads_tasks(self):
+        """Tasks, created together, get different first run times."""
+        times = {strat.IntervalRun(60, jitter=30).next_run_time
+                 for _ in range(20)}
+        self.assertGreater(len(times), 1)
+
+    def test_bad_policies(self):
+        """Invalid policies are rejected."""
+        with self.assertRaises(ValueError):
+            strat.IntervalRun(10, misfire="never")
+        with self.assertRaises(ValueError):
+            strat.IntervalRun(10, max_instances=0)
+        with self.assertRaises(ValueError):
+            strat.OneTimeRun(jitter=-1)
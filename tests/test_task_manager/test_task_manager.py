@@ -1,5 +1,6 @@
 """Task class test module."""
 
+import os
 import time
 import uuid
 import unittest
@@ -8,6 +9,7 @@ from concurrent.futures import ThreadPoolExecutor
 
 import flask_aggregator.back.task_manager.strategy as strat
 import flask_aggregator.back.task_manager.command as cmd
+import flask_aggregator.back.task_manager.observer as obs
 import flask_aggregator.back.task_manager.task_manager as tm
 import tests.test_task_manager.debug_tools as dc
 
@@ -270,6 +272,23 @@ class TestTask(unittest.TestCase):
         self.assertEqual(interval_addition_task._command.result, None)
         self.assertEqual(interval_addition_task._command.state, cmd.State.FAILED)
 
+    def test_listeners(self):
+        """Listeners are called on run start, run stop and cancel."""
+        task = tm.Task("task", dc.AdditionCommand(1, 2), strat.OneTimeRun())
+        listener = MagicMock()
+        task.add_listener(listener)
+        task.begin_run()
+        self.assertEqual(listener.call_count, 1)
+        task.finish_run()
+        self.assertEqual(listener.call_count, 2)
+        task.cancel()
+        self.assertEqual(listener.call_count, 3)
+        listener.assert_called_with(task)
+
+        task.remove_listener(listener)
+        task.run()
+        self.assertEqual(listener.call_count, 3)
+
 
 class TestTaskManager(unittest.TestCase):
     """Test cases for TaskManager.
@@ -534,6 +553,218 @@ class TestTaskManager(unittest.TestCase):
             future.result()
 
 
+class SchedulerTestCase(unittest.TestCase):
+    """Base for test cases with task manager running in background."""
+    def setUp(self):
+        # Long polling interval: tasks must not wait for it.
+        self.task_manager = tm.TaskManager(polling_interval=60)
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.future = self.executor.submit(self.task_manager.run)
+
+    def tearDown(self):
+        self.task_manager.stop()
+        self.future.result(timeout=5)
+        self.executor.shutdown()
+
+    def wait_for(self, condition, timeout=5):
+        """Wait until condition is true."""
+        deadline = time.monotonic() + timeout
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+
+    def max_running(self, task, seconds):
+        """Max count of runs of task, going at once, during `seconds`."""
+        result = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            result = max(result, task.running)
+            time.sleep(0.001)
+        return result
+
+
+class TestScheduler(SchedulerTestCase):
+    """Event-driven scheduling test cases."""
+    def test_new_task_runs_at_once(self):
+        """Added task is run without waiting for polling interval."""
+        task = tm.Task(
+            "fast_onetime_task", dc.AdditionCommand(1, 2), strat.OneTimeRun()
+        )
+        added = time.time()
+        self.task_manager.add_task(task)
+        self.wait_for(lambda: task._command.state == cmd.State.SUCCESS)
+        self.assertLess(task._strategy.start_run_time - added, 0.1)
+
+    def test_interval_task_runs_on_time(self):
+        """Interval task is run at its next run time."""
+        task = tm.Task(
+            "fast_interval_task",
+            dc.CumulativeAdditionCommand(1, 1),
+            strat.IntervalRun(0.2)
+        )
+        self.task_manager.add_task(task)
+        self.wait_for(lambda: task._command.result == 8)
+        start = task._strategy.start_run_time
+        self.assertLess(start - task._strategy.time_created, 0.6 + 0.1)
+
+    def test_idle_scheduler_sleeps(self):
+        """Scheduler without due tasks doesn't wake up."""
+        task = tm.Task(
+            "slow_interval_task",
+            dc.CumulativeAdditionCommand(1, 1),
+            strat.IntervalRun(60)
+        )
+        self.task_manager.add_task(task)
+        self.wait_for(lambda: task._command.state == cmd.State.SUCCESS)
+        self.wait_for(lambda: not self.task_manager._futures)
+        # Let scheduler handle finished run and fall asleep.
+        time.sleep(0.05)
+        with patch.object(
+            self.task_manager._lock, "wait",
+            wraps=self.task_manager._lock.wait
+        ) as mock_wait:
+            time.sleep(0.3)
+        mock_wait.assert_not_called()
+        self.assertTrue(self.task_manager.registry.is_scheduled(task.uuid))
+        self.assertAlmostEqual(
+            self.task_manager.registry.next_run_time(),
+            task._strategy.start_run_time + 60, delta=0.1
+        )
+
+
+    def test_no_overlap(self):
+        """Due run is not started, while previous one is running."""
+        task = tm.Task(
+            "slow_interval_task",
+            dc.CumulativeAdditionCommand(1, 1, sleep=0.2),
+            strat.IntervalRun(0.05)
+        )
+        self.task_manager.add_task(task)
+        self.assertEqual(self.max_running(task, 0.7), 1)
+        # Missed runs are coalesced: one run right after another.
+        self.assertGreaterEqual(task._command.result, 6)
+
+    def test_skip_after_overrun(self):
+        """Slot, missed while task was running, doesn't start run at once:
+        next run waits for the next slot of schedule."""
+        task = tm.Task(
+            "slow_interval_task",
+            dc.CumulativeAdditionCommand(1, 1, sleep=0.3),
+            strat.IntervalRun(0.2, misfire=strat.Misfire.SKIP)
+        )
+        self.task_manager.add_task(task)
+        self.wait_for(lambda: task._strategy.stop_run_time > 0)
+        first_stop = task._strategy.stop_run_time
+        self.wait_for(lambda: task._strategy.start_run_time > first_stop)
+        created = task._strategy.time_created
+        self.assertGreaterEqual(task._strategy.start_run_time, created + 0.4)
+        self.assertAlmostEqual(
+            task._strategy.next_run_time, created + 0.6, delta=1e-6
+        )
+
+    def test_max_instances(self):
+        """Runs overlap up to max instances."""
+        task = tm.Task(
+            "slow_interval_task",
+            dc.CumulativeAdditionCommand(1, 1, sleep=0.5),
+            strat.IntervalRun(0.1, max_instances=3)
+        )
+        self.task_manager.add_task(task)
+        self.assertEqual(self.max_running(task, 0.7), 3)
+
+
+class RecordingObserver(obs.Observer):
+    """Keeps batches of events it got."""
+    def __init__(self):
+        super().__init__()
+        self._data = []
+
+    def update(self, events):
+        self._data.append(events)
+
+
+class TestNotifications(SchedulerTestCase):
+    """Observer notification test cases."""
+    def test_changes_batched(self):
+        """Observer gets changes at most once per polling interval, final
+        states are sent on stop."""
+        observer = RecordingObserver()
+        self.task_manager.subscribe(observer)
+        self.addCleanup(self.task_manager.unsubscribe, observer)
+        task = tm.Task(
+            "fast_interval_task",
+            dc.CumulativeAdditionCommand(1, 1),
+            strat.IntervalRun(0.05)
+        )
+        self.task_manager.add_task(task)
+        self.wait_for(lambda: (task._command.result or 0) >= 5)
+        self.assertEqual(len(observer.data), 1)
+        self.assertEqual([e.uuid for e in observer.data[0]], [task.uuid])
+
+        self.task_manager.stop()
+        self.future.result(timeout=5)
+        self.assertEqual(len(observer.data), 2)
+        (event,) = observer.data[1]
+        self.assertEqual(event.data["state"], cmd.State.CANCELLED)
+        self.assertGreaterEqual(event.data["result"], 5)
+
+
+class TestExecutors(SchedulerTestCase):
+    """Task executor kinds test cases."""
+    def run_task(self, command, executor):
+        """Run one time task and wait for it to finish."""
+        task = tm.Task(
+            "onetime_task", command, strat.OneTimeRun(), executor=executor
+        )
+        self.task_manager.add_task(task)
+        self.wait_for(
+            lambda: task.to_dict()["stop_run_time"] != -1 and not task.running,
+            timeout=30
+        )
+        return task.to_dict()
+
+    def test_process(self):
+        """Command is executed in another process, outcome comes back."""
+        result = self.run_task(dc.PidCommand(), tm.ExecutorKind.PROCESS)
+        self.assertEqual(result["state"], cmd.State.SUCCESS)
+        self.assertNotEqual(result["result"], os.getpid())
+        self.assertIsNone(result["error"])
+
+    def test_process_failure(self):
+        """Command error comes back from process."""
+        result = self.run_task(
+            dc.AdditionCommand(1, "bad_arg"), tm.ExecutorKind.PROCESS
+        )
+        self.assertEqual(result["state"], cmd.State.FAILED)
+        self.assertEqual(result["error"], "Bad agruments. Exiting.")
+
+    def test_process_unpicklable_result(self):
+        """Result, which can't be sent back, fails command."""
+        result = self.run_task(
+            dc.UnpicklableResultCommand(), tm.ExecutorKind.PROCESS
+        )
+        self.assertEqual(result["state"], cmd.State.FAILED)
+        self.assertIsNotNone(result["error"])
+
+    def test_inline(self):
+        """Command is executed in scheduler thread."""
+        result = self.run_task(
+            dc.ThreadNameCommand(), tm.ExecutorKind.INLINE
+        )
+        self.assertEqual(result["state"], cmd.State.SUCCESS)
+        self.assertFalse(result["result"].startswith("fatm"))
+
+    def test_thread(self):
+        """Command is executed in thread pool by default."""
+        result = self.run_task(dc.ThreadNameCommand(), tm.ExecutorKind.THREAD)
+        self.assertTrue(result["result"].startswith("fatm"))
+
+    def test_unknown_executor(self):
+        """Unknown executor kind is rejected."""
+        with self.assertRaises(ValueError):
+            tm.Task("task", dc.PidCommand(), strat.OneTimeRun(), "gpu")
+
+
 class TestTaskRegistry(unittest.TestCase):
     """Test cases for task registry."""
     def setUp(self):
@@ -623,6 +854,108 @@ class TestTaskRegistry(unittest.TestCase):
 
         self.task_registry.detatch_monitor()
 
+    def test_get_tasks_by_state(self):
+        """Tasks are indexed by state, running tasks are `RUNNING`."""
+        task_1 = tm.Task("task_1", dc.AdditionCommand(1, 2), strat.OneTimeRun())
+        task_2 = tm.Task("task_2", dc.AdditionCommand(1, 2), strat.OneTimeRun())
+        self.task_registry.add_task(task_1)
+        self.task_registry.add_task(task_2)
+        self.assertEqual(
+            set(self.task_registry.get_tasks_by_state(cmd.State.NEW)),
+            {task_1, task_2}
+        )
+
+        task_1.begin_run()
+        self.task_registry.update_task(task_1)
+        self.assertEqual(
+            self.task_registry.get_tasks_by_state(cmd.State.RUNNING), [task_1]
+        )
+
+        task_1.finish_run()
+        self.task_registry.update_task(task_1)
+        self.assertEqual(
+            self.task_registry.get_tasks_by_state(cmd.State.SUCCESS), [task_1]
+        )
+        self.assertEqual(
+            self.task_registry.get_tasks_by_state(cmd.State.NEW), [task_2]
+        )
+
+        self.task_registry.delete_task(task_2.uuid)
+        self.assertEqual(
+            self.task_registry.get_tasks_by_state(cmd.State.NEW), []
+        )
+
+    def test_publish_changes(self):
+        """Observers get only tasks, which changed since previous batch."""
+        observer = obs.TaskState()
+        self.task_registry.subscribe(observer)
+        task_1 = tm.Task("task_1", dc.AdditionCommand(1, 2), strat.OneTimeRun())
+        task_2 = tm.Task("task_2", dc.AdditionCommand(1, 2), strat.OneTimeRun())
+        self.task_registry.add_task(task_1)
+        self.task_registry.add_task(task_2)
+        self.assertTrue(self.task_registry.has_changes())
+        self.task_registry.publish_changes()
+        self.assertEqual(set(observer.data), {task_1.uuid, task_2.uuid})
+        self.assertFalse(self.task_registry.has_changes())
+
+        task_1.run()
+        with patch.object(observer, "update", wraps=observer.update) as update:
+            self.task_registry.publish_changes()
+            self.task_registry.publish_changes()
+        update.assert_called_once()
+        (events,) = update.call_args.args
+        self.assertEqual([e.uuid for e in events], [task_1.uuid])
+        self.assertIn("result: 3", observer.data[task_1.uuid])
+
+        self.task_registry.delete_task(task_2.uuid)
+        task_2.run()
+        self.task_registry.publish_changes()
+        self.assertEqual(list(observer.data), [task_1.uuid])
+
+        self.task_registry.unsubscribe(observer)
+        task_1.cancel()
+        self.task_registry.publish_changes()
+        self.assertNotIn("cancelled", observer.data[task_1.uuid])
+
+    def test_schedule(self):
+        """Tasks are taken out of schedule in order of run times."""
+        tasks = [
+            tm.Task(f"task_{i}", MagicMock(), MagicMock()) for i in range(4)
+        ]
+        for task in tasks:
+            self.task_registry.add_task(task)
+        for task, when in zip(tasks, (30, 10, 20, 40)):
+            self.assertTrue(self.task_registry.schedule(task, when))
+        # Task has one entry in schedule at most.
+        self.assertFalse(self.task_registry.schedule(tasks[0], 0))
+        self.assertEqual(self.task_registry.next_run_time(), 10)
+
+        self.task_registry.delete_task(tasks[1].uuid)
+        self.assertEqual(self.task_registry.next_run_time(), 20)
+        self.assertEqual(
+            self.task_registry.pop_due(35), [tasks[2], tasks[0]]
+        )
+        self.assertFalse(self.task_registry.is_scheduled(tasks[0].uuid))
+        self.assertTrue(self.task_registry.is_scheduled(tasks[3].uuid))
+
+        self.task_registry.unschedule_all()
+        self.assertIsNone(self.task_registry.next_run_time())
+        self.assertEqual(self.task_registry.pop_due(100), [])
+
+    def test_snapshot(self):
+        """Snapshot is rebuilt only after registry changes."""
+        task_1 = tm.Task("task_1", dc.AdditionCommand(1, 2), strat.OneTimeRun())
+        self.task_registry.add_task(task_1)
+        version, tasks = self.task_registry.snapshot()
+        self.assertEqual(tasks, [task_1.to_dict()])
+        self.assertIs(self.task_registry.snapshot()[1], tasks)
+
+        task_1.run()
+        self.task_registry.update_task(task_1)
+        new_version, new_tasks = self.task_registry.snapshot()
+        self.assertGreater(new_version, version)
+        self.assertEqual(new_tasks[0]["state"], cmd.State.SUCCESS)
+
 
 def single_function_testing():
     """For debugger runs and usage in __main__."""
@@ -0,0 +1,62 @@
+"""UI components tests module."""
+
+import unittest
+
+from flask_aggregator.front.view import TableBody, TableCell
+
+
+class TestTableBody(unittest.TestCase):
+    """One-pass table body test cases."""
+    def render(self, rows, links=None) -> str:
+        """Rows of body without its wrapping tag."""
+        html = TableBody(["name", "href"], rows, links=links).render()
+        start = html.index("> ") + 2
+        return html[start:-len("</tbody>")]
+
+    def test_values_escaped(self):
+        """Values are escaped, unlike `TableCell` ones."""
+        self.assertEqual(
+            self.render([{"name": "<b>a & b</b>", "href": 'say "hi"'}]),
+            "<tr><td>&lt;b&gt;a &amp; b&lt;/b&gt;</td>"
+            "<td>say &quot;hi&quot;</td></tr>"
+        )
+        self.assertEqual(TableCell("<b>").render(), "<td><b></td>")
+
+    def test_links(self):
+        """Link cells have escaped href and label, empty href gives label."""
+        rows = [
+            {"name": "vm1", "href": 'https://e15/?a=1&b="2"'},
+            {"name": "vm2", "href": ""},
+            {"name": "vm3", "href": None},
+        ]
+        self.assertEqual(
+            self.render(rows, links={"href": "<open>"}),
+            "<tr><td>vm1</td><td><a href=\"https://e15/?a=1&amp;b="
+            "&quot;2&quot;\">&lt;open&gt;</a></td></tr>"
+            "<tr><td>vm2</td><td>&lt;open&gt;</td></tr>"
+            "<tr><td>vm3</td><td>&lt;open&gt;</td></tr>"
+        )
+
+    def test_none(self):
+        """`None` is rendered as `TableCell` renders it."""
+        self.assertEqual(
+            self.render([{"name": None, "href": 1}]),
+            "<tr><td>None</td><td>1</td></tr>"
+        )
+        self.assertEqual(TableCell(None).render(), "<td>None</td>")
+
+    def test_same_markup(self):
+        """Without special characters markup is the same as of cells."""
+        body = TableBody(
+            ["name", "href"], [{"name": "vm1", "href": "https://e15/vm1"}],
+            links={"href": "open"}
+        )
+        cells = (
+            TableCell("vm1").render()
+            + TableCell("open", link="https://e15/vm1").render()
+        )
+        self.assertIn(f"<tr>{cells}</tr>", body.render())
+
+
+if __name__ == "__main__":
+    unittest.main()
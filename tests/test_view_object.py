@@ -0,0 +1,111 @@
+"""View objects tests module."""
+
+import uuid
+import unittest
+
+from flask_aggregator.back.models import Backups, Storage
+from flask_aggregator.back.view_object import (
+    RowConverter, ViewObjectFactory, _compile_converter)
+from tests.db_tools import SQLiteTestCase
+
+GB = 1024**3
+
+
+class TestRowConverter(unittest.TestCase):
+    """Row conversion test cases."""
+    def test_conversions(self):
+        """Only columns with conversions are converted, `None` is kept."""
+        storage = Storage(name="sd1", total=2 * GB, available=None, used=GB)
+        converter = RowConverter(("name", "total", "available", "used"))
+        self.assertEqual(converter.values(storage), ["sd1", 2.0, None, 1.0])
+        self.assertEqual(
+            list(converter.to_dict(storage).items()),
+            [("name", "sd1"), ("total", 2.0), ("available", None),
+             ("used", 1.0)]
+        )
+
+    def test_backup_type(self):
+        """Backup type is got from source key."""
+        converter = RowConverter(("name", "source_key"))
+        self.assertEqual(
+            converter.values(Backups(name="vm1", source_key="POOL-1")),
+            ["vm1", "tape"]
+        )
+        self.assertEqual(
+            converter.values(Backups(name="vm2", source_key="vault")),
+            ["vm2", "disk"]
+        )
+
+    def test_column_counts(self):
+        """Single column gives one value, no columns give none."""
+        storage = Storage(name="sd1", total=GB)
+        self.assertEqual(RowConverter(("total",)).values(storage), [1.0])
+        self.assertEqual(RowConverter(()).values(storage), [])
+
+
+class TestConverterCache(unittest.TestCase):
+    """Converter cache test cases."""
+    def setUp(self):
+        _compile_converter.cache_clear()
+        self.addCleanup(_compile_converter.cache_clear)
+
+    def test_reuse(self):
+        """Converter is compiled once per model and column order."""
+        converter = ViewObjectFactory.get_converter(Storage, ["name", "total"])
+        self.assertIs(
+            ViewObjectFactory.get_converter(Storage, ["name", "total"]),
+            converter
+        )
+        self.assertIsNot(
+            ViewObjectFactory.get_converter(Storage, ["total", "name"]),
+            converter
+        )
+        self.assertIsNot(
+            ViewObjectFactory.get_converter(Backups, ["name", "total"]),
+            converter
+        )
+        info = _compile_converter.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 3))
+
+    def test_view_objects_share_converter(self):
+        """View objects of same model convert rows with one converter."""
+        cols = ["name", "total"]
+        dicts = [
+            ViewObjectFactory.create_obj(
+                Storage(name=f"sd{i}", total=i * GB), cols
+            ).to_dict()
+            for i in range(3)
+        ]
+        self.assertEqual([d["total"] for d in dicts], [0.0, 1.0, 2.0])
+        self.assertEqual(_compile_converter.cache_info().misses, 1)
+
+    def test_unknown_class(self):
+        """Only models and rows are converted."""
+        with self.assertRaises(ValueError):
+            ViewObjectFactory.get_converter(dict, ["name"])
+
+
+class TestIterDicts(SQLiteTestCase):
+    """Conversion of query results test cases."""
+    def test_rows(self):
+        """Query rows are converted as models are."""
+        self.add_rows(
+            Storage(uuid=uuid.uuid4(), name="sd1", total=GB),
+            Storage(uuid=uuid.uuid4(), name="sd2", total=None)
+        )
+        session = self.db_con.get_scoped_session()
+        try:
+            rows = session.query(Storage.name, Storage.total).order_by(
+                Storage.name
+            ).all()
+            dicts = list(ViewObjectFactory.iter_dicts(rows, ["name", "total"]))
+        finally:
+            session.close()
+        self.assertEqual(
+            [dict(d) for d in dicts],
+            [{"name": "sd1", "total": 1.0}, {"name": "sd2", "total": None}]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,201 @@
+"""Wait primitives tests module."""
+
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from flask_aggregator.back.wait import (
+    Backoff, Poller, RateLimiter, WaitTimeoutError, wait_until)
+
+
+class TestBackoff(unittest.TestCase):
+    """Backoff intervals test cases."""
+    def test_exponential_growth_with_cap(self):
+        """Intervals grow by factor up to max interval."""
+        backoff = Backoff(initial=1, factor=2, max_interval=5, jitter=0)
+        self.assertEqual(
+            [backoff.next() for _ in range(5)], [1, 2, 4, 5, 5]
+        )
+        backoff.reset()
+        self.assertEqual(backoff.next(), 1)
+
+    def test_jitter_bounds(self):
+        """Jitter changes interval by no more than its share."""
+        backoff = Backoff(initial=10, factor=1, max_interval=10, jitter=0.5)
+        for _ in range(100):
+            self.assertTrue(5 <= backoff.next() <= 15)
+
+    def test_invalid_parameters(self):
+        """Invalid parameters are rejected."""
+        with self.assertRaises(ValueError):
+            Backoff(initial=0)
+        with self.assertRaises(ValueError):
+            Backoff(jitter=1)
+
+
+class TestWaitUntil(unittest.TestCase):
+    """Blocking wait test cases."""
+    def test_returns_check_result(self):
+        """Wait ends on first truthy check result."""
+        results = iter([None, False, "done"])
+        sleeps = []
+        result = wait_until(
+            lambda: next(results),
+            timeout=100,
+            backoff=Backoff(initial=1, factor=2, jitter=0),
+            sleep=sleeps.append
+        )
+        self.assertEqual(result, "done")
+        self.assertEqual(sleeps, [1, 2])
+
+    def test_deadline(self):
+        """Last sleep is cut to deadline, then error is raised."""
+        now = [0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        with self.assertRaises(WaitTimeoutError):
+            wait_until(
+                lambda: False,
+                timeout=10,
+                backoff=Backoff(initial=4, factor=1, max_interval=4, jitter=0),
+                clock=lambda: now[0],
+                sleep=sleep
+            )
+        self.assertEqual(sleeps, [4, 4, 2])
+
+
+class TestPoller(unittest.TestCase):
+    """Multiplexed waits test cases."""
+    def setUp(self):
+        self.poller = Poller(
+            backoff_factory=lambda: Backoff(
+                initial=0.01, max_interval=0.05, jitter=0
+            )
+        )
+
+    def tearDown(self):
+        self.poller.stop()
+
+    def test_many_waits_one_thread(self):
+        """All checks are run in single poller thread."""
+        events = [threading.Event() for _ in range(20)]
+        check_threads = set()
+        results = {}
+
+        def make_check(i):
+            def check():
+                check_threads.add(threading.current_thread().name)
+                return events[i].is_set() and i + 1
+            return check
+
+        def waiter(i):
+            results[i] = self.poller.wait(make_check(i), timeout=5)
+
+        threads = [
+            threading.Thread(target=waiter, args=(i,)) for i in range(20)
+        ]
+        for t in threads:
+            t.start()
+        for e in events:
+            e.set()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, {i: i + 1 for i in range(20)})
+        self.assertEqual(check_threads, {"poller"})
+
+    def test_timeout(self):
+        """Wait ends with error on deadline."""
+        start = time.monotonic()
+        with self.assertRaises(WaitTimeoutError):
+            self.poller.wait(lambda: False, timeout=0.1)
+        self.assertLess(time.monotonic() - start, 1)
+
+    def test_check_error(self):
+        """Check exceptions are raised in waiting thread."""
+        def check():
+            raise KeyError("boom")
+        with self.assertRaises(KeyError):
+            self.poller.wait(check, timeout=5)
+
+    def test_stop(self):
+        """Unfinished waits get error when poller is stopped."""
+        errors = []
+
+        def waiter():
+            try:
+                self.poller.wait(lambda: False, timeout=60)
+            except RuntimeError as e:
+                errors.append(e)
+
+        t = threading.Thread(target=waiter)
+        t.start()
+        time.sleep(0.05)
+        self.poller.stop()
+        t.join(timeout=1)
+        self.assertFalse(t.is_alive())
+        self.assertEqual(len(errors), 1)
+
+    @patch("random.uniform", return_value=1)
+    def test_backoff_reduces_checks(self, _):
+        """Checks become rarer with backoff."""
+        calls = []
+        with self.assertRaises(WaitTimeoutError):
+            self.poller.wait(
+                lambda: calls.append(time.monotonic()),
+                timeout=0.3
+            )
+        # 0.01, 0.02, 0.04 and then every 0.05 seconds - no more than 10
+        # checks instead of 30 with fixed 0.01 interval.
+        self.assertLessEqual(len(calls), 10)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Rate limiter test cases."""
+    def test_slots(self):
+        """Callers are spaced by 1 / rate seconds."""
+        now = [0]
+        sleeps = []
+        limiter = RateLimiter(
+            rate=4, clock=lambda: now[0], sleep=sleeps.append
+        )
+        for _ in range(3):
+            limiter.acquire()
+        self.assertEqual(sleeps, [0.25, 0.5])
+        # Idle time is not accumulated into burst.
+        now[0] = 10
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual(sleeps, [0.25, 0.5, 0.25])
+
+    def test_threads(self):
+        """Concurrent callers don't exceed rate."""
+        limiter = RateLimiter(rate=100)
+        times = []
+        lock = threading.Lock()
+
+        def caller():
+            limiter.acquire()
+            with lock:
+                times.append(time.monotonic())
+
+        threads = [threading.Thread(target=caller) for _ in range(10)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertGreaterEqual(max(times) - start, 0.085)
+
+    def test_invalid_rate(self):
+        """Rate must be positive."""
+        with self.assertRaises(ValueError):
+            RateLimiter(rate=0)
+
+
+if __name__ == "__main__":
+    unittest.main()